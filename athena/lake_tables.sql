@@ -0,0 +1,102 @@
+-- CodeSense360 — Athena tables over the compacted raw history (src/ingest/compaction.py).
+--
+-- compaction writes lake/<dataset>/repo=<owner>__<name>/month=YYYY-MM/part-*.ndjson.gz:
+-- projected raw records (src/ingest/schemas.py), one row per natural key (commit sha,
+-- PR number at its latest updated_at, run id), packed into ~COMPACTION_TARGET_MB parts.
+-- Partition projection means no MSCK REPAIR / crawler is needed; add repos to the enum
+-- as they are onboarded. Filter on month so Athena only reads the months you need.
+
+CREATE EXTERNAL TABLE IF NOT EXISTS commits_lake (
+  sha        string,
+  html_url   string,
+  `commit`   struct<author:struct<name:string,email:string,`date`:string>,
+                    committer:struct<`date`:string>,
+                    message:string>,
+  author     struct<login:string>,
+  committer  struct<login:string>
+)
+PARTITIONED BY (repo string, month string)
+ROW FORMAT SERDE 'org.openx.data.jsonserde.JsonSerDe'
+LOCATION 's3://codesense360-data/lake/commits/'
+TBLPROPERTIES (
+  'projection.enabled' = 'true',
+  'projection.repo.type' = 'enum',
+  'projection.repo.values' = 'AICloudProjects__codesense360',
+  'projection.month.type' = 'date',
+  'projection.month.format' = 'yyyy-MM',
+  'projection.month.range' = '2020-01,NOW',
+  'projection.month.interval' = '1',
+  'projection.month.interval.unit' = 'MONTHS',
+  'storage.location.template' = 's3://codesense360-data/lake/commits/repo=${repo}/month=${month}/'
+);
+
+CREATE EXTERNAL TABLE IF NOT EXISTS pull_requests_lake (
+  id                  bigint,
+  number              bigint,
+  title               string,
+  state               string,
+  draft               boolean,
+  html_url            string,
+  author_association  string,
+  created_at          string,
+  updated_at          string,
+  closed_at           string,
+  merged_at           string,
+  `user`              struct<login:string>,
+  base                struct<ref:string>,
+  head                struct<ref:string>,
+  repo_full_name      string,
+  merged_by           string,
+  additions           bigint,
+  deletions           bigint,
+  changed_files       bigint,
+  review_comments     bigint,
+  commits_in_pr       bigint
+)
+PARTITIONED BY (repo string, month string)
+ROW FORMAT SERDE 'org.openx.data.jsonserde.JsonSerDe'
+LOCATION 's3://codesense360-data/lake/pull_requests/'
+TBLPROPERTIES (
+  'projection.enabled' = 'true',
+  'projection.repo.type' = 'enum',
+  'projection.repo.values' = 'AICloudProjects__codesense360',
+  'projection.month.type' = 'date',
+  'projection.month.format' = 'yyyy-MM',
+  'projection.month.range' = '2020-01,NOW',
+  'projection.month.interval' = '1',
+  'projection.month.interval.unit' = 'MONTHS',
+  'storage.location.template' = 's3://codesense360-data/lake/pull_requests/repo=${repo}/month=${month}/'
+);
+
+CREATE EXTERNAL TABLE IF NOT EXISTS workflow_runs_lake (
+  id              bigint,
+  name            string,
+  workflow_id     bigint,
+  event           string,
+  status          string,
+  conclusion      string,
+  head_branch     string,
+  head_sha        string,
+  run_number      bigint,
+  run_attempt     bigint,
+  html_url        string,
+  created_at      string,
+  updated_at      string,
+  run_started_at  string,
+  actor           struct<login:string>,
+  repo_full_name  string
+)
+PARTITIONED BY (repo string, month string)
+ROW FORMAT SERDE 'org.openx.data.jsonserde.JsonSerDe'
+LOCATION 's3://codesense360-data/lake/workflow_runs/'
+TBLPROPERTIES (
+  'projection.enabled' = 'true',
+  'projection.repo.type' = 'enum',
+  'projection.repo.values' = 'AICloudProjects__codesense360',
+  'projection.month.type' = 'date',
+  'projection.month.format' = 'yyyy-MM',
+  'projection.month.range' = '2020-01,NOW',
+  'projection.month.interval' = '1',
+  'projection.month.interval.unit' = 'MONTHS',
+  'storage.location.template' = 's3://codesense360-data/lake/workflow_runs/repo=${repo}/month=${month}/'
+);
@@ -0,0 +1,70 @@
+-- CodeSense360 — Athena tables for the repo-partitioned (org mode) layout.
+--
+-- org_ingest writes processed/<table>/repo=<owner>__<name>/<table>.csv with the
+-- stable column sets in PROCESSED_COLUMNS (metrics_processor / cicd_metrics_processor).
+-- The tables get *_org names: the flat-layout tables already own the
+-- *_processed / author_pr_summary names, and CREATE ... IF NOT EXISTS would
+-- silently keep those on a deployed database.
+-- After new repos are ingested, load their partitions with:
+--   MSCK REPAIR TABLE commits_org;  (likewise for the other three)
+
+CREATE EXTERNAL TABLE IF NOT EXISTS commits_org (
+  sha           string,
+  author        string,
+  author_login  string,
+  `date`        string,
+  message_len   double
+)
+PARTITIONED BY (repo string)
+ROW FORMAT SERDE 'org.apache.hadoop.hive.serde2.OpenCSVSerde'
+LOCATION 's3://codesense360-data/processed/commits_processed/'
+TBLPROPERTIES ('skip.header.line.count' = '1');
+
+CREATE EXTERNAL TABLE IF NOT EXISTS pull_requests_org (
+  number             bigint,
+  author             string,
+  state              string,
+  created_at         string,
+  closed_at          string,
+  merged_at          string,
+  merged             boolean,
+  review_time_hours  double,
+  additions          bigint,
+  deletions          bigint,
+  changed_files      bigint,
+  review_comments    bigint,
+  commits_in_pr      bigint
+)
+PARTITIONED BY (repo string)
+ROW FORMAT SERDE 'org.apache.hadoop.hive.serde2.OpenCSVSerde'
+LOCATION 's3://codesense360-data/processed/pull_requests_processed/'
+TBLPROPERTIES ('skip.header.line.count' = '1');
+
+CREATE EXTERNAL TABLE IF NOT EXISTS author_pr_summary_org (
+  author                 string,
+  total_prs              bigint,
+  merged_prs             bigint,
+  avg_review_time_hours  double,
+  avg_comments           double
+)
+PARTITIONED BY (repo string)
+ROW FORMAT SERDE 'org.apache.hadoop.hive.serde2.OpenCSVSerde'
+LOCATION 's3://codesense360-data/processed/author_pr_summary/'
+TBLPROPERTIES ('skip.header.line.count' = '1');
+
+CREATE EXTERNAL TABLE IF NOT EXISTS workflow_runs_org (
+  id            bigint,
+  name          string,
+  event         string,
+  head_branch   string,
+  status        string,
+  conclusion    string,
+  run_number    bigint,
+  created_at    string,
+  updated_at    string,
+  run_time_min  double
+)
+PARTITIONED BY (repo string)
+ROW FORMAT SERDE 'org.apache.hadoop.hive.serde2.OpenCSVSerde'
+LOCATION 's3://codesense360-data/processed/workflow_runs_processed/'
+TBLPROPERTIES ('skip.header.line.count' = '1');
@@ -0,0 +1,91 @@
+-- CodeSense360 — Athena tables for the partitioned Parquet layout (PROCESSED_FORMAT=parquet|both).
+--
+-- parquet_writer writes processed_parquet/<dataset>/repo=<owner>__<name>/dt=YYYY-MM-DD/<dataset>.parquet
+-- with the typed columns in parquet_writer.DATASETS. Partition projection means no
+-- MSCK REPAIR / crawler is needed: dt is projected as a date range and repo as an enum.
+-- Add repos to the enum as they are onboarded, e.g.
+--   ALTER TABLE commits_parquet SET TBLPROPERTIES ('projection.repo.values' = 'AICloudProjects__codesense360,AICloudProjects__other');
+-- Always filter on dt so Athena only reads the days in the requested window.
+
+CREATE EXTERNAL TABLE IF NOT EXISTS commits_parquet (
+  sha           string,
+  author        string,
+  author_login  string,
+  `date`        timestamp,
+  message_len   bigint
+)
+PARTITIONED BY (repo string, dt string)
+STORED AS PARQUET
+LOCATION 's3://codesense360-data/processed_parquet/commits_processed/'
+TBLPROPERTIES (
+  'parquet.compression' = 'ZSTD',
+  'projection.enabled' = 'true',
+  'projection.repo.type' = 'enum',
+  'projection.repo.values' = 'AICloudProjects__codesense360',
+  'projection.dt.type' = 'date',
+  'projection.dt.format' = 'yyyy-MM-dd',
+  'projection.dt.range' = '2020-01-01,NOW',
+  'projection.dt.interval' = '1',
+  'projection.dt.interval.unit' = 'DAYS',
+  'storage.location.template' = 's3://codesense360-data/processed_parquet/commits_processed/repo=${repo}/dt=${dt}/'
+);
+
+CREATE EXTERNAL TABLE IF NOT EXISTS pull_requests_parquet (
+  number             bigint,
+  author             string,
+  state              string,
+  created_at         timestamp,
+  updated_at         timestamp,
+  closed_at          timestamp,
+  merged_at          timestamp,
+  merged             boolean,
+  review_time_hours  double,
+  additions          bigint,
+  deletions          bigint,
+  changed_files      bigint,
+  review_comments    bigint,
+  commits_in_pr      bigint
+)
+PARTITIONED BY (repo string, dt string)
+STORED AS PARQUET
+LOCATION 's3://codesense360-data/processed_parquet/pull_requests_processed/'
+TBLPROPERTIES (
+  'parquet.compression' = 'ZSTD',
+  'projection.enabled' = 'true',
+  'projection.repo.type' = 'enum',
+  'projection.repo.values' = 'AICloudProjects__codesense360',
+  'projection.dt.type' = 'date',
+  'projection.dt.format' = 'yyyy-MM-dd',
+  'projection.dt.range' = '2020-01-01,NOW',
+  'projection.dt.interval' = '1',
+  'projection.dt.interval.unit' = 'DAYS',
+  'storage.location.template' = 's3://codesense360-data/processed_parquet/pull_requests_processed/repo=${repo}/dt=${dt}/'
+);
+
+CREATE EXTERNAL TABLE IF NOT EXISTS workflow_runs_parquet (
+  id            bigint,
+  name          string,
+  event         string,
+  head_branch   string,
+  status        string,
+  conclusion    string,
+  run_number    bigint,
+  created_at    timestamp,
+  updated_at    timestamp,
+  run_time_min  double
+)
+PARTITIONED BY (repo string, dt string)
+STORED AS PARQUET
+LOCATION 's3://codesense360-data/processed_parquet/workflow_runs_processed/'
+TBLPROPERTIES (
+  'parquet.compression' = 'ZSTD',
+  'projection.enabled' = 'true',
+  'projection.repo.type' = 'enum',
+  'projection.repo.values' = 'AICloudProjects__codesense360',
+  'projection.dt.type' = 'date',
+  'projection.dt.format' = 'yyyy-MM-dd',
+  'projection.dt.range' = '2020-01-01,NOW',
+  'projection.dt.interval' = '1',
+  'projection.dt.interval.unit' = 'DAYS',
+  'storage.location.template' = 's3://codesense360-data/processed_parquet/workflow_runs_processed/repo=${repo}/dt=${dt}/'
+);
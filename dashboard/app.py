@@ -1,20 +1,22 @@
 import streamlit as st
-import boto3
+import json
 import pandas as pd
 import yaml
 import os
-from io import StringIO
-
-
-st.sidebar.write("🔑 AWS Key Found:", bool(os.getenv("AWS_ACCESS_KEY_ID")))
-st.sidebar.write("🌎 AWS Region:", os.getenv("AWS_REGION"))
-
-try:
-    sts = boto3.client("sts")
-    whoami = sts.get_caller_identity()
-    st.sidebar.success(f"✅ Connected as {whoami['Arn']}")
-except Exception as e:
-    st.sidebar.error(f"❌ AWS Connection failed: {e}")
+from queries import (
+    WINDOWS,
+    author_pr_summary,
+    commits_by_author,
+    pull_requests_by_author,
+    workflow_conclusions,
+)
+from athena_executor import AthenaExecutor
+from clients import get_client
+from insight_manifest import InsightManifest
+from athena_results import read_query_results
+import rollup_reader
+from query_backends import backend_settings, create_backend
+from query_cache import DataVersion, QueryCache
 
 
 # --- Page setup ---
@@ -28,45 +30,119 @@ region = config["aws"]["region"]
 athena_db = config["aws"]["athena_database"]
 output_bucket = config["aws"]["bucket"]
 output_location = config["aws"]["athena_output"]
+processed_format = config["aws"].get("processed_format", "csv")
+cache_config = config.get("cache", {})
+backend_config = backend_settings(config)
+rollups_enabled = config.get("rollups", {}).get("enabled", False)
+
+
+# --- Boto3 clients (credentials from AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY, e.g. Streamlit secrets) ---
+# Shared per server process through src/clients.py: every session and rerun reuses their connection pools
+@st.cache_resource
+def get_clients():
+    return get_client("athena", region), get_client("s3", region)
+
+
+@st.cache_data(ttl=3600)
+def caller_identity():
+    return get_client("sts", region).get_caller_identity()["Arn"]
+
+
+@st.cache_resource
+def get_query_cache():
+    """Query results shared across sessions, invalidated when the processed data changes."""
+    _, s3_client = get_clients()
+    cache = QueryCache(
+        max_entries=cache_config.get("max_entries", 128),
+        ttl_seconds=cache_config.get("ttl_seconds", 900),
+    )
+    version = DataVersion(s3_client, output_bucket, check_every=cache_config.get("version_check_seconds", 60))
+    return cache, version
+
+
+athena, s3 = get_clients()
+
+st.sidebar.write("🔑 AWS Key Found:", bool(os.getenv("AWS_ACCESS_KEY_ID")))
+st.sidebar.write("🌎 AWS Region:", os.getenv("AWS_REGION"))
+
+if backend_config["engine"] == "athena":
+    try:
+        st.sidebar.success(f"✅ Connected as {caller_identity()}")
+    except Exception as e:
+        st.sidebar.error(f"❌ AWS Connection failed: {e}")
+else:
+    st.sidebar.info(f"🦆 Local {backend_config['engine']} backend over {backend_config['data_dir']}/")
 
-# --- Boto3 clients (use Streamlit secrets for credentials) ---
-athena = boto3.client(
-    "athena",
-    region_name=region,
-    aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-    aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-)
-s3 = boto3.client(
-    "s3",
-    region_name=region,
-    aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-    aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-)
 
 # --- Utility: Run Athena query ---
-def run_query(query):
-    st.info(f"🔍 Running query:\n{query}")
-    response = athena.start_query_execution(
-        QueryString=query,
-        QueryExecutionContext={"Database": athena_db},
-        ResultConfiguration={"OutputLocation": output_location},
+def _fetch_results(query_id, execution):
+    # Small results page through the API, large ones stream from the S3 result CSV
+    return read_query_results(athena, s3, query_id, execution)
+
+
+def _athena_executor():
+    cache, version = get_query_cache()
+    return AthenaExecutor(
+        athena, athena_db, output_location, _fetch_results,
+        reuse_minutes=cache_config.get("athena_result_reuse_minutes", 0),
+        cache=cache,
+        data_version=version.current,
     )
-    query_id = response["QueryExecutionId"]
 
-    # Poll for completion
-    state = "RUNNING"
-    while state in ("RUNNING", "QUEUED"):
-        res = athena.get_query_execution(QueryExecutionId=query_id)
-        state = res["QueryExecution"]["Status"]["State"]
 
-    if state != "SUCCEEDED":
-        st.error(f"❌ Query failed: {state}")
-        return pd.DataFrame()
+@st.cache_resource
+def get_executor():
+    """One query backend per server process (query_backend.engine in config.yaml)."""
+    return create_backend(backend_config, _athena_executor, s3=s3, bucket=output_bucket)
+
+
+def run_queries(*queries):
+    """Run queries concurrently; a failed query shows an error and yields an empty DataFrame."""
+    futures = get_executor().map(queries)
+    results = []
+    for query, future in zip(queries, futures):
+        try:
+            results.append(future.result())
+        except Exception as e:
+            st.error(f"❌ Query failed: {e}")
+            st.code(query, language="sql")
+            results.append(pd.DataFrame())
+    return results
+
+
+def run_query(query):
+    return run_queries(query)[0]
+
+
+QUERY_BUILDERS = {
+    "commits_by_author": commits_by_author,
+    "pull_requests_by_author": pull_requests_by_author,
+    "author_pr_summary": author_pr_summary,
+    "workflow_conclusions": workflow_conclusions,
+}
+
+
+@st.cache_resource
+def get_rollup_store():
+    if backend_config["engine"] == "duckdb":
+        return rollup_reader.RollupStore(data_dir=backend_config["data_dir"])
+    return rollup_reader.RollupStore(s3=s3, bucket=output_bucket)
+
 
-    # Download CSV from S3
-    key = f"athena-query-results/{query_id}.csv"
-    data = s3.get_object(Bucket=output_bucket, Key=key)
-    return pd.read_csv(StringIO(data["Body"].read().decode("utf-8")))
+@st.cache_data(ttl=cache_config.get("ttl_seconds", 900))
+def read_rollup_view(name, days, data_version):
+    # data_version is part of the cache key: new processed data → fresh read
+    return rollup_reader.VIEWS[name](get_rollup_store(), days)
+
+
+def load_view(name, days=None):
+    """Read a view from the pre-aggregated rollups; fall back to SQL until they exist."""
+    if rollups_enabled:
+        _, version = get_query_cache()
+        df = read_rollup_view(name, days, version.current())
+        if not df.empty:
+            return df
+    return run_query(QUERY_BUILDERS[name](processed_format, days))
 
 # --- Sidebar ---
 st.sidebar.header("📊 Choose View")
@@ -75,45 +151,31 @@ view = st.sidebar.radio(
     ["Commits", "Pull Requests", "Author PR Summary", "CI/CD Runs"]
 )
 
+# Parquet tables are dt-partitioned and rollups are per day/week: the window bounds what's read
+window_days = None
+if processed_format == "parquet" or rollups_enabled:
+    window_days = WINDOWS[st.sidebar.selectbox("Time window", list(WINDOWS), index=1)]
+
 # --- Views ---
 if view == "Commits":
     st.title("🧩 Commit Trends")
-    df = run_query("""
-        SELECT author_login AS author, COUNT(*) AS commits
-        FROM commits_processed
-        WHERE author_login IS NOT NULL
-        GROUP BY author
-        ORDER BY commits DESC
-        LIMIT 10;
-    """)
+    df = load_view("commits_by_author", window_days)
     st.bar_chart(df.set_index("author"))
 
 elif view == "Pull Requests":
     st.title("🔀 Pull Request Metrics")
-    df = run_query("""
-        SELECT author, COUNT(*) AS total_prs,
-               SUM(CASE WHEN merged THEN 1 ELSE 0 END) AS merged_prs,
-               ROUND(AVG(review_time_hours),2) AS avg_review_time
-        FROM pull_requests_processed
-        GROUP BY author
-        ORDER BY merged_prs DESC
-        LIMIT 10;
-    """)
+    df = load_view("pull_requests_by_author", window_days)
     st.dataframe(df)
     st.bar_chart(df.set_index("author")[["merged_prs"]])
 
 elif view == "Author PR Summary":
     st.title("👥 Developer PR Summary")
-    df = run_query("SELECT * FROM author_pr_summary ORDER BY merged_prs DESC LIMIT 15;")
+    df = load_view("author_pr_summary", window_days)
     st.dataframe(df)
 
 else:
     st.title("⚙️ CI/CD Workflow Health")
-    df = run_query("""
-        SELECT conclusion, COUNT(*) AS total
-        FROM workflow_runs_processed
-        GROUP BY conclusion;
-    """)
+    df = load_view("workflow_conclusions", window_days)
     st.bar_chart(df.set_index("conclusion"))
 
 st.success("✅ Dashboard ready")
@@ -123,28 +185,31 @@ from datetime import datetime, timedelta
 
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
-import boto3
 from datetime import datetime
 
-# Initialize S3 client
-s3 = boto3.client("s3", region_name=os.getenv("AWS_REGION"))
 S3_BUCKET = "codesense360-data"
-INSIGHT_PREFIX = "weekly_insights/"
+
+
+@st.cache_resource
+def get_insight_manifest():
+    """Weekly-insight manifest shared by every session; re-validated with a conditional GET."""
+    return InsightManifest(s3, S3_BUCKET, check_every=cache_config.get("version_check_seconds", 60))
+
+
+@st.cache_data(ttl=86400)
+def read_insight(key, timestamp):
+    # timestamp is part of the cache key: a same-day regeneration is fetched again
+    return json.loads(s3.get_object(Bucket=S3_BUCKET, Key=key)["Body"].read().decode("utf-8"))
+
 
 def load_latest_insight_from_s3():
-    """Fetch the most recent AI insight JSON from S3."""
+    """Fetch the most recent AI insight JSON via the manifest's latest pointer."""
     try:
-        # List all files under weekly_insights/
-        response = s3.list_objects_v2(Bucket=S3_BUCKET, Prefix=INSIGHT_PREFIX)
-        if "Contents" not in response:
+        latest = get_insight_manifest().latest()
+        if not latest:
             st.warning("No weekly insights found yet.")
             return None
-
-        # Sort by LastModified
-        latest = sorted(response["Contents"], key=lambda x: x["LastModified"], reverse=True)[0]
-        obj = s3.get_object(Bucket=S3_BUCKET, Key=latest["Key"])
-        content = json.loads(obj["Body"].read().decode("utf-8"))
-        return content
+        return read_insight(latest["key"], latest["timestamp"])
     except Exception as e:
         st.error(f"⚠️ Could not load insights: {e}")
         return None
@@ -163,36 +228,28 @@ def show_weekly_insight():
     st.caption(f"🕒 Generated on {timestamp.strftime('%b %d, %Y %H:%M UTC')}")
     st.markdown(content["insights"])
 
+    # Earlier weeks come straight from the manifest's dated history (no listing)
+    weeks = st.slider("Weeks of history", min_value=1, max_value=12, value=4)
+    with st.expander("📚 Previous weekly summaries"):
+        for entry in reversed(get_insight_manifest().last_weeks(weeks)):
+            st.markdown(f"**Week of {entry['week']}**")
+            st.markdown(read_insight(entry["key"], entry["timestamp"])["insights"])
+
     # Optional: provide manual refresh
     if st.button("🔄 Refresh from S3"):
+        get_insight_manifest().refresh(force=True)
         st.rerun()
 
 def generate_ai_insights():
     """Auto-generate and persist AI-driven insights."""
     st.subheader("🤖 AI Insights")
 
-    # Load current metrics from Athena
-    commits_df = run_query("""
-        SELECT author_login AS author, COUNT(*) AS commits
-        FROM commits_processed
-        WHERE author_login IS NOT NULL
-        GROUP BY author
-        ORDER BY commits DESC
-        LIMIT 10;
-    """)
-
-    pr_df = run_query("""
-        SELECT author, total_prs, merged_prs, avg_review_time_hours
-        FROM author_pr_summary
-        ORDER BY merged_prs DESC
-        LIMIT 10;
-    """)
-
-    cicd_df = run_query("""
-        SELECT conclusion, COUNT(*) AS total
-        FROM workflow_runs_processed
-        GROUP BY conclusion;
-    """)
+    # Load current metrics from Athena (this week's data on the Parquet layout)
+    commits_df, pr_df, cicd_df = run_queries(
+        commits_by_author(processed_format, days=7),
+        author_pr_summary(processed_format, days=7, limit=10),
+        workflow_conclusions(processed_format, days=7),
+    )
 
     # Use previous summary if available
     insights_cache = "dashboard/insights_cache.json"
@@ -0,0 +1,150 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from query_cache import cache_key, start_query_execution
+
+# Queries in flight per executor (Athena's default account quota is 20-25 concurrent DML queries)
+MAX_CONCURRENCY = int(os.getenv("ATHENA_MAX_CONCURRENCY", "5"))
+QUERY_TIMEOUT_SECONDS = float(os.getenv("ATHENA_QUERY_TIMEOUT_SECONDS", "300"))
+
+# get_query_execution backoff: first poll after POLL_INITIAL seconds, doubling up to POLL_MAX
+POLL_INITIAL = 0.2
+POLL_MAX = 5.0
+
+TERMINAL_STATES = ("SUCCEEDED", "FAILED", "CANCELLED")
+
+
+class AthenaQueryError(RuntimeError):
+    """An Athena query finished in FAILED or CANCELLED."""
+
+    def __init__(self, query_id, state, reason=""):
+        super().__init__(f"Athena query {query_id} {state}: {reason}".rstrip(": "))
+        self.query_id = query_id
+        self.state = state
+        self.reason = reason
+
+
+class AthenaExecutor:
+    """Submit many Athena queries at once and get futures back.
+
+    Each query is started immediately and polled with exponential backoff (plus
+    jitter) instead of a tight loop. Queries exceeding `timeout` are stopped and
+    raise TimeoutError; cancel(future) stops a running query. `fetch_results(query_id,
+    execution)` turns a finished execution into a DataFrame. With a QueryCache,
+    hits come back as already-completed futures and never reach Athena.
+    """
+
+    def __init__(
+        self,
+        athena,
+        database,
+        output_location,
+        fetch_results,
+        max_concurrency=MAX_CONCURRENCY,
+        timeout=QUERY_TIMEOUT_SECONDS,
+        reuse_minutes=0,
+        cache=None,
+        data_version=None,
+    ):
+        self.athena = athena
+        self.database = database
+        self.output_location = output_location
+        self.fetch_results = fetch_results
+        self.timeout = timeout
+        self.reuse_minutes = reuse_minutes
+        self.cache = cache
+        self.data_version = data_version
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="athena")
+        self._running = {}  # future → {"id": query execution id, "cancelled": bool}
+        self._lock = threading.Lock()
+
+    def submit(self, sql, timeout=None):
+        """Start `sql` and return a Future of its DataFrame."""
+        key = None
+        if self.cache is not None:
+            key = cache_key(sql, self.data_version() if self.data_version else "unversioned")
+            df = self.cache.get(key)
+            if df is not None:
+                future = Future()
+                future.set_result(df.copy())
+                return future
+
+        handle = {"id": None, "cancelled": False}
+        future = self._pool.submit(self._run, sql, handle, key, timeout or self.timeout)
+        with self._lock:
+            self._running[future] = handle
+        future.add_done_callback(self._forget)
+        return future
+
+    def map(self, sqls, timeout=None):
+        return [self.submit(sql, timeout) for sql in sqls]
+
+    def run_all(self, sqls, timeout=None):
+        """Run queries concurrently; results in input order (wall time ≈ the slowest query)."""
+        return [future.result() for future in self.map(sqls, timeout)]
+
+    def execute(self, sql, timeout=None):
+        return self.submit(sql, timeout).result()
+
+    def cancel(self, future):
+        """Cancel a pending future, or stop its Athena query if it's already running."""
+        if future.cancel():
+            return True
+        with self._lock:
+            handle = self._running.get(future)
+        if handle is None:
+            return False
+        handle["cancelled"] = True
+        if handle["id"]:
+            self._stop(handle["id"])
+        return True
+
+    def shutdown(self, cancel_running=False):
+        if cancel_running:
+            with self._lock:
+                futures = list(self._running)
+            for future in futures:
+                self.cancel(future)
+        self._pool.shutdown(wait=not cancel_running)
+
+    def _forget(self, future):
+        with self._lock:
+            self._running.pop(future, None)
+
+    def _stop(self, query_id):
+        try:
+            self.athena.stop_query_execution(QueryExecutionId=query_id)
+        except Exception as e:
+            print(f"⚠️ Could not stop Athena query {query_id}: {e}")
+
+    def _run(self, sql, handle, key, timeout):
+        deadline = time.monotonic() + timeout
+        response = start_query_execution(
+            self.athena, sql, self.database, self.output_location, reuse_minutes=self.reuse_minutes
+        )
+        query_id = handle["id"] = response["QueryExecutionId"]
+        if handle["cancelled"]:
+            self._stop(query_id)
+
+        delay = POLL_INITIAL
+        while True:
+            execution = self.athena.get_query_execution(QueryExecutionId=query_id)["QueryExecution"]
+            status = execution["Status"]
+            if status["State"] in TERMINAL_STATES:
+                break
+            if time.monotonic() >= deadline:
+                self._stop(query_id)
+                raise TimeoutError(f"Athena query {query_id} exceeded {timeout:g}s and was stopped")
+            time.sleep(min(delay, max(deadline - time.monotonic(), 0)) * random.uniform(0.8, 1.2))
+            delay = min(delay * 2, POLL_MAX)
+
+        if status["State"] != "SUCCEEDED":
+            raise AthenaQueryError(query_id, status["State"], status.get("StateChangeReason", ""))
+
+        df = self.fetch_results(query_id, execution)
+        if key is not None and df is not None and not df.empty:
+            self.cache.put(key, df)
+            df = df.copy()
+        return df
@@ -0,0 +1,83 @@
+import os
+from urllib.parse import urlparse
+import pandas as pd
+
+# Results up to this size are paged through get_query_results (NextToken); larger
+# ones are streamed from the S3 result CSV in row chunks instead
+PAGED_RESULT_MAX_BYTES = int(os.getenv("ATHENA_PAGED_RESULT_MAX_BYTES", str(1024 * 1024)))
+CSV_CHUNK_ROWS = int(os.getenv("ATHENA_CSV_CHUNK_ROWS", "50000"))
+
+# Athena column types (ResultSetMetadata.ColumnInfo[].Type) → how the column is converted
+INTEGER_TYPES = {"tinyint", "smallint", "integer", "int", "bigint"}
+FLOAT_TYPES = {"double", "float", "real", "decimal"}
+DATETIME_TYPES = {"date", "timestamp", "timestamp with time zone"}
+
+
+def column_info(athena, query_id):
+    """Column names and Athena types of a finished query (one cheap results call)."""
+    result = athena.get_query_results(QueryExecutionId=query_id, MaxResults=1)
+    return result["ResultSet"]["ResultSetMetadata"]["ColumnInfo"]
+
+
+def apply_types(df, columns):
+    """Convert the string columns of a result chunk to the types Athena reported."""
+    for info in columns:
+        name, kind = info["Name"], info["Type"].lower()
+        if name not in df:
+            continue
+        if kind in INTEGER_TYPES:
+            df[name] = pd.to_numeric(df[name], errors="coerce").astype("Int64")
+        elif kind in FLOAT_TYPES:
+            df[name] = pd.to_numeric(df[name], errors="coerce").astype("float64")
+        elif kind == "boolean":
+            df[name] = df[name].map({"true": True, "false": False}).astype("boolean")
+        elif kind in DATETIME_TYPES:
+            df[name] = pd.to_datetime(df[name], errors="coerce", utc=kind.endswith("zone"))
+    return df
+
+
+def iter_paged_results(athena, query_id, page_size=1000):
+    """Yield one typed DataFrame per get_query_results page, following NextToken."""
+    paginator = athena.get_paginator("get_query_results")
+    columns = None
+    for page_number, page in enumerate(
+        paginator.paginate(QueryExecutionId=query_id, PaginationConfig={"PageSize": page_size})
+    ):
+        columns = columns or page["ResultSet"]["ResultSetMetadata"]["ColumnInfo"]
+        rows = page["ResultSet"]["Rows"]
+        if page_number == 0:
+            rows = rows[1:]  # header row
+        # Missing VarCharValue means SQL NULL
+        data = [[cell.get("VarCharValue") for cell in row["Data"]] for row in rows]
+        yield apply_types(pd.DataFrame(data, columns=[c["Name"] for c in columns]), columns)
+
+
+def iter_csv_results(s3, output_location, columns, chunk_rows=CSV_CHUNK_ROWS):
+    """Yield typed DataFrame chunks read straight from the S3 result object's stream."""
+    location = urlparse(output_location)
+    body = s3.get_object(Bucket=location.netloc, Key=location.path.lstrip("/"))["Body"]
+    for chunk in pd.read_csv(body, dtype=str, chunksize=chunk_rows):
+        yield apply_types(chunk, columns)
+
+
+def iter_query_results(athena, s3, query_id, execution, chunk_rows=CSV_CHUNK_ROWS):
+    """Yield a finished query's rows as typed DataFrame chunks.
+
+    Small results are paged through the API; large ones are streamed from S3 in
+    `chunk_rows` slices, so neither path holds the raw result text in memory.
+    """
+    output_location = execution["ResultConfiguration"]["OutputLocation"]
+    location = urlparse(output_location)
+    size = s3.head_object(Bucket=location.netloc, Key=location.path.lstrip("/"))["ContentLength"]
+    if size <= PAGED_RESULT_MAX_BYTES:
+        yield from iter_paged_results(athena, query_id)
+    else:
+        yield from iter_csv_results(s3, output_location, column_info(athena, query_id), chunk_rows)
+
+
+def read_query_results(athena, s3, query_id, execution):
+    """All rows of a finished query as one typed DataFrame (no row limit)."""
+    chunks = list(iter_query_results(athena, s3, query_id, execution))
+    if not chunks:
+        return pd.DataFrame()
+    return pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
@@ -0,0 +1,11 @@
+import os
+import sys
+
+# The dashboard and weekly insights run with dashboard/ on sys.path; put the repo root
+# there too so they share the pipeline's client layer (src/clients.py): pooled
+# keep-alive sessions, timeouts, jittered retries and sized boto3 connection pools.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+from src.clients import get_client, get_session  # noqa: E402
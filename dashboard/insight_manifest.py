@@ -0,0 +1,135 @@
+import bisect
+import json
+import threading
+import time
+from datetime import date, datetime, timedelta
+from botocore.exceptions import ClientError
+
+INSIGHT_PREFIX = "weekly_insights/"
+
+# Written by weekly_ai_insights.py next to the insights:
+#   {"latest": entry, "history": [entry, ...sorted by date], "updated_at": ...}
+#   entry = {"key", "date": "YYYY-MM-DD", "week": "YYYY-MM-DD" (Monday), "timestamp"}
+MANIFEST_KEY = f"{INSIGHT_PREFIX}_manifest.json"
+
+
+def week_start(day):
+    """Monday of the week containing `day` (date or YYYY-MM-DD)."""
+    if isinstance(day, str):
+        day = date.fromisoformat(day[:10])
+    return day - timedelta(days=day.weekday())
+
+
+def _entry(key, timestamp):
+    day = timestamp[:10]
+    return {"key": key, "date": day, "week": week_start(day).isoformat(), "timestamp": timestamp}
+
+
+def _empty():
+    return {"latest": None, "history": []}
+
+
+def _read(s3, bucket, key=MANIFEST_KEY):
+    try:
+        return json.loads(s3.get_object(Bucket=bucket, Key=key)["Body"].read().decode("utf-8"))
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+            return None
+        raise
+
+
+def _write(s3, bucket, manifest, key=MANIFEST_KEY):
+    manifest["updated_at"] = datetime.utcnow().isoformat()
+    s3.put_object(Bucket=bucket, Key=key, Body=json.dumps(manifest, indent=2), ContentType="application/json")
+
+
+def rebuild_manifest(s3, bucket):
+    """Build the manifest from a full listing (first run, or to repair it); every insight object is read once."""
+    manifest = _empty()
+    paginator = s3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=INSIGHT_PREFIX):
+        for obj in page.get("Contents", []):
+            if obj["Key"] == MANIFEST_KEY or not obj["Key"].endswith(".json"):
+                continue
+            content = json.loads(s3.get_object(Bucket=bucket, Key=obj["Key"])["Body"].read().decode("utf-8"))
+            _add(manifest, _entry(obj["Key"], content.get("timestamp") or obj["LastModified"].isoformat()))
+    return manifest
+
+
+def _add(manifest, entry):
+    history = [e for e in manifest["history"] if e["key"] != entry["key"]]
+    history.append(entry)
+    history.sort(key=lambda e: (e["date"], e["timestamp"]))
+    manifest["history"] = history
+    manifest["latest"] = history[-1]
+
+
+def record_insight(s3, bucket, key, timestamp):
+    """Add a freshly written insight to the manifest and point "latest" at the newest one.
+
+    The weekly job is the only writer, so a plain read-modify-write is enough.
+    """
+    manifest = _read(s3, bucket) or rebuild_manifest(s3, bucket)
+    _add(manifest, _entry(key, timestamp))
+    _write(s3, bucket, manifest)
+    print(f"🗂️ Manifest updated: latest → {key} ({len(manifest['history'])} insights)")
+    return manifest
+
+
+class InsightManifest:
+    """Dashboard-side manifest cached by ETag.
+
+    `refresh()` is one conditional GET (If-None-Match): an unchanged manifest
+    answers 304 with no body, so most renders cost a round trip and nothing else.
+    Checks happen at most every `check_every` seconds.
+    """
+
+    def __init__(self, s3, bucket, key=MANIFEST_KEY, check_every=60):
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = key
+        self.check_every = check_every
+        self.etag = None
+        self.manifest = _empty()
+        self._dates = []
+        self._checked_at = 0.0
+        self._rebuilt = False
+        self._lock = threading.Lock()
+
+    def refresh(self, force=False):
+        with self._lock:
+            if not force and self._checked_at and time.time() - self._checked_at <= self.check_every:
+                return self.manifest
+            kwargs = {"IfNoneMatch": self.etag} if self.etag else {}
+            try:
+                obj = self.s3.get_object(Bucket=self.bucket, Key=self.key, **kwargs)
+                self.manifest = json.loads(obj["Body"].read().decode("utf-8"))
+                self.etag = obj["ETag"]
+                self._dates = [e["date"] for e in self.manifest["history"]]
+            except ClientError as e:
+                code = e.response["Error"]["Code"]
+                if code in ("NoSuchKey", "404") and not self._rebuilt:
+                    # Insights written before the manifest existed: index them in memory (one listing)
+                    self.manifest = rebuild_manifest(self.s3, self.bucket)
+                    self._dates = [e["date"] for e in self.manifest["history"]]
+                    self._rebuilt = True
+                elif code not in ("304", "NotModified", "NoSuchKey", "404"):
+                    raise
+            self._checked_at = time.time()
+            return self.manifest
+
+    def latest(self):
+        return self.refresh()["latest"]
+
+    def between(self, start, end):
+        """Entries dated within [start, end] (dates or YYYY-MM-DD), oldest first."""
+        self.refresh()
+        start, end = str(start)[:10], str(end)[:10]
+        lo = bisect.bisect_left(self._dates, start)
+        hi = bisect.bisect_right(self._dates, end)
+        return self.manifest["history"][lo:hi]
+
+    def last_weeks(self, weeks, today=None):
+        """Entries from the last `weeks` weeks, including the current one."""
+        start = week_start(today or date.today()) - timedelta(weeks=weeks - 1)
+        return self.between(start, "9999-12-31")
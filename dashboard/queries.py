@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+
+# Athena tables per processed layout (see athena/*.sql). The Parquet tables are
+# partitioned by dt, so every query filters on the requested time window.
+TABLES = {
+    "csv": {
+        "commits": "commits_processed",
+        "pull_requests": "pull_requests_processed",
+        "workflow_runs": "workflow_runs_processed",
+    },
+    "parquet": {
+        "commits": "commits_parquet",
+        "pull_requests": "pull_requests_parquet",
+        "workflow_runs": "workflow_runs_parquet",
+    },
+}
+
+# Sidebar choices → days of history (None = everything)
+WINDOWS = {
+    "Last 7 days": 7,
+    "Last 30 days": 30,
+    "Last 90 days": 90,
+    "Last year": 365,
+    "All time": None,
+}
+
+
+def window_predicate(fmt, days):
+    """Partition filter for the last `days` days (TRUE for the unpartitioned CSV tables)."""
+    if fmt != "parquet" or not days:
+        return "TRUE"
+    since = (datetime.utcnow() - timedelta(days=days)).strftime("%Y-%m-%d")
+    return f"dt >= '{since}'"
+
+
+def commits_by_author(fmt="csv", days=None, limit=10):
+    return f"""
+        SELECT author_login AS author, COUNT(*) AS commits
+        FROM {TABLES[fmt]["commits"]}
+        WHERE author_login IS NOT NULL AND {window_predicate(fmt, days)}
+        GROUP BY author_login
+        ORDER BY commits DESC
+        LIMIT {limit};
+    """
+
+
+def pull_requests_by_author(fmt="csv", days=None, limit=10):
+    return f"""
+        SELECT author, COUNT(*) AS total_prs,
+               SUM(CASE WHEN merged THEN 1 ELSE 0 END) AS merged_prs,
+               ROUND(AVG(review_time_hours),2) AS avg_review_time
+        FROM {TABLES[fmt]["pull_requests"]}
+        WHERE {window_predicate(fmt, days)}
+        GROUP BY author
+        ORDER BY merged_prs DESC
+        LIMIT {limit};
+    """
+
+
+def author_pr_summary(fmt="csv", days=None, limit=15):
+    if fmt != "parquet":
+        # Pre-aggregated by the processor on every run
+        return f"""
+            SELECT author, total_prs, merged_prs, avg_review_time_hours, avg_comments
+            FROM author_pr_summary
+            ORDER BY merged_prs DESC
+            LIMIT {limit};
+        """
+    return f"""
+        SELECT author, COUNT(*) AS total_prs,
+               SUM(CASE WHEN merged THEN 1 ELSE 0 END) AS merged_prs,
+               AVG(review_time_hours) AS avg_review_time_hours,
+               AVG(review_comments) AS avg_comments
+        FROM {TABLES[fmt]["pull_requests"]}
+        WHERE {window_predicate(fmt, days)}
+        GROUP BY author
+        ORDER BY merged_prs DESC
+        LIMIT {limit};
+    """
+
+
+def workflow_conclusions(fmt="csv", days=None):
+    return f"""
+        SELECT conclusion, COUNT(*) AS total
+        FROM {TABLES[fmt]["workflow_runs"]}
+        WHERE {window_predicate(fmt, days)}
+        GROUP BY conclusion;
+    """
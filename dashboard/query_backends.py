@@ -0,0 +1,167 @@
+import argparse
+import glob
+import os
+import statistics
+import time
+from concurrent.futures import Future
+import yaml
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.yaml")
+
+# Prefixes mirrored locally for the duckdb engine (same layout as the bucket)
+SYNC_PREFIXES = ("processed/", "processed_parquet/", "rollups/")
+
+# Athena table → files under the data dir (flat and org/repo-partitioned CSV, dt-partitioned Parquet)
+LOCAL_TABLES = {
+    "commits_processed": ["processed/commits_processed.csv", "processed/commits_processed/repo=*/*.csv"],
+    "pull_requests_processed": ["processed/pull_requests_processed.csv", "processed/pull_requests_processed/repo=*/*.csv"],
+    "author_pr_summary": ["processed/author_pr_summary.csv", "processed/author_pr_summary/repo=*/*.csv"],
+    "workflow_runs_processed": ["processed/workflow_runs_processed.csv", "processed/workflow_runs_processed/repo=*/*.csv"],
+    "commits_parquet": ["processed_parquet/commits_processed/repo=*/dt=*/*.parquet"],
+    "pull_requests_parquet": ["processed_parquet/pull_requests_processed/repo=*/dt=*/*.parquet"],
+    "workflow_runs_parquet": ["processed_parquet/workflow_runs_processed/repo=*/dt=*/*.parquet"],
+}
+
+
+def load_config(path=CONFIG_PATH):
+    with open(path, "r") as f:
+        return yaml.safe_load(f)
+
+
+def backend_settings(config):
+    """The query_backend section of config.yaml; QUERY_ENGINE / QUERY_DATA_DIR override it."""
+    settings = dict(config.get("query_backend", {}))
+    settings["engine"] = os.getenv("QUERY_ENGINE", settings.get("engine", "athena"))
+    settings["data_dir"] = os.getenv("QUERY_DATA_DIR", settings.get("data_dir", "data"))
+    return settings
+
+
+def sync_from_s3(s3, bucket, data_dir, prefixes=SYNC_PREFIXES):
+    """Download new or changed processed objects into data_dir (like `aws s3 sync`)."""
+    downloaded = 0
+    paginator = s3.get_paginator("list_objects_v2")
+    for prefix in prefixes:
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                if obj["Key"].endswith("/"):
+                    continue
+                path = os.path.join(data_dir, obj["Key"])
+                if os.path.exists(path) and os.path.getsize(path) == obj["Size"] \
+                        and os.path.getmtime(path) >= obj["LastModified"].timestamp():
+                    continue
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                s3.download_file(bucket, obj["Key"], path)
+                downloaded += 1
+    print(f"🔄 Synced {downloaded} objects from s3://{bucket}/ → {data_dir}")
+    return downloaded
+
+
+class DuckDBBackend:
+    """Runs the dashboard's Athena SQL in-process with DuckDB over local processed files.
+
+    Each Athena table is a view over globs of the matching CSV/Parquet files
+    (hive-style repo=/dt= directories become columns; the flat CSV has a NULL
+    repo), so new partitions show up without a reload. Same submit/map/run_all/execute interface as AthenaExecutor.
+    """
+
+    def __init__(self, data_dir):
+        try:
+            import duckdb
+        except ImportError as e:
+            raise ImportError("query_backend.engine=duckdb needs the duckdb package (pip install duckdb)") from e
+        self.data_dir = data_dir
+        self.tables = []
+        self._con = duckdb.connect()
+        for table, patterns in LOCAL_TABLES.items():
+            # DuckDB rejects globs that match nothing, so only keep patterns with files
+            globs = [os.path.join(data_dir, p) for p in patterns if glob.glob(os.path.join(data_dir, p))]
+            if not globs:
+                continue
+            # One read per layout: DuckDB refuses to mix hive-partitioned and flat files in one scan,
+            # so the flat file gets a NULL repo and the layouts are unioned by column name
+            selects = []
+            for g in globs:
+                reader = "read_parquet" if g.endswith(".parquet") else "read_csv_auto"
+                path = "'" + g.replace("'", "''") + "'"
+                if "repo=" in g:
+                    selects.append(f"SELECT * FROM {reader}({path}, hive_partitioning = true, union_by_name = true)")
+                else:
+                    selects.append(f"SELECT *, NULL::VARCHAR AS repo FROM {reader}({path}, hive_partitioning = false)")
+            self._con.execute(f"CREATE OR REPLACE VIEW {table} AS " + " UNION ALL BY NAME ".join(selects))
+            self.tables.append(table)
+        print(f"🦆 DuckDB backend over {data_dir}: {', '.join(self.tables) or 'no tables found'}")
+
+    def execute(self, sql, timeout=None):
+        # One cursor per query: DuckDB connections aren't shared safely across threads
+        return self._con.cursor().execute(sql.strip().rstrip(";")).df()
+
+    def submit(self, sql, timeout=None):
+        future = Future()
+        try:
+            future.set_result(self.execute(sql))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def map(self, sqls, timeout=None):
+        return [self.submit(sql) for sql in sqls]
+
+    def run_all(self, sqls, timeout=None):
+        return [self.execute(sql) for sql in sqls]
+
+    def shutdown(self, cancel_running=False):
+        self._con.close()
+
+
+def create_backend(settings, make_athena, s3=None, bucket=None):
+    """Build the configured backend; `make_athena()` returns an AthenaExecutor."""
+    if settings["engine"] == "duckdb":
+        if settings.get("sync_from_s3") and s3 is not None:
+            sync_from_s3(s3, bucket, settings["data_dir"])
+        return DuckDBBackend(settings["data_dir"])
+    if settings["engine"] != "athena":
+        raise ValueError(f"Unknown query_backend.engine: {settings['engine']}")
+    return make_athena()
+
+
+def benchmark(backend, sqls, runs=20):
+    """Time each query `runs` times; returns {sql: (p50 ms, p95 ms)}."""
+    timings = {}
+    for sql in sqls:
+        samples = []
+        try:
+            for _ in range(runs):
+                start = time.perf_counter()
+                backend.execute(sql)
+                samples.append((time.perf_counter() - start) * 1000)
+        except Exception as e:
+            print(f"⚠️ Skipping query: {e}")
+            continue
+        samples.sort()
+        timings[sql] = (statistics.median(samples), samples[int(len(samples) * 0.95) - 1])
+    return timings
+
+
+if __name__ == "__main__":
+    # Local load test of the dashboard queries, e.g.
+    #   QUERY_DATA_DIR=data python dashboard/query_backends.py --runs 50
+    from queries import WINDOWS, author_pr_summary, commits_by_author, pull_requests_by_author, workflow_conclusions
+
+    parser = argparse.ArgumentParser(description="Benchmark dashboard queries on the DuckDB backend")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--sync", action="store_true", help="sync processed files from S3 first")
+    args = parser.parse_args()
+
+    config = load_config()
+    settings = backend_settings(config)
+    if args.sync:
+        from clients import get_client
+        sync_from_s3(get_client("s3", config["aws"]["region"]), config["aws"]["bucket"], settings["data_dir"])
+
+    fmt = config["aws"].get("processed_format", "csv")
+    backend = DuckDBBackend(settings["data_dir"])
+    sqls = []
+    for days in set(WINDOWS.values()):
+        sqls += [builder(fmt, days) for builder in (commits_by_author, pull_requests_by_author, author_pr_summary, workflow_conclusions)]
+    for sql, (p50, p95) in benchmark(backend, sqls, args.runs).items():
+        print(f"⏱️ p50 {p50:7.1f} ms  p95 {p95:7.1f} ms  {' '.join(sql.split())[:90]}")
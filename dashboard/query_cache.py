@@ -0,0 +1,118 @@
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from botocore.exceptions import ParamValidationError
+
+# Written by the processors after every save; its ETag is the processed data version
+DATA_VERSION_KEY = "processed/_version.json"
+
+
+def normalize_sql(sql):
+    """Collapse whitespace and drop the trailing semicolon so cosmetic edits share a cache entry."""
+    return re.sub(r"\s+", " ", sql).strip().rstrip(";").strip()
+
+
+def cache_key(sql, data_version):
+    return hashlib.sha256(f"{normalize_sql(sql)}\n{data_version}".encode("utf-8")).hexdigest()
+
+
+def result_reuse_config(max_age_minutes):
+    """Athena ResultReuseConfiguration: identical SQL within the window returns the stored result, no scan."""
+    return {"ResultReuseByAgeConfiguration": {"Enabled": True, "MaxAgeInMinutes": int(max_age_minutes)}}
+
+
+def start_query_execution(athena, sql, database, output_location, reuse_minutes=0):
+    """start_query_execution with result reuse when enabled and supported by the installed botocore."""
+    kwargs = {
+        "QueryString": sql,
+        "QueryExecutionContext": {"Database": database},
+        "ResultConfiguration": {"OutputLocation": output_location},
+    }
+    if reuse_minutes:
+        try:
+            return athena.start_query_execution(ResultReuseConfiguration=result_reuse_config(reuse_minutes), **kwargs)
+        except ParamValidationError:
+            print("ℹ️ Athena result reuse not supported by this botocore; running without it")
+    return athena.start_query_execution(**kwargs)
+
+
+class QueryCache:
+    """Thread-safe LRU cache of query results with a TTL.
+
+    Keys combine the normalized SQL with the processed data version, so new data
+    invalidates entries immediately while unchanged data is served from memory.
+    One instance is shared by every dashboard session (st.cache_resource) and can
+    be reused as-is by the weekly insights job.
+    """
+
+    def __init__(self, max_entries=128, ttl_seconds=900):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry[0] > self.ttl_seconds:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_or_run(self, sql, run, data_version="unversioned"):
+        """Return the cached DataFrame for `sql`, calling `run(sql)` on a miss."""
+        key = cache_key(sql, data_version)
+        df = self.get(key)
+        if df is None:
+            df = run(sql)
+            if df is not None and not df.empty:
+                self.put(key, df)
+        # Callers may mutate the frame (set_index, etc.); never hand out the cached object
+        return df.copy() if df is not None else df
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class DataVersion:
+    """ETag of the processed-data marker, re-checked at most every `check_every` seconds."""
+
+    def __init__(self, s3, bucket, key=DATA_VERSION_KEY, check_every=60):
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = key
+        self.check_every = check_every
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self):
+        with self._lock:
+            if self._version is None or time.time() - self._checked_at > self.check_every:
+                try:
+                    self._version = self.s3.head_object(Bucket=self.bucket, Key=self.key)["ETag"]
+                except Exception:
+                    # No marker yet (or no access): fall back to TTL-only invalidation
+                    self._version = "unversioned"
+                self._checked_at = time.time()
+            return self._version
@@ -0,0 +1,125 @@
+import json
+import os
+from datetime import datetime, timedelta
+import pandas as pd
+
+# Written by src/process/rollups.py: rollups/<rollup>/<repo>/{daily/YYYY-MM,weekly/YYYY,total}.json
+ROLLUP_PREFIX = "rollups/"
+
+# Windows up to this many days read daily rows; longer ones read weekly rows
+DAILY_MAX_DAYS = 31
+
+
+class RollupStore:
+    """Reads rollup objects from S3, or from a local mirror of the bucket (data_dir)."""
+
+    def __init__(self, s3=None, bucket=None, data_dir=None):
+        self.s3 = s3
+        self.bucket = bucket
+        self.data_dir = data_dir
+
+    def repos(self, rollup):
+        prefix = f"{ROLLUP_PREFIX}{rollup}/"
+        if self.data_dir:
+            path = os.path.join(self.data_dir, prefix)
+            return sorted(os.listdir(path)) if os.path.isdir(path) else []
+        repos = []
+        paginator = self.s3.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix, Delimiter="/"):
+            repos += [p["Prefix"][len(prefix):].rstrip("/") for p in page.get("CommonPrefixes", [])]
+        return repos
+
+    def read(self, key):
+        if self.data_dir:
+            path = os.path.join(self.data_dir, key)
+            if not os.path.exists(path):
+                return []
+            with open(path, "r") as f:
+                return json.load(f)
+        try:
+            obj = self.s3.get_object(Bucket=self.bucket, Key=key)
+        except self.s3.exceptions.NoSuchKey:
+            return []
+        return json.loads(obj["Body"].read().decode("utf-8"))
+
+
+def _periods(days, today):
+    """Object names and row filter covering the last `days` days."""
+    since = today - timedelta(days=days)
+    if days <= DAILY_MAX_DAYS:
+        months = pd.period_range(since, today, freq="M").strftime("%Y-%m")
+        return "daily", list(months), "day", since.strftime("%Y-%m-%d")
+    week_start = since - timedelta(days=since.weekday())
+    years = [str(year) for year in range(since.year, today.year + 1)]
+    return "weekly", years, "week", week_start.strftime("%Y-%m-%d")
+
+
+def load_rollup(store, rollup, dims, days=None, today=None):
+    """Rows of a rollup for the window, summed across repos and periods by `dims`."""
+    rows = []
+    for repo in store.repos(rollup):
+        base = f"{ROLLUP_PREFIX}{rollup}/{repo}/"
+        if not days:
+            rows += store.read(f"{base}total.json")
+            continue
+        grain, periods, period_col, since = _periods(days, today or datetime.utcnow())
+        for period in periods:
+            rows += [row for row in store.read(f"{base}{grain}/{period}.json") if row[period_col] >= since]
+    if not rows:
+        return pd.DataFrame()
+    df = pd.DataFrame(rows)
+    measures = [c for c in df.columns if c not in ("day", "week", *dims)]
+    return df.groupby(dims, as_index=False)[measures].sum()
+
+
+def _pr_counts(df):
+    df["merged_prs"] = df["merged_prs"].round().astype("int64")
+    return df
+
+
+def _mean(df, column):
+    return df[f"{column}_sum"] / df[f"{column}_count"].where(df[f"{column}_count"] > 0)
+
+
+# Same columns as the SQL in queries.py, so the views render either source unchanged
+def commits_by_author(store, days=None, limit=10):
+    df = load_rollup(store, "commits_by_author", ["author"], days)
+    if df.empty:
+        return df
+    return df[["author", "commits"]].sort_values("commits", ascending=False).head(limit)
+
+
+def pull_requests_by_author(store, days=None, limit=10):
+    df = load_rollup(store, "pull_requests_by_author", ["author"], days)
+    if df.empty:
+        return df
+    df = _pr_counts(df)
+    df["avg_review_time"] = _mean(df, "review_time_hours").round(2)
+    df = df[["author", "total_prs", "merged_prs", "avg_review_time"]]
+    return df.sort_values("merged_prs", ascending=False).head(limit)
+
+
+def author_pr_summary(store, days=None, limit=15):
+    df = load_rollup(store, "pull_requests_by_author", ["author"], days)
+    if df.empty:
+        return df
+    df = _pr_counts(df)
+    df["avg_review_time_hours"] = _mean(df, "review_time_hours")
+    df["avg_comments"] = _mean(df, "review_comments")
+    df = df[["author", "total_prs", "merged_prs", "avg_review_time_hours", "avg_comments"]]
+    return df.sort_values("merged_prs", ascending=False).head(limit)
+
+
+def workflow_conclusions(store, days=None):
+    df = load_rollup(store, "workflow_conclusions", ["conclusion"], days)
+    if df.empty:
+        return df
+    return df[["conclusion", "total"]]
+
+
+VIEWS = {
+    "commits_by_author": commits_by_author,
+    "pull_requests_by_author": pull_requests_by_author,
+    "author_pr_summary": author_pr_summary,
+    "workflow_conclusions": workflow_conclusions,
+}
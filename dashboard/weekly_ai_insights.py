@@ -1,65 +1,57 @@
 import os, json
-import boto3
-import pandas as pd
 from datetime import datetime
 from openai import OpenAI
+from queries import author_pr_summary, commits_by_author, workflow_conclusions
+from athena_executor import AthenaExecutor
+from athena_results import read_query_results
+from clients import get_client, get_session
+from insight_manifest import INSIGHT_PREFIX, record_insight
+from query_backends import backend_settings, create_backend, load_config
+from query_cache import DataVersion, QueryCache
 
 # Initialize clients
-athena = boto3.client("athena", region_name=os.getenv("AWS_REGION"))
-s3 = boto3.client("s3", region_name=os.getenv("AWS_REGION"))
+athena = get_client("athena", os.getenv("AWS_REGION"))
+s3 = get_client("s3", os.getenv("AWS_REGION"))
 openai = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 ATHENA_DB = "codesense360_db"
 S3_OUTPUT = "s3://codesense360-data/athena-results/"
 S3_BUCKET = "codesense360-data"
-
-def run_query(query):
-    """Run Athena query and return DataFrame."""
-    response = athena.start_query_execution(
-        QueryString=query,
-        QueryExecutionContext={"Database": ATHENA_DB},
-        ResultConfiguration={"OutputLocation": S3_OUTPUT},
+PROCESSED_FORMAT = os.getenv("PROCESSED_FORMAT", "csv")  # csv | parquet (same setting as ingest)
+
+# Same QueryCache as the dashboard; lets a warm process (or a caller passing its own
+# QueryCache) skip Athena for queries already answered on the current data version
+ATHENA_RESULT_REUSE_MINUTES = int(os.getenv("ATHENA_RESULT_REUSE_MINUTES", "60"))
+QUERY_CACHE = QueryCache(ttl_seconds=int(os.getenv("QUERY_CACHE_TTL_SECONDS", "900")))
+DATA_VERSION = DataVersion(s3, S3_BUCKET)
+
+def _fetch_results(exec_id, execution):
+    # Every page (not just the first 1,000 rows), typed from ResultSetMetadata
+    return read_query_results(athena, s3, exec_id, execution)
+
+def _athena_executor():
+    return AthenaExecutor(
+        athena, ATHENA_DB, S3_OUTPUT, _fetch_results,
+        reuse_minutes=ATHENA_RESULT_REUSE_MINUTES,
+        cache=QUERY_CACHE,
+        data_version=DATA_VERSION.current,
     )
-    exec_id = response["QueryExecutionId"]
-
-    # Wait for completion
-    while True:
-        res = athena.get_query_execution(QueryExecutionId=exec_id)
-        state = res["QueryExecution"]["Status"]["State"]
-        if state in ["SUCCEEDED", "FAILED", "CANCELLED"]:
-            break
 
-    if state != "SUCCEEDED":
-        raise Exception(f"Athena query failed: {state}")
+# Athena by default; query_backend.engine: duckdb in config.yaml runs the same SQL locally
+EXECUTOR = create_backend(backend_settings(load_config()), _athena_executor, s3=s3, bucket=S3_BUCKET)
 
-    result = athena.get_query_results(QueryExecutionId=exec_id)
-    cols = [col["Label"] for col in result["ResultSet"]["ResultSetMetadata"]["ColumnInfo"]]
-    rows = [r["Data"] for r in result["ResultSet"]["Rows"][1:]]
-    data = [[c.get("VarCharValue", "") for c in row] for row in rows]
-    return pd.DataFrame(data, columns=cols)
+def run_query(query):
+    """Run Athena query and return DataFrame (served from the query cache when possible)."""
+    return EXECUTOR.execute(query)
 
 def generate_summary():
-    commits_df = run_query("""
-        SELECT author_login, COUNT(*) AS commits
-        FROM commits_processed
-        WHERE author_login IS NOT NULL
-        GROUP BY author_login
-        ORDER BY commits DESC
-        LIMIT 10;
-    """)
-
-    pr_df = run_query("""
-        SELECT author, total_prs, merged_prs, avg_review_time_hours
-        FROM author_pr_summary
-        ORDER BY merged_prs DESC
-        LIMIT 10;
-    """)
-
-    cicd_df = run_query("""
-        SELECT conclusion, COUNT(*) AS total
-        FROM workflow_runs_processed
-        GROUP BY conclusion;
-    """)
+    # On the Parquet layout only the last week's partitions are scanned; the three
+    # queries run concurrently, so this takes about as long as the slowest one
+    commits_df, pr_df, cicd_df = EXECUTOR.run_all([
+        commits_by_author(PROCESSED_FORMAT, days=7),
+        author_pr_summary(PROCESSED_FORMAT, days=7, limit=10),
+        workflow_conclusions(PROCESSED_FORMAT, days=7),
+    ])
 
     prompt = f"""
     You are an engineering analytics assistant.
@@ -81,8 +73,6 @@ def generate_summary():
     print("✅ Weekly AI Insights Generated:\n", insights)
     return insights
 
-import requests
-
 def post_to_teams(insights_text):
     """Send insights to Microsoft Teams using Adaptive Card format."""
     webhook_url = os.getenv("TEAMS_WEBHOOK_URL")
@@ -123,7 +113,7 @@ def post_to_teams(insights_text):
     }
 
     try:
-        response = requests.post(webhook_url, json=payload)
+        response = get_session("teams", pool_size=1).post(webhook_url, json=payload)
         if response.status_code == 200:
             print("✅ Posted rich adaptive card to Microsoft Teams.")
         else:
@@ -137,15 +127,19 @@ def post_to_teams(insights_text):
 if __name__ == "__main__":
     insights = generate_summary()
 
-    output_key = f"weekly_insights/insight_{datetime.utcnow().strftime('%Y%m%d')}.json"
+    timestamp = datetime.utcnow().isoformat()
+    output_key = f"{INSIGHT_PREFIX}insight_{timestamp[:10].replace('-', '')}.json"
     s3.put_object(
         Bucket=S3_BUCKET,
         Key=output_key,
-        Body=json.dumps({"timestamp": datetime.utcnow().isoformat(), "insights": insights}, indent=2),
+        Body=json.dumps({"timestamp": timestamp, "insights": insights}, indent=2),
         ContentType="application/json"
     )
     print(f"📦 Saved to s3://{S3_BUCKET}/{output_key}")
 
+    # The dashboard reads the manifest (latest pointer + dated history) instead of listing the prefix
+    record_insight(s3, S3_BUCKET, output_key, timestamp)
+
     # Post summary to Teams
     post_to_teams(insights)
 
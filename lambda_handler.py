@@ -1,25 +1,22 @@
 import json
 import logging
+import os
 import traceback
 
 # Configure logging for CloudWatch
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Core imports from your project
+# Core imports from your project (light: no pandas, and no AWS clients until first use)
 try:
-    from src.ingest.github_ingest import (
-        fetch_commits,
-        fetch_pull_requests,
-        fetch_pr_details,
-        save_to_local,
-        upload_to_s3,
-    )
-    from src.process.metrics_processor import (
-        process_commits,
-        process_pull_requests,
-        save_processed,
-    )
+    from src.ingest.github_client import SCHEDULER
+    from src.ingest.github_ingest import PR_BACKEND
+    from src.ingest.backfill import Deadline, continue_in_new_invocation, run_backfill
+    from src.ingest.compaction import COMPACTION_ENABLED, run_compaction
+    from src.ingest.incremental import run_incremental
+    from src.ingest.org_ingest import ingest_org, org_metrics
+    from src.ingest.webhooks import default_batcher, handle_webhook, is_webhook_event
+    from src.pipeline import run_pipeline
 except Exception as import_error:
     logger.error("❌ Module import failed: %s", import_error)
     raise
@@ -29,37 +26,126 @@ def lambda_handler(event, context):
     """Main Lambda entrypoint for CodeSense360 pipeline."""
     logger.info("🚀 CodeSense360 Lambda execution started")
 
+    # "full" refetches the whole window; "incremental" only fetches changes since the last checkpoint;
+    # "org" ingests every repo in event["repos"] / GITHUB_REPOS / GITHUB_ORG;
+    # "backfill" fetches and enriches every PR in resumable slices (see src/ingest/backfill.py);
+    # "webhook" takes a GitHub delivery (detected from its X-GitHub-Event header) and
+    # "webhook_flush" (scheduled) flushes micro-batches that are full or old enough (see src/ingest/webhooks.py);
+    # "compact" dedups new raw batches into the S3 lake (see src/ingest/compaction.py)
+    event = event or {}
+    mode = "webhook" if is_webhook_event(event) else event.get("mode") or os.getenv("INGEST_MODE", "full")
+
+    # Rate-limit waits end before the Lambda timeout (RateLimitExceeded instead of being killed mid-sleep)
+    SCHEDULER.set_deadline(Deadline(context))
+
     try:
-        # Step 1: Fetch GitHub data
-        commits = fetch_commits()
-        prs = fetch_pull_requests()
-        detailed_prs = fetch_pr_details(prs)
-        logger.info("✅ Retrieved %d commits and %d PRs", len(commits), len(detailed_prs))
+        if mode == "webhook":
+            # Validated and spooled without loading pandas; the scheduled webhook_flush processes the batches
+            return handle_webhook(event)
+
+        if mode == "webhook_flush":
+            flushed = default_batcher().flush_due(force=bool(event.get("force")))
+            return {
+                "statusCode": 200,
+                "body": json.dumps({"message": "✅ Webhook batches flushed", "mode": mode, "flushed": flushed}),
+            }
+
+        if mode == "compact":
+            return {
+                "statusCode": 200,
+                "body": json.dumps({"message": "✅ Lake compacted", "mode": mode,
+                                    "compaction": run_compaction(event.get("datasets"))}),
+            }
+
+        # Heavy modules (pandas, processors) load on the first invocation that needs them;
+        # warm invocations find them already imported
+        from src.process.agg_state import AGG_STATE_ENABLED
+        from src.process.lean import lean_enabled, memory_report
 
-        # Step 2: Save locally (Lambda /tmp/ dir is writable)
-        commit_file = save_to_local(commits, "commits.json")
-        pr_file = save_to_local(detailed_prs, "pull_requests_detailed.json")
+        lean = lean_enabled(event.get("processing_mode"))
+        memory_report(reset=True)  # warm containers keep module state
 
-        # Step 3: Upload raw data to S3
-        upload_to_s3(commit_file, s3_folder="github/")
-        upload_to_s3(pr_file, s3_folder="github/")
+        if mode == "org":
+            results = ingest_org(
+                repos=event.get("repos"),
+                org=event.get("org"),
+                pr_backend=event.get("pr_backend") or PR_BACKEND,
+            )
+            failed = sorted(name for name, r in results.items() if "error" in r)
+            logger.info("✅ Org ingest complete: %d repos, %d failed", len(results), len(failed))
+            body = {
+                "message": "✅ CodeSense360 org run complete",
+                "mode": mode,
+                "repos": results,
+                "failed": failed,
+            }
+            if AGG_STATE_ENABLED:
+                # Percentiles and distinct contributors across repos, merged from per-repo sketches
+                body["org_metrics"] = org_metrics([name for name in results if name not in failed])
+            return {
+                "statusCode": 200 if not failed else 207,
+                "body": json.dumps(body, default=str),
+            }
 
-        # Step 4: Process metrics
-        commit_df, commit_metrics = process_commits(commits)
-        pr_df, pr_metrics, author_metrics = process_pull_requests(detailed_prs)
+        if mode == "backfill":
+            # Flush and hand over to a fresh invocation before the time limit; the cursor makes it resumable
+            cursor = run_backfill(
+                backfill_id=event.get("backfill_id", "default"),
+                repos=event.get("repos"),
+                deadline=Deadline(context),
+                restart=bool(event.get("restart")),
+            )
+            done = cursor["phase"] == "done"
+            if not done and context is not None and event.get("continue", True):
+                continue_in_new_invocation(context, event)
+            return {
+                "statusCode": 200 if done else 202,
+                "body": json.dumps({
+                    "message": "✅ Backfill complete" if done else "⏳ Backfill continuing",
+                    "mode": mode,
+                    "cursor": cursor,
+                }, default=str),
+            }
 
-        save_processed(commit_df, "commits_processed")
-        save_processed(pr_df, "pull_requests_processed")
-        save_processed(author_metrics, "author_pr_summary")
+        sources = None
+        if mode == "incremental":
+            # Fetch the delta and merge it into the raw datasets on S3; the pipeline processes the merged sets
+            result = run_incremental()
+            sources = {name: result[name] for name in ("commits", "pull_requests", "workflow_runs")}
+            logger.info(
+                "✅ Merged %d new commits, %d updated PRs and %d new runs",
+                len(result["delta"]["commits"]),
+                len(result["delta"]["pull_requests"]),
+                len(result["delta"]["workflow_runs"]),
+            )
+            del result
+
+        # Commits, PRs and workflow runs run as concurrent branches; within each, pages are processed
+        # as they're fetched (bounded queues) while the raw objects stream to S3
+        metrics, timings = run_pipeline(
+            sources=sources,
+            pr_backend=event.get("pr_backend") or PR_BACKEND,
+            processing_mode="lean" if lean else "full",
+        )
+        fetched = metrics.pop("fetched")
+        if fetched:
+            logger.info("✅ Retrieved %s", fetched)
 
         logger.info("✅ CodeSense360 Lambda run complete")
+        body = {
+            "message": "✅ CodeSense360 Lambda run complete",
+            "mode": mode,
+            **metrics,
+            "timings": timings,
+        }
+        if lean:
+            body["memory"] = memory_report()
+        if COMPACTION_ENABLED:
+            # This run's raw snapshots join the deduplicated history
+            body["compaction"] = run_compaction()
         return {
             "statusCode": 200,
-            "body": json.dumps({
-                "message": "✅ CodeSense360 Lambda run complete",
-                "commit_metrics": commit_metrics,
-                "pr_metrics": pr_metrics
-            }),
+            "body": json.dumps(body, default=str),
         }
 
     except Exception as e:
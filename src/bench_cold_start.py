@@ -0,0 +1,96 @@
+"""Import-time / cold-start benchmark for the Lambda entrypoint.
+
+Each run starts a fresh interpreter (like a cold Lambda) and times:
+  init       importing lambda_handler (what the Lambda init phase pays)
+  first_use  the modules the handler loads lazily (pandas, processors)
+  clients    creating the shared S3 client (boto3 import + client setup; no network)
+
+    python -m src.bench_cold_start --runs 5 --top 10 --max-init-ms 400
+
+With --max-init-ms the script exits 1 when the median init time exceeds the
+budget, so init regressions fail a local check / CI step before deploy.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs inside the fresh interpreter; prints one JSON line of timings (ms)
+PROBE = """
+import json, time
+t0 = time.perf_counter()
+import lambda_handler
+t1 = time.perf_counter()
+import src.process.agg_state, src.process.lean, src.process.metrics_processor, src.process.cicd_metrics_processor
+t2 = time.perf_counter()
+from src.clients import get_client
+get_client("s3")
+t3 = time.perf_counter()
+print(json.dumps({"init": (t1 - t0) * 1000, "first_use": (t2 - t1) * 1000, "clients": (t3 - t2) * 1000}))
+"""
+
+# Placeholders so the import chain doesn't depend on a local .env
+BENCH_ENV = {
+    "GITHUB_TOKEN": "bench",
+    "GITHUB_REPO_OWNER": "bench",
+    "GITHUB_REPO_NAME": "bench",
+    "AWS_REGION": "us-east-1",
+    "AWS_LAMBDA_FUNCTION_NAME": "bench",  # skip .env loading, as in Lambda
+}
+
+
+def run_probe(importtime=False):
+    env = {**BENCH_ENV, **os.environ, "PYTHONPATH": ROOT}
+    cmd = [sys.executable, *(["-X", "importtime"] if importtime else []), "-c", PROBE]
+    result = subprocess.run(cmd, cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    return timings, result.stderr
+
+
+def slowest_imports(importtime_log, top=10):
+    """Top-level modules by cumulative import time, from `python -X importtime` output."""
+    rows = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):  # depth 1 = imported directly by the probe or lambda_handler
+            rows.append((int(cumulative) / 1000, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def benchmark(runs=5, top=10):
+    samples = [run_probe()[0] for _ in range(runs)]
+    report = {
+        stage: {
+            "median_ms": round(statistics.median(s[stage] for s in samples), 1),
+            "min_ms": round(min(s[stage] for s in samples), 1),
+        }
+        for stage in ("init", "first_use", "clients")
+    }
+    _, log = run_probe(importtime=True)
+    return report, slowest_imports(log, top)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure Lambda import/cold-start time locally.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    parser.add_argument("--max-init-ms", type=float, help="fail if the median init time exceeds this")
+    args = parser.parse_args()
+
+    report, slowest = benchmark(args.runs, args.top)
+    print(f"⏱️ Cold start over {args.runs} fresh interpreters:")
+    for stage, stats in report.items():
+        print(f"  {stage:<10} median {stats['median_ms']:>8.1f} ms   min {stats['min_ms']:>8.1f} ms")
+    print("🐢 Slowest imports (cumulative):")
+    for ms, name in slowest:
+        print(f"  {ms:>8.1f} ms  {name}")
+
+    if args.max_init_ms is not None and report["init"]["median_ms"] > args.max_init_ms:
+        print(f"❌ Init {report['init']['median_ms']} ms exceeds the {args.max_init_ms:g} ms budget")
+        sys.exit(1)
@@ -0,0 +1,118 @@
+import os
+import threading
+
+AWS_REGION = os.getenv("AWS_REGION")
+
+# Connections kept per HTTP session and boto3 client. The pipeline runs its three fetch
+# branches at once, each with up to GITHUB_MAX_WORKERS requests in flight.
+POOL_SIZE = int(os.getenv("CLIENT_POOL_SIZE", str(3 * int(os.getenv("GITHUB_MAX_WORKERS", "8")))))
+
+# (connect, read) timeouts in seconds; a stalled connection fails instead of hanging the run
+HTTP_TIMEOUT = (float(os.getenv("HTTP_CONNECT_TIMEOUT", "5")), float(os.getenv("HTTP_READ_TIMEOUT", "30")))
+
+# Retries on connection errors and 5xx responses, with jittered exponential backoff
+# (GitHub 403/429 rate limiting is handled by the RateLimitScheduler, not here)
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+HTTP_BACKOFF_SECONDS = float(os.getenv("HTTP_BACKOFF_SECONDS", "0.5"))
+RETRY_STATUSES = (500, 502, 503, 504)
+
+# Process-wide registry of clients and sessions. Lambda keeps the module (and
+# so these objects) alive between warm invocations; nothing is created until
+# first use, so importing a module never costs a boto3 client.
+_REGISTRY = {}
+_LOCK = threading.Lock()
+
+
+def load_local_env():
+    """Load .env when running locally; Lambda gets its settings from the function config."""
+    if os.getenv("AWS_LAMBDA_FUNCTION_NAME") is None:
+        from dotenv import load_dotenv
+        load_dotenv()
+
+
+def shared(name, factory):
+    """Registry entry `name`, created with `factory()` the first time it's asked for."""
+    value = _REGISTRY.get(name)
+    if value is None:
+        with _LOCK:
+            value = _REGISTRY.get(name)
+            if value is None:
+                value = _REGISTRY[name] = factory()
+    return value
+
+
+def _new_session(pool_size, retry_post=False):
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    # Read timeouts and 5xx are only retried for idempotent methods, plus POST where a
+    # POST is a read (GitHub GraphQL queries); a retried webhook POST would post twice
+    methods = Retry.DEFAULT_ALLOWED_METHODS | {"POST"} if retry_post else Retry.DEFAULT_ALLOWED_METHODS
+    retry = Retry(
+        total=HTTP_RETRIES,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=methods,
+        backoff_factor=HTTP_BACKOFF_SECONDS,
+        backoff_jitter=HTTP_BACKOFF_SECONDS,
+        raise_on_status=False,  # the last 5xx response is returned for raise_for_status()
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    # Every request gets HTTP_TIMEOUT unless the caller passes its own
+    send = session.request
+
+    def request(method, url, **kwargs):
+        kwargs.setdefault("timeout", HTTP_TIMEOUT)
+        return send(method, url, **kwargs)
+
+    session.request = request
+    return session
+
+
+def get_session(name="default", pool_size=POOL_SIZE, retry_post=False):
+    """Shared keep-alive requests.Session with pooled connections, timeouts and retries.
+
+    Only idempotent methods are retried unless `retry_post` (for sessions whose POSTs are reads).
+    """
+    return shared(f"http:{name}", lambda: _new_session(pool_size, retry_post))
+
+
+def get_client(service, region=AWS_REGION):
+    """Shared boto3 client for `service` (boto3 itself is imported on first use).
+
+    Its connection pool matches POOL_SIZE, and it uses the same timeouts and the
+    "standard" retry mode (jittered exponential backoff on throttling and 5xx).
+    """
+    def create():
+        import boto3
+        from botocore.config import Config
+
+        config = Config(
+            max_pool_connections=POOL_SIZE,
+            connect_timeout=HTTP_TIMEOUT[0],
+            read_timeout=HTTP_TIMEOUT[1],
+            retries={"mode": "standard", "max_attempts": HTTP_RETRIES},
+        )
+        return boto3.client(service, region_name=region, config=config)
+    return shared(f"boto3:{service}:{region}", create)
+
+
+def reset():
+    """Drop every registry entry (tests, or after rotating credentials)."""
+    with _LOCK:
+        _REGISTRY.clear()
+
+
+class LazyClient:
+    """Module-level stand-in for a boto3 client that is created on first attribute access."""
+
+    def __init__(self, service, region=AWS_REGION):
+        self.service = service
+        self.region = region
+
+    def __getattr__(self, name):
+        return getattr(get_client(self.service, self.region), name)
@@ -0,0 +1,108 @@
+import hashlib
+import io
+import types
+import pytest
+from botocore.exceptions import ClientError
+from src import clients
+from src.ingest import s3_uploader
+
+
+class NoSuchKey(ClientError):
+    pass
+
+
+def _error(code, operation):
+    cls = NoSuchKey if code == "NoSuchKey" else ClientError
+    return cls({"Error": {"Code": code, "Message": code}}, operation)
+
+
+class FakeBody(io.BytesIO):
+    def iter_chunks(self, chunk_size=1024):
+        while True:
+            chunk = self.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+class FakeS3:
+    """In-memory stand-in for the S3 calls the pipeline makes (one bucket, conditional puts)."""
+
+    exceptions = types.SimpleNamespace(NoSuchKey=NoSuchKey, ClientError=ClientError)
+
+    def __init__(self):
+        self.objects = {}
+        self.uploads = {}
+        self.fail_puts = {}  # key → error code raised once by the next put_object
+
+    def etag(self, key):
+        return f'"{hashlib.md5(self.objects[key]).hexdigest()}"'
+
+    def _store(self, key, body):
+        self.objects[key] = body if isinstance(body, bytes) else body.encode("utf-8")
+        return {"ETag": self.etag(key)}
+
+    def put_object(self, Bucket, Key, Body, IfMatch=None, IfNoneMatch=None, **kwargs):
+        if Key in self.fail_puts:
+            raise _error(self.fail_puts.pop(Key), "PutObject")
+        if IfNoneMatch == "*" and Key in self.objects:
+            raise _error("PreconditionFailed", "PutObject")
+        if IfMatch is not None and (Key not in self.objects or self.etag(Key) != IfMatch):
+            raise _error("PreconditionFailed", "PutObject")
+        return self._store(Key, Body)
+
+    def get_object(self, Bucket, Key, **kwargs):
+        if Key not in self.objects:
+            raise _error("NoSuchKey", "GetObject")
+        return {"Body": FakeBody(self.objects[Key]), "ETag": self.etag(Key)}
+
+    def head_object(self, Bucket, Key, **kwargs):
+        if Key not in self.objects:
+            raise _error("404", "HeadObject")
+        return {"ETag": self.etag(Key), "ContentLength": len(self.objects[Key])}
+
+    def delete_object(self, Bucket, Key, **kwargs):
+        self.objects.pop(Key, None)
+        return {}
+
+    def upload_file(self, Filename, Bucket, Key, **kwargs):
+        with open(Filename, "rb") as f:
+            self._store(Key, f.read())
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        upload_id = f"upload-{len(self.uploads) + 1}"
+        self.uploads[upload_id] = {"key": Key, "parts": {}}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.uploads[UploadId]["parts"][PartNumber] = Body
+        return {"ETag": f'"{hashlib.md5(Body).hexdigest()}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)["parts"]
+        return self._store(Key, b"".join(parts[p["PartNumber"]] for p in MultipartUpload["Parts"]))
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId, None)
+        return {}
+
+    def get_paginator(self, operation):
+        fake = self
+
+        class Paginator:
+            def paginate(self, Bucket, Prefix=""):
+                keys = sorted(key for key in fake.objects if key.startswith(Prefix))
+                yield {"Contents": [{"Key": key, "ETag": fake.etag(key), "Size": len(fake.objects[key])}
+                                    for key in keys]}
+
+        return Paginator()
+
+
+@pytest.fixture
+def fake_s3():
+    """Route the shared S3 client (src/clients.py registry) to an in-memory FakeS3."""
+    fake = FakeS3()
+    clients.reset()
+    clients._REGISTRY[f"boto3:s3:{s3_uploader.AWS_REGION}"] = fake
+    yield fake
+    clients.reset()
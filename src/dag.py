@@ -0,0 +1,163 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Items (pages of records) a channel holds before its producer blocks
+CHANNEL_MAXSIZE = int(os.getenv("PIPELINE_QUEUE_PAGES", "8"))
+
+
+class ChannelCancelled(Exception):
+    """Raised in a producer whose consumer has gone away."""
+
+
+class Channel:
+    """Bounded queue streaming items from one stage to another.
+
+    `put` blocks while the queue is full (backpressure), so a fast fetch can't
+    run ahead of processing by more than `maxsize` items. The producer closes
+    the channel (optionally with its error); a failing consumer cancels it so
+    the producer doesn't block forever.
+    """
+
+    _DONE = object()
+
+    def __init__(self, maxsize=CHANNEL_MAXSIZE):
+        self._queue = queue.Queue(maxsize=max(1, maxsize))
+        self._cancelled = threading.Event()
+        self._closed = False
+        self._error = None
+
+    def put(self, item):
+        while True:
+            if self._cancelled.is_set():
+                raise ChannelCancelled("consumer stopped")
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def close(self, error=None):
+        if self._closed:
+            return
+        self._closed, self._error = True, error
+        try:
+            self.put(self._DONE)
+        except ChannelCancelled:
+            pass
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def __iter__(self):
+        while True:
+            item = self._queue.get()
+            if item is self._DONE:
+                if self._error is not None:
+                    raise RuntimeError(f"upstream stage failed: {self._error}") from self._error
+                return
+            yield item
+
+    def records(self):
+        """Flatten a channel of pages into records."""
+        for page in self:
+            yield from page
+
+
+class TeeSink:
+    """Raw sink wrapper that also forwards every written page to a channel."""
+
+    def __init__(self, sink, channel):
+        self.sink = sink
+        self.channel = channel
+
+    def write(self, record):
+        self.sink.write(record)
+        self.channel.put([record])
+
+    def write_many(self, records):
+        records = list(records)
+        self.sink.write_many(records)
+        self.channel.put(records)
+
+
+class Stage:
+    """One DAG node: `fn(**results of after)` runs once every stage in `after` has finished.
+
+    `produces` channels are closed when the stage ends (with its error if it
+    failed); `consumes` channels are cancelled if it fails.
+    """
+
+    def __init__(self, name, fn, after=(), produces=(), consumes=()):
+        self.name = name
+        self.fn = fn
+        self.after = tuple(after)
+        self.produces = tuple(produces)
+        self.consumes = tuple(consumes)
+
+
+def _run_stage(stage, inputs, started_at):
+    start = time.perf_counter()
+    try:
+        result = stage.fn(**inputs)
+    except BaseException as e:
+        for channel in stage.produces:
+            channel.close(error=e)
+        for channel in stage.consumes:
+            channel.cancel()
+        raise
+    for channel in stage.produces:
+        channel.close()
+    end = time.perf_counter()
+    return result, {"start": round(start - started_at, 3), "seconds": round(end - start, 3)}
+
+
+def run_dag(stages, max_workers=None):
+    """Run stages concurrently as soon as their dependencies finish.
+
+    Stages linked only by a channel run at the same time (streaming); stages
+    linked by `after` run in order. Returns (results, timings), timings being
+    {stage: {"start": offset, "seconds": duration}} plus the overall "total".
+    The first failure stops new stages from starting and is re-raised once
+    the running ones have finished.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        missing = [dep for dep in stage.after if dep not in by_name]
+        if missing:
+            raise ValueError(f"❌ Stage {stage.name} depends on unknown stages: {missing}")
+
+    started_at = time.perf_counter()
+    results, timings = {}, {}
+    pending = dict(by_name)
+    running = {}
+    error = None
+    with ThreadPoolExecutor(max_workers=max_workers or len(stages) or 1) as pool:
+        while running or (pending and error is None):
+            if error is None:
+                for name, stage in list(pending.items()):
+                    if all(dep in results for dep in stage.after):
+                        inputs = {dep: results[dep] for dep in stage.after}
+                        running[pool.submit(_run_stage, stage, inputs, started_at)] = name
+                        del pending[name]
+            if not running:
+                raise ValueError(f"❌ Stages can never run (dependency cycle): {sorted(pending)}")
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name], timings[name] = future.result()
+                except Exception as e:
+                    print(f"❌ Stage {name} failed: {e}")
+                    if error is None:
+                        # Stages that won't start now can't drain their channels; unblock the producers
+                        for stage in pending.values():
+                            for channel in stage.consumes:
+                                channel.cancel()
+                    error = error or e
+    if error is not None:
+        raise error
+    timings["total"] = {"start": 0.0, "seconds": round(time.perf_counter() - started_at, 3)}
+    return results, timings
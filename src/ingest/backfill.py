@@ -0,0 +1,355 @@
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from src.clients import get_client
+from src.ingest.github_client import SCHEDULER
+from src.ingest.github_ingest import REPO_NAME, REPO_OWNER, fetch_pr_details, require_config
+from src.ingest.incremental import CHECKPOINT_DIR
+from src.ingest.rate_limiter import RateLimitExceeded
+from src.ingest.raw_sink import iter_ndjson_from_s3, raw_key, save_raw
+from src.ingest.s3_uploader import BUCKET_NAME, read_json_from_s3, repo_partition, s3, write_json_to_s3
+
+# Cursors live next to the incremental checkpoints (S3, or CHECKPOINT_DIR locally)
+CURSOR_PREFIX = "state/backfill/"
+
+# Partial results (raw list pages and enriched PR parts) until a repo is complete
+BACKFILL_PREFIX = "github/backfill/"
+
+# Stop and hand over to a continuation once less than this much Lambda time is left
+MARGIN_SECONDS = int(os.getenv("BACKFILL_MARGIN_SECONDS", "60"))
+
+# PRs enriched (and flushed as one part) between deadline checks
+BATCH_SIZE = int(os.getenv("BACKFILL_BATCH_SIZE", "50"))
+
+# Detail calls per PR (first try included) before a failing PR is given up and reported in the cursor
+MAX_ATTEMPTS = int(os.getenv("BACKFILL_MAX_ATTEMPTS", "3"))
+
+PER_PAGE = 100
+
+
+class Deadline:
+    """Time left for this slice: from the Lambda context, or a local budget in seconds (None = no limit)."""
+
+    def __init__(self, context=None, seconds=None, margin=None):
+        self.context = context
+        self.expires = time.monotonic() + seconds if seconds is not None else None
+        self.margin = margin if margin is not None else (MARGIN_SECONDS if context is not None else 0)
+
+    def remaining(self):
+        if self.context is not None:
+            return self.context.get_remaining_time_in_millis() / 1000
+        if self.expires is not None:
+            return self.expires - time.monotonic()
+        return float("inf")
+
+    def near(self):
+        return self.remaining() <= self.margin
+
+
+# --- Cursor persistence ---
+def load_cursor(backfill_id):
+    name = f"{backfill_id}.json"
+    if CHECKPOINT_DIR:
+        path = os.path.join(CHECKPOINT_DIR, "backfill", name)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            return json.load(f)
+    return read_json_from_s3(f"{CURSOR_PREFIX}{name}")
+
+
+def save_cursor(cursor, backfill_id):
+    cursor = {**cursor, "saved_at": datetime.utcnow().isoformat() + "Z"}
+    name = f"{backfill_id}.json"
+    if CHECKPOINT_DIR:
+        path = os.path.join(CHECKPOINT_DIR, "backfill", name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(cursor, f, indent=2, default=str)
+    else:
+        write_json_to_s3(cursor, f"{CURSOR_PREFIX}{name}")
+    return cursor
+
+
+def new_cursor(repos=None):
+    """Cursor over `repos` ("owner/name" list, org layout) or the configured repo (flat layout)."""
+    if repos:
+        targets = [dict(zip(("owner", "repo"), name.split("/", 1))) for name in repos]
+    else:
+        targets = [{"owner": REPO_OWNER, "repo": REPO_NAME}]
+    return {
+        "repos": targets,
+        "org_layout": bool(repos),
+        "repo_index": 0,
+        "phase": "list",  # list → details → retry → assemble → publish → (next repo) … → done
+        "page": 1,        # next list page to fetch; after listing, the number of pages listed
+        "detail_page": 1,
+        "pr_index": 0,    # next PR within detail_page to enrich
+        "failed": {},     # PR number → {"page", "attempts"} for detail calls still to retry
+        "retries": 0,     # retry parts written for the current repo
+        "assemble_index": 0,  # next enriched part to process
+        "time_columns": [],   # timestamp columns of the spooled processed rows
+        "listed": 0,
+        "enriched": 0,
+    }
+
+
+# --- Steps (each one is small, flushed to S3, then recorded in the cursor) ---
+def _work_prefix(target):
+    return f"{BACKFILL_PREFIX}{repo_partition(target['owner'], target['repo'])}/"
+
+
+def _page_name(page):
+    return f"pulls-{page:05d}"
+
+
+def _list_page(cursor, target):
+    """Fetch one page of the PR list (oldest first, so pages don't shift) and store it raw."""
+    url = f"https://api.github.com/repos/{target['owner']}/{target['repo']}/pulls"
+    params = {"state": "all", "sort": "created", "direction": "asc", "per_page": PER_PAGE, "page": cursor["page"]}
+    r = SCHEDULER.get(url, params=params)
+    r.raise_for_status()
+    prs = r.json()
+    if prs:
+        save_raw(prs, _work_prefix(target), _page_name(cursor["page"]), fmt="ndjson")
+        cursor["listed"] += len(prs)
+    if len(prs) < PER_PAGE:
+        # Last page: `page` now holds the number of stored pages
+        cursor["page"] = cursor["page"] if prs else cursor["page"] - 1
+        cursor["phase"] = "details"
+    else:
+        cursor["page"] += 1
+
+
+def _fetch_details(batch, target):
+    """fetch_pr_details, but a batch that ran out of rate limit is redone later instead of counted as failed."""
+    exhausted = SCHEDULER.exhausted
+    detailed = fetch_pr_details(batch, owner=target["owner"], repo=target["repo"])
+    if SCHEDULER.exhausted > exhausted:
+        raise RateLimitExceeded(f"❌ GitHub rate limit exhausted while enriching {len(batch)} PRs")
+    return detailed
+
+
+def _record_failures(cursor, page, batch, detailed):
+    """Note the PRs of `batch` whose detail call failed (fetch_pr_details drops them)."""
+    done = {pr["number"] for pr in detailed}
+    failed = cursor.setdefault("failed", {})
+    for pr in batch:
+        if pr["number"] not in done:
+            entry = failed.setdefault(str(pr["number"]), {"page": page, "attempts": 0})
+            entry["attempts"] += 1
+
+
+def _enrich_batch(cursor, target):
+    """Enrich the next batch of listed PRs and flush it as one part."""
+    page, start = cursor["detail_page"], cursor["pr_index"]
+    if page > cursor["page"]:
+        cursor["phase"] = "retry" if cursor.get("failed") else "assemble"
+        return
+    key = raw_key(_work_prefix(target), _page_name(page), "ndjson")
+    prs = list(iter_ndjson_from_s3(key))
+    batch = prs[start:start + BATCH_SIZE]
+    if batch:
+        detailed = _fetch_details(batch, target)
+        # Deterministic part name: a retried slice overwrites the same part instead of duplicating it
+        save_raw(detailed, _work_prefix(target), f"detailed-{page:05d}-{start:03d}", fmt="ndjson")
+        cursor["enriched"] += len(detailed)
+        _record_failures(cursor, page, batch, detailed)
+    if start + BATCH_SIZE >= len(prs):
+        cursor["detail_page"], cursor["pr_index"] = page + 1, 0
+    else:
+        cursor["pr_index"] = start + BATCH_SIZE
+
+
+def _retry_failed(cursor, target):
+    """Retry the next batch of PRs whose detail call failed; give up on a PR after MAX_ATTEMPTS."""
+    failed = cursor.get("failed", {})
+    due = sorted((int(n) for n, entry in failed.items() if entry["attempts"] < MAX_ATTEMPTS))[:BATCH_SIZE]
+    if not due:
+        if failed:
+            name = f"{target['owner']}/{target['repo']}"
+            cursor.setdefault("unenriched", {})[name] = sorted(int(n) for n in failed)
+            print(f"⚠️ Gave up on {len(failed)} PRs of {name} after {MAX_ATTEMPTS} attempts: {sorted(failed)}")
+        cursor["failed"] = {}
+        cursor["phase"] = "assemble"
+        return
+
+    wanted, batch = set(due), []
+    for page in sorted({failed[str(n)]["page"] for n in due}):
+        key = raw_key(_work_prefix(target), _page_name(page), "ndjson")
+        batch += [pr for pr in iter_ndjson_from_s3(key) if pr["number"] in wanted]
+    detailed = _fetch_details(batch, target)
+    # Sorts after the regular parts; named by the retry count so a redone step overwrites it
+    save_raw(detailed, _work_prefix(target), f"detailed-retry-{cursor.get('retries', 0):05d}", fmt="ndjson")
+    cursor["enriched"] += len(detailed)
+    cursor["retries"] = cursor.get("retries", 0) + 1
+    for pr in detailed:
+        failed.pop(str(pr["number"]), None)
+    for pr in batch:
+        if str(pr["number"]) in failed:
+            failed[str(pr["number"])]["attempts"] += 1
+
+
+def _clear_work(target):
+    """Delete a repo's partial results (on restart, so stale parts can't be assembled)."""
+    paginator = s3.get_paginator("list_objects_v2")
+    for result in paginator.paginate(Bucket=BUCKET_NAME, Prefix=_work_prefix(target)):
+        for obj in result.get("Contents", []):
+            s3.delete_object(Bucket=BUCKET_NAME, Key=obj["Key"])
+
+
+def _part_keys(target, kind):
+    paginator = s3.get_paginator("list_objects_v2")
+    keys = []
+    for result in paginator.paginate(Bucket=BUCKET_NAME, Prefix=f"{_work_prefix(target)}{kind}-"):
+        keys += [obj["Key"] for obj in result.get("Contents", [])]
+    return sorted(keys)
+
+
+def _iter_parts(target, kind="detailed"):
+    for key in _part_keys(target, kind):
+        yield from iter_ndjson_from_s3(key)
+
+
+def _partition(cursor, target):
+    return repo_partition(target["owner"], target["repo"]) if cursor["org_layout"] else None
+
+
+def _assemble(cursor, target):
+    """Process the next enriched part: fold it into the aggregate state and spool its processed rows."""
+    keys = _part_keys(target, "detailed")
+    index = cursor.get("assemble_index", 0)
+    if index >= len(keys):
+        cursor["phase"] = "publish"
+        return
+
+    from src.process.agg_state import AGG_STATE_ENABLED, fold_batch
+    from src.process.lean import lean_enabled
+    from src.process.metrics_processor import process_pull_requests
+
+    records = iter_ndjson_from_s3(keys[index])
+    pr_df, _, _ = process_pull_requests(records if lean_enabled() else list(records))
+    if not pr_df.empty:
+        if AGG_STATE_ENABLED:
+            # Folded by PR number, so a redone step doesn't count its PRs twice
+            fold_batch(pr_df, "pull_requests_processed", _partition(cursor, target))
+        times = [col for col in pr_df.columns if str(pr_df[col].dtype).startswith("datetime64")]
+        cursor["time_columns"] = sorted(set(cursor.get("time_columns", [])) | set(times))
+        rows = json.loads(pr_df.to_json(orient="records", date_format="iso"))
+        save_raw(rows, _work_prefix(target), f"processed-{index:05d}", fmt="ndjson")
+    cursor["assemble_index"] = index + 1
+
+
+def _publish(cursor, target):
+    """Stream the enriched parts into the repo's raw dataset and save the processed tables."""
+    import pandas as pd
+    from src.process.agg_state import AGG_STATE_ENABLED, collapse, load_summary, overlay_pending
+    from src.process.metrics_processor import pr_metrics_from_frame, pr_metrics_from_state, save_processed
+
+    partition = _partition(cursor, target)
+    folder = f"github/{partition}/" if partition else "github/"
+    key = save_raw(_iter_parts(target), folder, "pull_requests_detailed")
+    print(f"📦 Backfilled {target['owner']}/{target['repo']} → s3://{BUCKET_NAME}/{key}")
+
+    name = "pull_requests_processed"
+    pr_df = pd.DataFrame(list(_iter_parts(target, "processed")))
+    for col in cursor.get("time_columns", []):
+        if col in pr_df:
+            pr_df[col] = pd.to_datetime(pr_df[col], utc=True)
+    if pr_df.empty:
+        pr_metrics, author_metrics = {"total_prs": 0}, pd.DataFrame()
+    elif AGG_STATE_ENABLED:
+        # Every part was folded by its assemble step; only the open PRs are added on top
+        groups = collapse(load_summary(name, partition))
+        pr_metrics, author_metrics = pr_metrics_from_state(overlay_pending(groups, pr_df, name))
+    else:
+        pr_metrics, author_metrics = pr_metrics_from_frame(pr_df)
+    save_processed(pr_df, name, repo_partition=partition)
+    save_processed(author_metrics, "author_pr_summary", repo_partition=partition)
+    cursor.setdefault("pr_metrics", {})[f"{target['owner']}/{target['repo']}"] = pr_metrics
+
+    cursor["repo_index"] += 1
+    cursor.update(phase="list", page=1, detail_page=1, pr_index=0, failed={}, retries=0, assemble_index=0,
+                  time_columns=[])
+    if cursor["repo_index"] >= len(cursor["repos"]):
+        cursor["phase"] = "done"
+
+
+STEPS = {
+    "list": _list_page,
+    "details": _enrich_batch,
+    "retry": _retry_failed,
+    "assemble": _assemble,
+    "publish": _publish,
+}
+
+
+def run_backfill(backfill_id="default", repos=None, deadline=None, restart=False):
+    """Advance a PR backfill until it's done or the deadline is near.
+
+    Work happens in small steps (one list page, one batch of enrichments, one
+    batch of retried enrichments, one enriched part processed, then one publish
+    of the raw and processed datasets); each step's output is flushed to S3 before the cursor records
+    it, so a continuation resumes exactly after the last finished step and a
+    step cut short is simply redone. Returns the cursor (phase "done" at the end).
+    """
+    deadline = deadline or Deadline()
+    SCHEDULER.set_deadline(deadline)
+    cursor = None if restart else load_cursor(backfill_id)
+    if cursor is None:
+        cursor = new_cursor(repos)
+        for target in cursor["repos"]:
+            _clear_work(target)
+    if cursor["phase"] == "done":
+        print(f"✅ Backfill {backfill_id} already complete")
+        return cursor
+    for target in cursor["repos"]:
+        require_config(target["owner"], target["repo"])
+
+    steps = 0
+    while cursor["phase"] != "done":
+        target = cursor["repos"][cursor["repo_index"]]
+        try:
+            STEPS[cursor["phase"]](cursor, target)
+        except RateLimitExceeded as e:
+            # The wait would outlast this slice; steps only touch the cursor after their
+            # GitHub calls, so the continuation redoes this one from the saved cursor
+            print(f"⏸️ {e}; handing over")
+            break
+        cursor = save_cursor(cursor, backfill_id)
+        steps += 1
+        # At least one step per slice, so every continuation makes progress
+        if deadline.near():
+            break
+
+    print(f"🧭 Backfill {backfill_id}: {steps} steps, now at {cursor['phase']} "
+          f"(repo {cursor['repo_index'] + 1 if cursor['phase'] != 'done' else len(cursor['repos'])}/"
+          f"{len(cursor['repos'])}, {cursor['listed']} listed, {cursor['enriched']} enriched)")
+    return cursor
+
+
+def continue_in_new_invocation(context, event):
+    """Re-invoke this Lambda asynchronously with the same event; it resumes from the saved cursor."""
+    get_client("lambda").invoke(
+        FunctionName=context.invoked_function_arn,
+        InvocationType="Event",
+        Payload=json.dumps({**event, "restart": False}).encode("utf-8"),
+    )
+    print("🔁 Handed the backfill over to a new invocation")
+
+
+# --- Local driver: run slices back to back until the backfill completes ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resumable PR backfill (local driver).")
+    parser.add_argument("--id", default="default", help="backfill id (cursor name)")
+    parser.add_argument("--repos", nargs="*", help="owner/name list (org layout); default: GITHUB_REPO_OWNER/NAME")
+    parser.add_argument("--slice-seconds", type=float, help="time budget per slice, to exercise resuming")
+    parser.add_argument("--restart", action="store_true", help="discard the saved cursor and start over")
+    args = parser.parse_args()
+
+    cursor = run_backfill(args.id, args.repos, Deadline(seconds=args.slice_seconds), restart=args.restart)
+    while cursor["phase"] != "done":
+        cursor = run_backfill(args.id, args.repos, Deadline(seconds=args.slice_seconds))
+    print(f"✅ Backfill {args.id} complete: {cursor['enriched']} PRs enriched")
@@ -1,40 +1,48 @@
 import os
 import requests
 import json
-from dotenv import load_dotenv
-from datetime import datetime, timedelta
-from src.ingest.s3_uploader import upload_to_s3
+from src.clients import load_local_env
+from src.ingest.github_client import MAX_WORKERS
+from src.ingest.paginator import iter_pages
+from src.ingest.rate_limiter import RateLimitExceeded
+from src.ingest.schemas import project_many
 
-load_dotenv()
+load_local_env()
 
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 REPO_OWNER   = os.getenv("GITHUB_REPO_OWNER")
 REPO_NAME    = os.getenv("GITHUB_REPO_NAME")
-HEADERS      = {"Authorization": f"token {GITHUB_TOKEN}"}
 
 DATA_DIR = "/tmp/data"  # ✅ writable in AWS Lambda
 
-def fetch_workflow_runs(status="completed", per_page=50, max_pages=5):
-    """Fetch recent workflow runs (builds) from GitHub Actions."""
+def fetch_workflow_runs(status="completed", per_page=100, max_pages=None, owner=REPO_OWNER, repo=REPO_NAME,
+                        max_workers=MAX_WORKERS, sink=None):
+    """Fetch workflow runs (builds) from GitHub Actions.
+
+    Pages beyond the first are fetched in parallel once `total_count` is known;
+    each page is written to `sink` (if given) as it arrives.
+    """
+    url = f"https://api.github.com/repos/{owner}/{repo}/actions/runs"
+    params = {"status": status, "per_page": per_page}
     all_runs = []
-    for page in range(1, max_pages + 1):
-        url = f"https://api.github.com/repos/{REPO_OWNER}/{REPO_NAME}/actions/runs"
-        params = {"status": status, "per_page": per_page, "page": page}
-        r = requests.get(url, headers=HEADERS, params=params)
-        if r.status_code != 200:
-            print(f"⚠️ Error {r.status_code} on page {page}")
-            break
-        runs = r.json().get("workflow_runs", [])
-        if not runs:
-            break
-        all_runs.extend(runs)
+    try:
+        for runs in iter_pages(url, params, items_key="workflow_runs", max_pages=max_pages,
+                               max_workers=max_workers):
+            runs = project_many(runs, "workflow_run")
+            all_runs.extend(runs)
+            if sink is not None:
+                sink.write_many(runs)
+    except requests.HTTPError as e:
+        print(f"⚠️ Error {e.response.status_code} fetching workflow runs, keeping {len(all_runs)} so far")
+    except RateLimitExceeded as e:
+        print(f"⚠️ {e}; keeping {len(all_runs)} workflow runs so far")
     print(f"✅ Retrieved {len(all_runs)} workflow runs")
     return all_runs
 
 def save_to_local(data, filename):
     """Save workflow run data locally in /tmp before uploading to S3."""
-    os.makedirs(DATA_DIR, exist_ok=True)
     file_path = os.path.join(DATA_DIR, filename)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
     with open(file_path, "w") as f:
         json.dump(data, f, indent=2)
     print(f"💾 Saved {len(data)} records → {file_path}")
@@ -42,6 +50,7 @@ def save_to_local(data, filename):
 
 
 if __name__ == "__main__":
-    runs = fetch_workflow_runs()
-    runs_file = save_to_local(runs, "workflow_runs.json")
-    upload_to_s3(runs_file, s3_folder="cicd/")
+    from src.ingest.raw_sink import open_raw_sink
+
+    with open_raw_sink("cicd/", "workflow_runs") as sink:
+        fetch_workflow_runs(sink=sink)
@@ -0,0 +1,379 @@
+import argparse
+import json
+import os
+import re
+import sqlite3
+import uuid
+from datetime import datetime
+from src.ingest.raw_sink import NDJSONS3Sink, iter_ndjson_from_s3
+from src.ingest.s3_uploader import BUCKET_NAME, CONFLICT_CODES, default_repo_partition, s3
+
+# Compacted raw history: lake/<dataset>/repo=<owner>__<name>/month=YYYY-MM/part-*.ndjson.gz
+LAKE_PREFIX = "lake/"
+
+# Per (dataset, repo) key index, mirrored to S3 next to the lake
+INDEX_PREFIX = "lake/_index/"
+
+# Local working dir: key indexes (kept across warm invocations) and pending rows
+COMPACTION_DIR = os.getenv("COMPACTION_DIR", "/tmp/compaction")
+
+# Compressed size a part is filled to before the next one starts; smaller parts get merged
+TARGET_FILE_BYTES = int(os.getenv("COMPACTION_TARGET_MB", "64")) * 1024 * 1024
+
+# Run compaction after every pipeline run (it can also run on its own schedule: {"mode": "compact"})
+COMPACTION_ENABLED = os.getenv("COMPACTION_ENABLED", "0").lower() in ("1", "true", "yes")
+
+# Records looked up in the index per round trip
+CHUNK_ROWS = 5000
+
+# Natural key, version (newest wins; None = first copy wins) and the date that picks the month.
+# Same keys as the processed Parquet upserts (parquet_writer.DATASETS).
+DATASETS = {
+    "commits": {"folder": "github/", "name": "commits", "key": "sha", "version": None,
+                "date": "commit.author.date"},
+    "pull_requests": {"folder": "github/", "name": "pull_requests_detailed", "key": "number", "version": "updated_at",
+                      "date": "created_at"},
+    "workflow_runs": {"folder": "cicd/", "name": "workflow_runs", "key": "id", "version": "updated_at",
+                      "date": "created_at"},
+}
+
+PENDING = "pending"
+
+
+class IndexConflict(RuntimeError):
+    """The S3 index changed since this run downloaded it (a concurrent compaction published first)."""
+
+
+def _get(record, path):
+    for part in path.split("."):
+        if not isinstance(record, dict):
+            return None
+        record = record.get(part)
+    return record
+
+
+def _month(record, spec):
+    date = _get(record, spec["date"])
+    return str(date)[:7] if date else "unknown"
+
+
+def lake_prefix(dataset, repo, month=None):
+    prefix = f"{LAKE_PREFIX}{dataset}/{repo}/"
+    return f"{prefix}month={month}/" if month else prefix
+
+
+# --- Key index ---
+class KeyIndex:
+    """On-disk index of one (dataset, repo) lake: natural key → (version, part holding it).
+
+    SQLite in COMPACTION_DIR, mirrored to S3. Lookups are B-tree probes for the
+    incoming keys only, so deduplicating a batch never rescans the lake. It also
+    records every part's size and the ETag of every snapshot already compacted.
+    """
+
+    def __init__(self, dataset, repo, local_dir=COMPACTION_DIR):
+        self.s3_key = f"{INDEX_PREFIX}{dataset}/{repo}.sqlite"
+        self.path = os.path.join(local_dir, "index", dataset, f"{repo}.sqlite")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.etag = None  # ETag of the S3 copy this run started from; None = no index yet
+        self._download()
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS keys (key TEXT PRIMARY KEY, version TEXT, part TEXT);
+            CREATE INDEX IF NOT EXISTS keys_part ON keys (part);
+            CREATE TABLE IF NOT EXISTS parts (part TEXT PRIMARY KEY, month TEXT, bytes INTEGER, records INTEGER);
+            CREATE TABLE IF NOT EXISTS sources (key TEXT PRIMARY KEY, etag TEXT);
+        """)
+
+    def _download(self):
+        """Refresh the local copy unless it's already the one on S3 (warm invocation)."""
+        etag_path = f"{self.path}.etag"
+        try:
+            head = s3.head_object(Bucket=BUCKET_NAME, Key=self.s3_key)
+        except s3.exceptions.ClientError as e:
+            # Anything but a missing key (throttling, 5xx, 403) must not pass for an empty lake
+            if e.response["Error"]["Code"] not in ("NoSuchKey", "404", "NotFound"):
+                raise
+            # First compaction of this lake: drop any stale local copy
+            for path in (self.path, etag_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            return
+        self.etag = head["ETag"]
+        if os.path.exists(self.path) and os.path.exists(etag_path):
+            with open(etag_path) as f:
+                if f.read() == head["ETag"]:
+                    return
+        with open(self.path, "wb") as f:
+            f.write(s3.get_object(Bucket=BUCKET_NAME, Key=self.s3_key)["Body"].read())
+        with open(etag_path, "w") as f:
+            f.write(head["ETag"])
+
+    def upload(self):
+        """Publish the index only if S3 still holds the copy this run started from."""
+        self.db.commit()
+        condition = {"IfMatch": self.etag} if self.etag else {"IfNoneMatch": "*"}
+        try:
+            with open(self.path, "rb") as f:
+                etag = s3.put_object(Bucket=BUCKET_NAME, Key=self.s3_key, Body=f.read(), **condition)["ETag"]
+        except s3.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] in CONFLICT_CODES:
+                raise IndexConflict(f"❌ s3://{BUCKET_NAME}/{self.s3_key} changed during compaction") from e
+            raise
+        self.etag = etag
+        with open(f"{self.path}.etag", "w") as f:
+            f.write(etag)
+
+    def lookup(self, keys):
+        found = {}
+        keys = list(keys)
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            rows = self.db.execute(
+                f"SELECT key, version, part FROM keys WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            )
+            found.update((key, (version, part)) for key, version, part in rows)
+        return found
+
+    def assign(self, entries):
+        """entries: [(key, version, part)]"""
+        self.db.executemany("INSERT OR REPLACE INTO keys (key, version, part) VALUES (?, ?, ?)", entries)
+
+    def parts(self, month):
+        return {part: (size, records) for part, size, records in
+                self.db.execute("SELECT part, bytes, records FROM parts WHERE month = ?", (month,))}
+
+    def set_part(self, part, month, size, records):
+        self.db.execute("INSERT OR REPLACE INTO parts VALUES (?, ?, ?, ?)", (part, month, size, records))
+
+    def drop_part(self, part):
+        self.db.execute("DELETE FROM parts WHERE part = ?", (part,))
+
+    def seen(self, source, etag):
+        row = self.db.execute("SELECT etag FROM sources WHERE key = ?", (source,)).fetchone()
+        return row is not None and row[0] == etag
+
+    def mark_seen(self, source, etag):
+        self.db.execute("INSERT OR REPLACE INTO sources VALUES (?, ?)", (source, etag))
+
+    def close(self):
+        self.db.close()
+
+
+# --- Batches to merge ---
+def find_batches(dataset):
+    """{repo: [batch]} for a dataset: raw snapshots (flat and org layouts) and webhook batches.
+
+    A batch is {"key", "etag", "consume"}; consumed batches (append-only webhook
+    objects) are deleted once merged, snapshots stay and are skipped while unchanged.
+    """
+    spec = DATASETS[dataset]
+    folder, name = re.escape(spec["folder"]), re.escape(spec["name"])
+    patterns = [
+        (re.compile(rf"^{folder}{name}\.(json|ndjson\.gz)$"), False),
+        (re.compile(rf"^{folder}(repo=[^/]+)/{name}\.(json|ndjson\.gz)$"), False),
+        (re.compile(rf"^{folder}webhooks/(repo=[^/]+)/{re.escape(dataset)}-[^/]+\.ndjson\.gz$"), True),
+    ]
+    batches = {}
+    paginator = s3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=BUCKET_NAME, Prefix=spec["folder"]):
+        for obj in page.get("Contents", []):
+            for pattern, consume in patterns:
+                match = pattern.match(obj["Key"])
+                if match:
+                    # Single-repo runs write the flat layout (github/commits.json); it belongs to the configured repo
+                    repo = match.group(1) if match.group(1).startswith("repo=") else default_repo_partition()
+                    batches.setdefault(repo, []).append({"key": obj["Key"], "etag": obj["ETag"], "consume": consume})
+                    break
+    return {repo: sorted(found, key=lambda b: b["key"]) for repo, found in batches.items()}
+
+
+def _list_keys(prefix):
+    paginator = s3.get_paginator("list_objects_v2")
+    return [obj["Key"] for page in paginator.paginate(Bucket=BUCKET_NAME, Prefix=prefix) for obj in page.get("Contents", [])]
+
+
+def _read_batch(key):
+    if key.endswith(".ndjson.gz"):
+        return iter_ndjson_from_s3(key)
+    return iter(json.loads(s3.get_object(Bucket=BUCKET_NAME, Key=key)["Body"].read().decode("utf-8")))
+
+
+def _chunks(records, size=CHUNK_ROWS):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# --- Compaction ---
+class _Packer:
+    """Writes rows of one month into target-sized parts and points their keys at them."""
+
+    def __init__(self, index, dataset, repo, month, stamp, target_bytes):
+        self.index, self.month = index, month
+        self.prefix = f"{lake_prefix(dataset, repo, month)}part-{stamp}-"
+        self.target_bytes = target_bytes
+        self.sink, self.written, self.assigned = None, [], []
+
+    def write(self, key, version, record):
+        if self.sink is None:
+            self.sink = NDJSONS3Sink(f"{self.prefix}{len(self.written):05d}.ndjson.gz")
+        self.sink.write(record)
+        self.assigned.append((key, version, self.sink.s3_key))
+        if self.sink.bytes_written >= self.target_bytes:
+            self._roll()
+
+    def _roll(self):
+        self.sink.close()
+        self.index.set_part(self.sink.s3_key, self.month, self.sink.bytes_written, self.sink.count)
+        self.index.assign(self.assigned)
+        self.written.append(self.sink.s3_key)
+        self.sink, self.assigned = None, []
+
+    def close(self):
+        if self.sink is not None:
+            self._roll()
+        return self.written
+
+
+def _live(index, spec, rows, part):
+    """Rows whose key the index still assigns to `part` at this version (superseded copies drop out)."""
+    current = index.lookup(str(row[spec["key"]]) for row in rows)
+    for row in rows:
+        key = str(row[spec["key"]])
+        version = str(row.get(spec["version"]) or "") if spec["version"] else ""
+        if current.get(key) == (version, part):
+            yield key, version, row
+
+
+def compact(dataset, repo, batches, target_bytes=TARGET_FILE_BYTES, local_dir=COMPACTION_DIR):
+    """Merge new batches into a repo's lake partitions; returns counts.
+
+    1. Each batch streams through in chunks: keys are probed in the index, and
+       only new keys or newer versions are kept (spooled locally per month).
+       A newer version marks the part holding the old copy as dirty.
+    2. Per touched month, dirty parts, parts under the target size and the
+       new rows are rewritten into target-sized parts; superseded rows drop out.
+    3. The index is uploaded, then replaced parts and consumed batches are deleted.
+       The upload is conditional on the index this run started from; if a
+       concurrent run published first, IndexConflict is raised before anything
+       is deleted, and this run's parts are cleaned up as leftovers next time.
+    """
+    spec = DATASETS[dataset]
+    index = KeyIndex(dataset, repo, local_dir)
+    # Unique per run: new parts never overwrite the ones they replace
+    stamp = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    pending_dir = os.path.join(local_dir, "pending", dataset, repo)
+    os.makedirs(pending_dir, exist_ok=True)
+    pending, dirty = {}, set()
+    stats = {"read": 0, "new": 0, "updated": 0, "duplicates": 0}
+    merged = []
+
+    try:
+        # --- 1. Dedup incoming rows against the index ---
+        for batch in batches:
+            if not batch["consume"] and index.seen(batch["key"], batch["etag"]):
+                continue
+            for chunk in _chunks(_read_batch(batch["key"])):
+                newest = {}
+                for record in chunk:
+                    if record.get(spec["key"]) is None:
+                        continue
+                    key = str(record[spec["key"]])
+                    version = str(record.get(spec["version"]) or "") if spec["version"] else ""
+                    if key not in newest or version > newest[key][0]:
+                        newest[key] = (version, record)
+                stats["read"] += len(chunk)
+                known = index.lookup(newest)
+                accepted = []
+                for key, (version, record) in newest.items():
+                    if key in known and version <= known[key][0]:
+                        stats["duplicates"] += 1
+                        continue
+                    if key in known:
+                        stats["updated"] += 1
+                        if known[key][1] != PENDING:
+                            dirty.add(known[key][1])
+                    else:
+                        stats["new"] += 1
+                    month = _month(record, spec)
+                    if month not in pending:
+                        pending[month] = open(os.path.join(pending_dir, f"{month}.ndjson"), "w")
+                    pending[month].write(json.dumps(record, default=str) + "\n")
+                    accepted.append((key, version, PENDING))
+                index.assign(accepted)
+            merged.append(batch)
+        for f in pending.values():
+            f.close()
+
+        # --- 2. Rewrite each touched month into target-sized parts ---
+        months = set(pending)
+        for part in dirty:
+            months |= {row[0] for row in index.db.execute("SELECT month FROM parts WHERE part = ?", (part,))}
+        replaced, written = [], []
+        for month in sorted(months):
+            parts = index.parts(month)
+            rewrite = [part for part, (size, _) in parts.items() if part in dirty or size < target_bytes]
+            # Objects the index doesn't know are leftovers of an interrupted run
+            replaced += [key for key in _list_keys(lake_prefix(dataset, repo, month)) if key not in parts]
+            packer = _Packer(index, dataset, repo, month, stamp, target_bytes)
+            for part in sorted(rewrite):
+                for chunk in _chunks(iter_ndjson_from_s3(part)):
+                    for key, version, row in _live(index, spec, chunk, part):
+                        packer.write(key, version, row)
+            if month in pending:
+                with open(os.path.join(pending_dir, f"{month}.ndjson")) as f:
+                    for chunk in _chunks(json.loads(line) for line in f):
+                        for key, version, row in _live(index, spec, chunk, PENDING):
+                            packer.write(key, version, row)
+            written += packer.close()
+            for part in rewrite:
+                index.drop_part(part)
+            replaced += rewrite
+
+        # --- 3. Publish the index, then drop what it no longer points to ---
+        for batch in merged:
+            if not batch["consume"]:
+                index.mark_seen(batch["key"], batch["etag"])
+        index.upload()
+        for key in replaced + [batch["key"] for batch in merged if batch["consume"]]:
+            s3.delete_object(Bucket=BUCKET_NAME, Key=key)
+    finally:
+        for f in pending.values():
+            f.close()
+        for name in os.listdir(pending_dir):
+            os.remove(os.path.join(pending_dir, name))
+        index.close()
+
+    stats.update(batches=len(merged), parts_written=len(written), parts_replaced=len(replaced))
+    print(f"🧹 Compacted {dataset} for {repo}: {stats['new']} new, {stats['updated']} updated, "
+          f"{stats['duplicates']} duplicates skipped; {len(replaced)} parts → {len(written)}")
+    return stats
+
+
+def run_compaction(datasets=None, target_bytes=TARGET_FILE_BYTES, local_dir=COMPACTION_DIR):
+    """Compact every repo of every dataset (all of DATASETS by default)."""
+    results = {}
+    for dataset in datasets or DATASETS:
+        for repo, batches in sorted(find_batches(dataset).items()):
+            repo_results = results.setdefault(dataset, {})
+            try:
+                repo_results[repo] = compact(dataset, repo, batches, target_bytes, local_dir)
+            except IndexConflict as e:
+                # The concurrent run merged (or will merge) these batches; nothing was deleted here
+                print(f"⚠️ Skipped {dataset} for {repo}: {e}")
+                repo_results[repo] = {"skipped": "index changed by a concurrent compaction"}
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dedup raw batches into the S3 lake and compact small parts.")
+    parser.add_argument("--datasets", nargs="*", choices=sorted(DATASETS), help="default: all")
+    parser.add_argument("--target-mb", type=float, default=TARGET_FILE_BYTES / 1024 / 1024)
+    args = parser.parse_args()
+    print(json.dumps(run_compaction(args.datasets, int(args.target_mb * 1024 * 1024)), indent=2))
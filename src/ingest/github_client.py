@@ -0,0 +1,27 @@
+import os
+from src.clients import get_session, load_local_env, shared
+from src.ingest.rate_limiter import RateLimitScheduler
+
+# Load environment variables from .env only if running locally
+load_local_env()
+
+# GITHUB_TOKEN may hold a comma-separated pool of tokens; the scheduler spreads load across them
+GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
+GITHUB_TOKENS = [t.strip() for t in (GITHUB_TOKEN or "").split(",") if t.strip()]
+HEADERS = {"Authorization": f"token {GITHUB_TOKENS[0] if GITHUB_TOKENS else None}"}
+
+API_URL = "https://api.github.com"
+GRAPHQL_URL = f"{API_URL}/graphql"
+
+# Max concurrent GitHub requests during PR enrichment
+MAX_WORKERS = int(os.getenv("GITHUB_MAX_WORKERS", "8"))
+
+# Shared keep-alive session (pooled connections, timeouts, retries on 5xx; see src/clients.py).
+# Both the REST and GraphQL backends go through it; it lives in the client registry,
+# so warm Lambda invocations keep their open connections. GraphQL queries are POSTs
+# that only read, so POSTs are retried too.
+SESSION = get_session("github", retry_post=True)
+
+# Every GitHub call goes through the scheduler, which picks the token per request
+# (its rate-limit budgets carry over between warm invocations too)
+SCHEDULER = shared("github_scheduler", lambda: RateLimitScheduler(GITHUB_TOKENS, SESSION))
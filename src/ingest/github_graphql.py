@@ -0,0 +1,191 @@
+import os
+import sys
+from src.ingest.github_client import GRAPHQL_URL, SCHEDULER
+from src.ingest.schemas import project_many
+
+REPO_OWNER = os.getenv("GITHUB_REPO_OWNER")
+REPO_NAME = os.getenv("GITHUB_REPO_NAME")
+
+# One query returns the list fields *and* the detail fields fetch_pr_details
+# would otherwise need one REST call per PR for.
+PULL_REQUESTS_QUERY = """
+query($owner: String!, $name: String!, $first: Int!, $after: String, $states: [PullRequestState!]) {
+  repository(owner: $owner, name: $name) {
+    pullRequests(first: $first, after: $after, states: $states,
+                 orderBy: {field: CREATED_AT, direction: DESC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        databaseId
+        number
+        title
+        state
+        isDraft
+        url
+        createdAt
+        updatedAt
+        closedAt
+        mergedAt
+        author { login }
+        mergedBy { login }
+        baseRefName
+        headRefName
+        baseRepository { nameWithOwner }
+        additions
+        deletions
+        changedFiles
+        commits { totalCount }
+        reviews(first: 100) { pageInfo { hasNextPage endCursor } nodes { comments { totalCount } } }
+      }
+    }
+  }
+  rateLimit { cost remaining resetAt }
+}
+"""
+
+# Further pages of one PR's reviews, for PRs with more than 100 (REST review_comments counts them all)
+REVIEWS_QUERY = """
+query($owner: String!, $name: String!, $number: Int!, $after: String) {
+  repository(owner: $owner, name: $name) {
+    pullRequest(number: $number) {
+      reviews(first: 100, after: $after) { pageInfo { hasNextPage endCursor } nodes { comments { totalCount } } }
+    }
+  }
+  rateLimit { cost remaining resetAt }
+}
+"""
+
+# REST `state` filter → GraphQL PullRequestState values (None = all states)
+STATE_FILTERS = {
+    "all": None,
+    "open": ["OPEN"],
+    "closed": ["CLOSED", "MERGED"],
+}
+
+
+def _to_rest_shape(node):
+    """Map a GraphQL PR node onto the record shape fetch_pr_details produces."""
+    reviews = (node.get("reviews") or {}).get("nodes") or []
+    return {
+        "id": node.get("databaseId"),
+        "number": node["number"],
+        "title": node.get("title"),
+        # REST only knows open/closed; merged PRs are closed there
+        "state": "open" if node.get("state") == "OPEN" else "closed",
+        "draft": node.get("isDraft"),
+        "html_url": node.get("url"),
+        "created_at": node.get("createdAt"),
+        "updated_at": node.get("updatedAt"),
+        "closed_at": node.get("closedAt"),
+        "user": {"login": (node.get("author") or {}).get("login")},
+        "base": {
+            "ref": node.get("baseRefName"),
+            "repo": {"full_name": (node.get("baseRepository") or {}).get("nameWithOwner")},
+        },
+        "head": {"ref": node.get("headRefName")},
+        "merged_at": node.get("mergedAt"),
+        "merged_by": (node.get("mergedBy") or {}).get("login"),
+        "additions": node.get("additions"),
+        "deletions": node.get("deletions"),
+        "changed_files": node.get("changedFiles"),
+        "review_comments": sum(r["comments"]["totalCount"] for r in reviews),  # first 100 reviews only
+        "commits_in_pr": (node.get("commits") or {}).get("totalCount"),
+    }
+
+
+def run_graphql(query, variables):
+    """POST a GraphQL query and return its `data`, raising on API errors."""
+    r = SCHEDULER.post(GRAPHQL_URL, json={"query": query, "variables": variables})
+    r.raise_for_status()
+    payload = r.json()
+    if payload.get("errors"):
+        messages = "; ".join(e.get("message", str(e)) for e in payload["errors"])
+        raise RuntimeError(f"❌ GitHub GraphQL error: {messages}")
+    return payload["data"]
+
+
+def _count_review_comments(node, owner, name):
+    """Review comments over all of a PR's reviews, paging past the first 100 when there are more."""
+    reviews = node.get("reviews") or {}
+    total = sum(r["comments"]["totalCount"] for r in reviews.get("nodes") or [])
+    page_info = reviews.get("pageInfo") or {}
+    while page_info.get("hasNextPage"):
+        variables = {"owner": owner, "name": name, "number": node["number"], "after": page_info["endCursor"]}
+        reviews = run_graphql(REVIEWS_QUERY, variables)["repository"]["pullRequest"]["reviews"]
+        total += sum(r["comments"]["totalCount"] for r in reviews["nodes"])
+        page_info = reviews["pageInfo"]
+    return total
+
+
+def fetch_pull_requests_graphql(state="all", per_page=100, max_pages=20, owner=None, repo=None, sink=None):
+    """Fetch PRs with merge/size/review fields in batched GraphQL pages.
+
+    Returns the same records as fetch_pr_details(fetch_pull_requests()),
+    at one request per page instead of one per PR.
+    """
+    variables = {
+        "owner": owner or REPO_OWNER,
+        "name": repo or REPO_NAME,
+        "first": min(per_page, 100),
+        "after": None,
+        "states": STATE_FILTERS[state],
+    }
+    prs = []
+    for _ in range(max_pages):
+        data = run_graphql(PULL_REQUESTS_QUERY, variables)
+        connection = data["repository"]["pullRequests"]
+        records = []
+        for node in connection["nodes"]:
+            record = _to_rest_shape(node)
+            if ((node.get("reviews") or {}).get("pageInfo") or {}).get("hasNextPage"):
+                record["review_comments"] = _count_review_comments(node, variables["owner"], variables["name"])
+            records.append(record)
+        page = project_many(records, "pull_request")
+        prs.extend(page)
+        if sink is not None:
+            sink.write_many(page)
+        if not connection["pageInfo"]["hasNextPage"]:
+            break
+        variables["after"] = connection["pageInfo"]["endCursor"]
+
+    rate = data.get("rateLimit") or {}
+    print(f"✅ Retrieved {len(prs)} pull requests via GraphQL ({state}, {rate.get('remaining')} points left)")
+    return prs
+
+
+# Fields compare_backends checks (dotted paths into the projected records)
+COMPARED_FIELDS = [
+    "state", "created_at", "closed_at", "merged_at", "merged_by", "additions", "deletions",
+    "changed_files", "review_comments", "commits_in_pr", "user.login", "repo_full_name",
+]
+
+
+def _get(record, path):
+    for part in path.split("."):
+        record = record.get(part) if isinstance(record, dict) else None
+    return record
+
+
+def compare_backends(state="open", max_pages=1):
+    """Fetch the same PRs through REST and GraphQL and report field mismatches."""
+    from src.ingest.github_ingest import fetch_pull_requests, fetch_pr_details
+
+    rest = {pr["number"]: pr for pr in fetch_pr_details(fetch_pull_requests(state=state, max_pages=max_pages))}
+    gql = {pr["number"]: pr for pr in fetch_pull_requests_graphql(state=state, max_pages=max_pages)}
+
+    mismatches = 0
+    for number in sorted(rest.keys() & gql.keys()):
+        for field in COMPARED_FIELDS:
+            if _get(rest[number], field) != _get(gql[number], field):
+                mismatches += 1
+                print(f"⚠️ PR #{number} {field}: rest={_get(rest[number], field)!r} graphql={_get(gql[number], field)!r}")
+
+    print(f"🔍 Compared {len(rest.keys() & gql.keys())} PRs: {mismatches} mismatches "
+          f"(rest only: {len(rest.keys() - gql.keys())}, graphql only: {len(gql.keys() - rest.keys())})")
+    return mismatches
+
+
+if __name__ == "__main__":
+    if "--compare" in sys.argv:
+        compare_backends()
+    else:
+        fetch_pull_requests_graphql()
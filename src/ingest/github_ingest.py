@@ -1,97 +1,171 @@
 import os
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from dotenv import load_dotenv
-from src.ingest.s3_uploader import upload_to_s3
+from src.ingest.github_client import GITHUB_TOKEN, MAX_WORKERS, SCHEDULER
+from src.ingest.object_cache import OBJECT_CACHE_ENABLED, ObjectCache
+from src.ingest.paginator import iter_pages, paginate
+from src.ingest.schemas import project, project_many
 
-# Load environment variables from .env only if running locally
-if os.getenv("AWS_LAMBDA_FUNCTION_NAME") is None:
-    load_dotenv()
-
-# --- Load credentials ---
-GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
+# --- Load credentials (.env is loaded by github_client when running locally) ---
 REPO_OWNER = os.getenv("GITHUB_REPO_OWNER")
 REPO_NAME = os.getenv("GITHUB_REPO_NAME")
 
-# Defensive check to avoid None/None repo paths
-if not all([GITHUB_TOKEN, REPO_OWNER, REPO_NAME]):
-    raise EnvironmentError("❌ Missing required GitHub environment variables.")
+# Fields the REST backend adds to each listed PR from its detail call (and caches)
+PR_DETAIL_FIELDS = ("merged_at", "merged_by", "additions", "deletions", "changed_files", "review_comments", "commits_in_pr")
 
-HEADERS = {"Authorization": f"token {GITHUB_TOKEN}"}
+# PR backend: "rest" (list + one detail call per PR) or "graphql" (batched pages)
+PR_BACKEND = os.getenv("GITHUB_PR_BACKEND", "rest")
 
 
 # --- GitHub API functions ---
-def fetch_commits(since_days=7, per_page=50):
-    """Fetch recent commits from the GitHub repo."""
+def require_config(owner, repo):
+    """Defensive check to avoid None/None repo paths (org mode passes owner/repo explicitly)."""
+    if not GITHUB_TOKEN or not (owner and repo):
+        raise EnvironmentError("❌ Missing required GitHub environment variables.")
+
+
+def fetch_commits(since_days=7, per_page=100, max_pages=None, owner=REPO_OWNER, repo=REPO_NAME,
+                  max_workers=MAX_WORKERS, sink=None, collect=True):
+    """Fetch every commit in the window, pages fetched in parallel.
+
+    Records are projected to the "commit" schema; if a `sink` (see raw_sink) is
+    given, each page is written to it as it arrives. With collect=False (sink
+    only) pages aren't kept in memory and an empty list is returned.
+    """
+    require_config(owner, repo)
     since_date = (datetime.utcnow() - timedelta(days=since_days)).isoformat() + "Z"
-    url = f"https://api.github.com/repos/{REPO_OWNER}/{REPO_NAME}/commits"
+    url = f"https://api.github.com/repos/{owner}/{repo}/commits"
     params = {"since": since_date, "per_page": per_page}
-    r = requests.get(url, headers=HEADERS, params=params)
-    r.raise_for_status()
-    commits = r.json()
-    print(f"✅ Retrieved {len(commits)} commits since {since_date}")
+    commits = []
+    fetched = 0
+    for page in iter_pages(url, params, max_pages=max_pages, max_workers=max_workers):
+        page = project_many(page, "commit")
+        fetched += len(page)
+        if collect or sink is None:
+            commits.extend(page)
+        if sink is not None:
+            sink.write_many(page)
+    print(f"✅ Retrieved {fetched} commits since {since_date}")
     return commits
 
 
-def fetch_pull_requests(state="all", per_page=100, max_pages=20, sort="created", direction="desc"):
-    """Fetch pull requests with pagination."""
-    url = f"https://api.github.com/repos/{REPO_OWNER}/{REPO_NAME}/pulls"
-    prs = []
-    page = 1
-    while page <= max_pages:
-        params = {
-            "state": state,
-            "per_page": per_page,
-            "page": page,
-            "sort": sort,
-            "direction": direction,
-        }
-        r = requests.get(url, headers=HEADERS, params=params)
-        r.raise_for_status()
-        batch = r.json()
-        if not batch:
-            break
-        prs.extend(batch)
-        page += 1
+def fetch_pull_requests(state="all", per_page=100, max_pages=20, sort="created", direction="desc",
+                        owner=REPO_OWNER, repo=REPO_NAME, max_workers=MAX_WORKERS):
+    """Fetch pull requests with (parallel) pagination."""
+    require_config(owner, repo)
+    url = f"https://api.github.com/repos/{owner}/{repo}/pulls"
+    params = {
+        "state": state,
+        "per_page": per_page,
+        "sort": sort,
+        "direction": direction,
+    }
+    prs = paginate(url, params, max_pages=max_pages, max_workers=max_workers)
     print(f"✅ Retrieved {len(prs)} pull requests ({state}, paginated)")
     return prs
 
 
-def fetch_pr_details(prs):
-    """Enrich each PR with metadata like merge info, changes, etc."""
+def _fetch_pr_detail(pr, owner=REPO_OWNER, repo=REPO_NAME):
+    """Fetch a single PR's detail record and merge it into the list entry."""
+    pr_number = pr.get("number")
+    if not pr_number:
+        return None
+    url = f"https://api.github.com/repos/{owner}/{repo}/pulls/{pr_number}"
+    try:
+        r = SCHEDULER.get(url)
+    except requests.RequestException as e:
+        print(f"⚠️ Could not fetch PR #{pr_number}: {e}")
+        return None
+    if r.status_code != 200:
+        print(f"⚠️ Could not fetch PR #{pr_number}: {r.status_code}")
+        return None
+    pr_detail = r.json()
+    return project({
+        **pr,
+        "merged_at": pr_detail.get("merged_at"),
+        "merged_by": (pr_detail.get("merged_by") or {}).get("login"),
+        "additions": pr_detail.get("additions"),
+        "deletions": pr_detail.get("deletions"),
+        "changed_files": pr_detail.get("changed_files"),
+        "review_comments": pr_detail.get("review_comments"),
+        "commits_in_pr": pr_detail.get("commits"),
+    }, "pull_request")
+
+
+def _cached_pr_detail(pr, cache, owner=REPO_OWNER, repo=REPO_NAME):
+    """Enriched PR from the object cache, calling the API only on a miss.
+
+    Closed/merged PRs are cached as immutable; open PRs (including reopened
+    ones) are reused only while their list `updated_at` is unchanged.
+    """
+    identity = f"{owner}/{repo}#{pr.get('number')}"
+    closed = pr.get("state") == "closed"
+    cached = cache.get(identity, pr.get("updated_at"), mutable=not closed)
+    if cached is not None:
+        # Only the detail fields are cached; list fields stay as fresh as this run's listing
+        return project({**pr, **cached}, "pull_request")
+    detail = _fetch_pr_detail(pr, owner, repo)
+    if detail is not None:
+        cache.put(identity, {f: detail.get(f) for f in PR_DETAIL_FIELDS},
+                  updated_at=pr.get("updated_at"), immutable=closed)
+    return detail
+
+
+def fetch_pr_details(prs, max_workers=MAX_WORKERS, owner=REPO_OWNER, repo=REPO_NAME, sink=None,
+                     use_cache=OBJECT_CACHE_ENABLED):
+    """Enrich each PR with metadata like merge info, changes, etc.
+
+    Requests run concurrently over the shared session; results keep input order
+    and are written to `sink` (if given) as they complete. With `use_cache`,
+    already-enriched PRs come from the object cache instead of the API.
+    """
+    cache = ObjectCache("pull_request") if use_cache else None
+
+    def enrich(pr):
+        if cache is None:
+            return _fetch_pr_detail(pr, owner, repo)
+        return _cached_pr_detail(pr, cache, owner, repo)
+
     detailed_prs = []
-    for pr in prs:
-        pr_number = pr.get("number")
-        if not pr_number:
-            continue
-        url = f"https://api.github.com/repos/{REPO_OWNER}/{REPO_NAME}/pulls/{pr_number}"
-        r = requests.get(url, headers=HEADERS)
-        if r.status_code == 200:
-            pr_detail = r.json()
-            merged = {
-                **pr,
-                "merged_at": pr_detail.get("merged_at"),
-                "merged_by": pr_detail.get("merged_by", {}).get("login"),
-                "additions": pr_detail.get("additions"),
-                "deletions": pr_detail.get("deletions"),
-                "changed_files": pr_detail.get("changed_files"),
-                "review_comments": pr_detail.get("review_comments"),
-                "commits_in_pr": pr_detail.get("commits"),
-            }
-            detailed_prs.append(merged)
-        else:
-            print(f"⚠️ Could not fetch PR #{pr_number}: {r.status_code}")
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        for pr in pool.map(enrich, prs):
+            if pr is None:
+                continue
+            detailed_prs.append(pr)
+            if sink is not None:
+                sink.write(pr)
     print(f"✅ Enriched {len(detailed_prs)} PRs with detailed metadata")
+    if cache is not None:
+        stats = cache.stats()
+        print(f"🗃️ PR cache: {stats['hits']} hits, {stats['misses']} misses, {stats['stale']} expired "
+              f"→ {stats['misses'] + stats['stale']} detail calls")
     return detailed_prs
 
 
+def fetch_detailed_pull_requests(backend=PR_BACKEND, owner=REPO_OWNER, repo=REPO_NAME,
+                                 max_workers=MAX_WORKERS, sink=None, **kwargs):
+    """Fetch enriched PRs through the selected backend ("rest" or "graphql")."""
+    require_config(owner, repo)
+    if backend == "graphql":
+        from src.ingest.github_graphql import fetch_pull_requests_graphql
+        return fetch_pull_requests_graphql(owner=owner, repo=repo, sink=sink, **kwargs)
+    if backend != "rest":
+        raise ValueError(f"❌ Unknown PR backend: {backend}")
+    prs = fetch_pull_requests(owner=owner, repo=repo, max_workers=max_workers, **kwargs)
+    return fetch_pr_details(prs, max_workers=max_workers, owner=owner, repo=repo, sink=sink)
+
+
 # --- Lambda-safe save + upload ---
 def save_to_local(data, filename):
-    """Save data to /tmp, then upload to S3."""
+    """Save data to /tmp, then upload to S3.
+
+    `filename` may include a sub-folder (e.g. "repo=owner__name/commits.json").
+    """
     temp_dir = "/tmp/data"
-    os.makedirs(temp_dir, exist_ok=True)
     file_path = os.path.join(temp_dir, filename)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
 
     with open(file_path, "w") as f:
         json.dump(data, f, indent=2)
@@ -104,14 +178,11 @@ def save_to_local(data, filename):
 if __name__ == "__main__":
     print("🚀 Running GitHub ingest locally...")
 
-    commits = fetch_commits()
-    prs = fetch_pull_requests()
-    detailed_prs = fetch_pr_details(prs)
-
-    commit_file = save_to_local(commits, "commits.json")
-    detailed_pr_file = save_to_local(detailed_prs, "pull_requests_detailed.json")
+    from src.ingest.raw_sink import open_raw_sink
 
-    upload_to_s3(commit_file, s3_folder="github/")
-    upload_to_s3(detailed_pr_file, s3_folder="github/")
+    with open_raw_sink("github/", "commits") as sink:
+        fetch_commits(sink=sink)
+    with open_raw_sink("github/", "pull_requests_detailed") as sink:
+        fetch_detailed_pull_requests(sink=sink)
 
     print("✅ Local run complete.")
@@ -0,0 +1,248 @@
+import os
+import json
+from datetime import datetime, timedelta
+from src.ingest.github_ingest import (
+    REPO_OWNER,
+    REPO_NAME,
+    SCHEDULER,
+    fetch_pr_details,
+    require_config,
+)
+from src.ingest.raw_sink import load_raw, save_raw
+from src.ingest.s3_uploader import read_json_from_s3, write_json_to_s3
+from src.ingest.schemas import project_many
+
+# Checkpoints live in S3 by default; set CHECKPOINT_DIR to keep them on local disk instead
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR")
+CHECKPOINT_PREFIX = "state/"
+
+# How far before the newest seen run to re-read, so runs that finish out of id order aren't missed
+RUN_LOOKBACK_HOURS = int(os.getenv("WORKFLOW_RUN_LOOKBACK_HOURS", "24"))
+
+# Same for commits: `since` filters on the committer date, and a commit can be pushed long after it
+# was committed (or arrive on the default branch later through a merge), so re-read a window
+COMMIT_LOOKBACK_HOURS = int(os.getenv("COMMIT_LOOKBACK_HOURS", "24"))
+
+# Raw datasets the delta is merged into, with the natural key of each record
+DATASETS = {
+    "commits": {"folder": "github/", "name": "commits", "key": "sha"},
+    "pull_requests": {"folder": "github/", "name": "pull_requests_detailed", "key": "number"},
+    "workflow_runs": {"folder": "cicd/", "name": "workflow_runs", "key": "id"},
+}
+
+
+# --- Checkpoint persistence ---
+def _checkpoint_name(owner, repo):
+    return f"{owner}__{repo}.json"
+
+
+def load_checkpoint(owner=REPO_OWNER, repo=REPO_NAME):
+    """Load the per-repo watermark checkpoint (empty dict on first run)."""
+    name = _checkpoint_name(owner, repo)
+    if CHECKPOINT_DIR:
+        path = os.path.join(CHECKPOINT_DIR, name)
+        if not os.path.exists(path):
+            return {}
+        with open(path, "r") as f:
+            return json.load(f)
+    return read_json_from_s3(f"{CHECKPOINT_PREFIX}{name}", default={})
+
+
+def save_checkpoint(checkpoint, owner=REPO_OWNER, repo=REPO_NAME):
+    """Persist the per-repo watermark checkpoint."""
+    name = _checkpoint_name(owner, repo)
+    checkpoint = {**checkpoint, "saved_at": datetime.utcnow().isoformat() + "Z"}
+    if CHECKPOINT_DIR:
+        os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+        path = os.path.join(CHECKPOINT_DIR, name)
+        with open(path, "w") as f:
+            json.dump(checkpoint, f, indent=2)
+        print(f"💾 Saved checkpoint → {path}")
+    else:
+        write_json_to_s3(checkpoint, f"{CHECKPOINT_PREFIX}{name}")
+    return checkpoint
+
+
+# --- Conditional, watermark-bounded fetches ---
+def _conditional_get(url, params, etag):
+    """GET with If-None-Match; a 304 costs no rate-limit budget."""
+    headers = {"If-None-Match": etag} if etag else {}
+    r = SCHEDULER.get(url, params=params, headers=headers)
+    if r.status_code == 304:
+        return r, None
+    r.raise_for_status()
+    return r, r.headers.get("ETag")
+
+
+def fetch_new_commits(checkpoint, since_days=7, per_page=100):
+    """Fetch commits committed within the lookback window before the last seen commit date.
+
+    Commits pushed later than they were committed land behind the watermark; the
+    window picks them up and the merge by sha absorbs the overlap.
+    """
+    watermark = checkpoint.get("last_commit_date")
+    if watermark:
+        since = datetime.strptime(watermark, "%Y-%m-%dT%H:%M:%SZ") - timedelta(hours=COMMIT_LOOKBACK_HOURS)
+    else:
+        since = datetime.utcnow() - timedelta(days=since_days)
+    since = since.strftime("%Y-%m-%dT%H:%M:%SZ")
+    url = f"https://api.github.com/repos/{REPO_OWNER}/{REPO_NAME}/commits"
+    r, etag = _conditional_get(url, {"since": since, "per_page": per_page}, checkpoint.get("commits_etag"))
+    if etag is None:
+        print(f"ℹ️ No new commits since {since} (304)")
+        return []
+
+    commits = r.json()
+    while "next" in r.links:
+        r = SCHEDULER.get(r.links["next"]["url"])
+        r.raise_for_status()
+        commits.extend(r.json())
+
+    commits = project_many(commits, "commit")
+    checkpoint["commits_etag"] = etag
+    dates = [c["commit"]["committer"]["date"] for c in commits if c["commit"]["committer"]["date"]]
+    if dates:
+        checkpoint["last_commit_date"] = max(dates + ([watermark] if watermark else []))
+    print(f"✅ Retrieved {len(commits)} new commits since {since}")
+    return commits
+
+
+def fetch_updated_pull_requests(checkpoint, per_page=100, max_pages=20):
+    """Fetch PRs updated after the last seen `updated_at`, newest first.
+
+    If `max_pages` runs out before the pages reach the watermark, the PRs not
+    fetched are older than every fetched one, so the watermark stays where it
+    is and the next run pages down to them again.
+    """
+    watermark = checkpoint.get("last_pr_updated_at")
+    url = f"https://api.github.com/repos/{REPO_OWNER}/{REPO_NAME}/pulls"
+    params = {"state": "all", "sort": "updated", "direction": "desc", "per_page": per_page}
+    r, etag = _conditional_get(url, params, checkpoint.get("pulls_etag"))
+    if etag is None:
+        print("ℹ️ No updated pull requests (304)")
+        return []
+
+    prs = []
+    page = 1
+    truncated = False
+    while True:
+        batch = r.json()
+        fresh = [pr for pr in batch if not watermark or pr["updated_at"] > watermark]
+        prs.extend(fresh)
+        # Sorted by updated desc: once a page crosses the watermark we're done
+        if len(fresh) < len(batch) or "next" not in r.links:
+            break
+        if page >= max_pages:
+            truncated = True
+            break
+        r = SCHEDULER.get(r.links["next"]["url"])
+        r.raise_for_status()
+        page += 1
+
+    checkpoint["pulls_etag"] = etag
+    if truncated and watermark:
+        # The PRs not fetched sit between the watermark and the oldest fetched one. Dropping the
+        # ETag makes sure the next run lists them even if the first page hasn't changed.
+        print(f"⚠️ Stopped after {max_pages} pages above the watermark; keeping it at {watermark}")
+        checkpoint.pop("pulls_etag")
+    elif prs:
+        checkpoint["last_pr_updated_at"] = max(pr["updated_at"] for pr in prs)
+    print(f"✅ Retrieved {len(prs)} updated pull requests since {watermark or 'the beginning'}")
+    return prs
+
+
+def fetch_new_workflow_runs(checkpoint, status="completed", per_page=100, max_pages=5, since_days=7):
+    """Fetch workflow runs created within the lookback window before the last seen run.
+
+    Run ids follow start order, not completion order, so a long run can complete after a
+    later (higher-id) one. Re-reading a window of `created` times and deduplicating by id
+    picks those stragglers up; the merge by natural key absorbs the overlap.
+    """
+    watermark = checkpoint.get("last_workflow_run_created_at")
+    if watermark:
+        since = datetime.strptime(watermark, "%Y-%m-%dT%H:%M:%SZ") - timedelta(hours=RUN_LOOKBACK_HOURS)
+    else:
+        since = datetime.utcnow() - timedelta(days=since_days)
+    since = since.strftime("%Y-%m-%dT%H:%M:%SZ")
+    url = f"https://api.github.com/repos/{REPO_OWNER}/{REPO_NAME}/actions/runs"
+    params = {"status": status, "created": f">={since}", "per_page": per_page}
+    r, etag = _conditional_get(url, params, checkpoint.get("runs_etag"))
+    if etag is None:
+        print("ℹ️ No new workflow runs (304)")
+        return []
+
+    runs = {}
+    page = 1
+    while True:
+        for run in r.json().get("workflow_runs", []):
+            runs[run["id"]] = run
+        if "next" not in r.links or page >= max_pages:
+            break
+        r = SCHEDULER.get(r.links["next"]["url"])
+        r.raise_for_status()
+        page += 1
+
+    runs = project_many(list(runs.values()), "workflow_run")
+    checkpoint["runs_etag"] = etag
+    created = [run["created_at"] for run in runs if run.get("created_at")]
+    if created:
+        checkpoint["last_workflow_run_created_at"] = max(created + ([watermark] if watermark else []))
+    print(f"✅ Retrieved {len(runs)} workflow runs created since {since}")
+    return runs
+
+
+# --- Merge delta into the stored dataset ---
+def merge_records(existing, delta, key):
+    """Upsert `delta` into `existing` by natural key; delta records win."""
+    merged = {record[key]: record for record in existing or []}
+    for record in delta:
+        merged[record[key]] = record
+    return list(merged.values())
+
+
+def merge_into_dataset(name, delta):
+    """Merge a delta into the raw dataset on S3 and re-upload it.
+
+    Raises if the upload fails, so the caller never advances watermarks past lost data.
+    """
+    spec = DATASETS[name]
+    existing = load_raw(spec["folder"], spec["name"], default=[])
+    if not delta:
+        return existing
+    merged = merge_records(existing, delta, spec["key"])
+    save_raw(merged, spec["folder"], spec["name"])
+    print(f"🔁 Merged {len(delta)} {name} into {len(existing)} existing → {len(merged)}")
+    return merged
+
+
+def run_incremental():
+    """Fetch only what changed since the last checkpoint and merge it into S3.
+
+    Returns the merged datasets plus the raw deltas.
+    """
+    require_config(REPO_OWNER, REPO_NAME)
+    checkpoint = load_checkpoint()
+
+    new_commits = fetch_new_commits(checkpoint)
+    updated_prs = fetch_pr_details(fetch_updated_pull_requests(checkpoint))
+    new_runs = fetch_new_workflow_runs(checkpoint)
+
+    result = {
+        "commits": merge_into_dataset("commits", new_commits),
+        "pull_requests": merge_into_dataset("pull_requests", updated_prs),
+        "workflow_runs": merge_into_dataset("workflow_runs", new_runs),
+        "delta": {
+            "commits": new_commits,
+            "pull_requests": updated_prs,
+            "workflow_runs": new_runs,
+        },
+    }
+
+    # Only advance the watermarks once the delta is safely merged; a failed upload raises above
+    result["checkpoint"] = save_checkpoint(checkpoint)
+    return result
+
+
+if __name__ == "__main__":
+    result = run_incremental()
+    print(f"✅ Incremental run complete: {json.dumps({k: len(v) for k, v in result['delta'].items()})}")
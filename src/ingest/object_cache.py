@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import threading
+from src.ingest.s3_uploader import BUCKET_NAME, s3
+
+# Set OBJECT_CACHE_ENABLED=0 to always call the API during enrichment
+OBJECT_CACHE_ENABLED = os.getenv("OBJECT_CACHE_ENABLED", "1").lower() in ("1", "true", "yes")
+
+# Local tier; /tmp survives between warm Lambda invocations
+OBJECT_CACHE_DIR = os.getenv("OBJECT_CACHE_DIR", "/tmp/cache/objects")
+
+# S3 tier, so cold Lambdas (and other repos' runs) warm from earlier ones; OBJECT_CACHE_S3=0 keeps it local-only
+OBJECT_CACHE_S3 = os.getenv("OBJECT_CACHE_S3", "1").lower() in ("1", "true", "yes")
+OBJECT_CACHE_PREFIX = "cache/objects/"
+
+
+def content_key(kind, identity):
+    """Content address of an object: sha256 of its kind and natural identity (commit SHA, "owner/repo#123", ...)."""
+    digest = hashlib.sha256(f"{kind}:{identity}".encode("utf-8")).hexdigest()
+    return f"{kind}/{digest[:2]}/{digest}.json"
+
+
+class ObjectCache:
+    """Two-tier (local disk, then S3) cache of GitHub objects by content address.
+
+    Immutable entries (commits, closed/merged PRs, completed runs) are served
+    as-is forever. Mutable entries (open PRs, in-progress runs) are only served
+    while the caller's `updated_at` matches the cached one, so they expire as
+    soon as GitHub reports a change.
+    """
+
+    def __init__(self, kind, local_dir=OBJECT_CACHE_DIR, use_s3=OBJECT_CACHE_S3, bucket=BUCKET_NAME):
+        self.kind = kind
+        self.local_dir = local_dir
+        self.use_s3 = use_s3
+        self.bucket = bucket
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self._lock = threading.Lock()
+
+    def _read_local(self, key):
+        path = os.path.join(self.local_dir, key)
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_local(self, key, entry):
+        path = os.path.join(self.local_dir, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f, default=str)
+        os.replace(tmp_path, path)  # atomic: concurrent readers never see a partial file
+
+    def _read_s3(self, key):
+        try:
+            obj = s3.get_object(Bucket=self.bucket, Key=f"{OBJECT_CACHE_PREFIX}{key}")
+        except s3.exceptions.NoSuchKey:
+            return None
+        except Exception as e:
+            print(f"⚠️ Object cache read failed for {key}: {e}")
+            return None
+        return json.loads(obj["Body"].read().decode("utf-8"))
+
+    def _count(self, outcome):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def get(self, identity, updated_at=None, mutable=False):
+        """Cached record, or None on a miss or when a mutable entry is out of date.
+
+        `mutable=True` means the caller knows the object can change again (e.g.
+        a reopened PR), so even an entry cached as immutable must match `updated_at`.
+        """
+        key = content_key(self.kind, identity)
+        entry = self._read_local(key)
+        if entry is None and self.use_s3:
+            entry = self._read_s3(key)
+            if entry is not None:
+                self._write_local(key, entry)
+        if entry is None:
+            self._count("misses")
+            return None
+        if (mutable or not entry["immutable"]) and (updated_at is None or entry["updated_at"] != updated_at):
+            self._count("stale")
+            return None
+        self._count("hits")
+        return entry["record"]
+
+    def put(self, identity, record, updated_at=None, immutable=False):
+        key = content_key(self.kind, identity)
+        entry = {"identity": str(identity), "updated_at": updated_at, "immutable": immutable, "record": record}
+        self._write_local(key, entry)
+        if self.use_s3:
+            try:
+                s3.put_object(
+                    Bucket=self.bucket,
+                    Key=f"{OBJECT_CACHE_PREFIX}{key}",
+                    Body=json.dumps(entry, default=str).encode("utf-8"),
+                    ContentType="application/json",
+                )
+            except Exception as e:
+                print(f"⚠️ Object cache write failed for {key}: {e}")
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "stale": self.stale}
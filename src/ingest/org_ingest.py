@@ -0,0 +1,176 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.ingest.github_client import MAX_WORKERS
+from src.ingest.github_ingest import (
+    fetch_commits,
+    fetch_detailed_pull_requests,
+    PR_BACKEND,
+)
+from src.ingest.cicd_ingest import fetch_workflow_runs
+from src.ingest.paginator import paginate
+from src.ingest.raw_sink import RAW_FORMAT, iter_ndjson_from_s3, open_raw_sink
+from src.ingest.s3_uploader import repo_partition
+
+GITHUB_ORG = os.getenv("GITHUB_ORG")
+GITHUB_REPOS = os.getenv("GITHUB_REPOS")  # comma-separated "owner/name" list
+
+# Repos ingested at once; each gets an equal slice of MAX_WORKERS for its own requests
+ORG_MAX_REPOS = int(os.getenv("ORG_MAX_REPOS", "4"))
+
+
+def parse_repo_list(repos):
+    """Turn "owner/a, owner/b" (or a list of such strings) into (owner, name) pairs."""
+    if isinstance(repos, str):
+        repos = repos.split(",")
+    pairs = []
+    for entry in repos:
+        entry = entry.strip()
+        if not entry:
+            continue
+        owner, _, name = entry.partition("/")
+        if not name:
+            raise ValueError(f"❌ Expected owner/name, got {entry!r}")
+        pairs.append((owner, name))
+    return pairs
+
+
+def list_org_repos(org, include_archived=False, include_forks=False):
+    """Enumerate an organization's repositories."""
+    repos = paginate(f"https://api.github.com/orgs/{org}/repos", {"type": "all", "per_page": 100})
+    pairs = [
+        (r["owner"]["login"], r["name"])
+        for r in repos
+        if (include_archived or not r.get("archived")) and (include_forks or not r.get("fork"))
+    ]
+    print(f"🏢 Found {len(pairs)} repos in {org}")
+    return sorted(pairs)
+
+
+def resolve_repos(repos=None, org=None):
+    """Repos from an explicit list, else GITHUB_REPOS, else an enumerated org."""
+    repos = repos or GITHUB_REPOS
+    if repos:
+        return parse_repo_list(repos)
+    org = org or GITHUB_ORG
+    if org:
+        return list_org_repos(org)
+    raise EnvironmentError("❌ Org mode needs GITHUB_REPOS or GITHUB_ORG.")
+
+
+def ingest_repo(owner, repo, max_workers=MAX_WORKERS, pr_backend=PR_BACKEND, process=True):
+    """Fetch, store and (optionally) process one repo under its repo-keyed prefixes."""
+    # Imported here so enumeration-only callers don't pay for pandas
+    from src.process.agg_state import AGG_STATE_ENABLED
+    from src.process.lean import lean_enabled
+    from src.process.metrics_processor import (
+        fold_commits,
+        fold_pull_requests,
+        process_commits,
+        process_pull_requests,
+        save_processed,
+    )
+    from src.process.cicd_metrics_processor import (
+        fold_workflow_runs,
+        process_workflow_runs,
+        save_processed as save_cicd_processed,
+    )
+
+    started = time.time()
+    partition = repo_partition(owner, repo)
+
+    # Lean + NDJSON: commits are streamed back from S3 for processing instead of kept in memory
+    stream_commits = process and lean_enabled() and RAW_FORMAT == "ndjson"
+    with open_raw_sink(f"github/{partition}/", "commits") as commit_sink:
+        commits = fetch_commits(owner=owner, repo=repo, max_workers=max_workers, sink=commit_sink,
+                                collect=not stream_commits)
+    if stream_commits:
+        commits = iter_ndjson_from_s3(commit_sink.s3_key)
+    with open_raw_sink(f"github/{partition}/", "pull_requests_detailed") as sink:
+        prs = fetch_detailed_pull_requests(
+            backend=pr_backend, owner=owner, repo=repo, max_workers=max_workers, sink=sink
+        )
+    with open_raw_sink(f"cicd/{partition}/", "workflow_runs") as sink:
+        runs = fetch_workflow_runs(owner=owner, repo=repo, max_workers=max_workers, sink=sink)
+
+    summary = {"commits": commit_sink.count, "pull_requests": len(prs), "workflow_runs": len(runs)}
+    if process:
+        commit_df, commit_metrics = process_commits(commits)
+        pr_df, pr_metrics, author_metrics = process_pull_requests(prs)
+        run_df, run_metrics = process_workflow_runs(runs)
+        if AGG_STATE_ENABLED:
+            commit_metrics = fold_commits(commit_df, repo_partition=partition)
+            pr_metrics, author_metrics = fold_pull_requests(pr_df, repo_partition=partition)
+            run_metrics = fold_workflow_runs(run_df, repo_partition=partition)
+
+        save_processed(commit_df, "commits_processed", repo_partition=partition)
+        save_processed(pr_df, "pull_requests_processed", repo_partition=partition)
+        save_processed(author_metrics, "author_pr_summary", repo_partition=partition)
+        save_cicd_processed(run_df, "workflow_runs_processed", repo_partition=partition)
+        summary["pr_metrics"] = pr_metrics
+        summary["commit_metrics"] = commit_metrics
+        summary["workflow_metrics"] = run_metrics
+
+    summary["seconds"] = round(time.time() - started, 2)
+    return summary
+
+
+def ingest_org(repos=None, org=None, max_repos=ORG_MAX_REPOS, pr_backend=PR_BACKEND, process=True):
+    """Ingest many repos concurrently with a bounded worker pool.
+
+    At most `max_repos` repos run at once and each gets MAX_WORKERS // max_repos
+    concurrent requests, so every active repo gets a fair share of the
+    scheduler's throughput (and therefore of the token pool's rate limit).
+    One failing repo is reported without stopping the others.
+    """
+    pairs = resolve_repos(repos, org)
+    max_repos = max(1, min(max_repos, len(pairs) or 1))
+    per_repo_workers = max(1, MAX_WORKERS // max_repos)
+    print(f"🚀 Ingesting {len(pairs)} repos, {max_repos} at a time ({per_repo_workers} requests each)")
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_repos) as pool:
+        futures = {
+            pool.submit(ingest_repo, owner, name, per_repo_workers, pr_backend, process): f"{owner}/{name}"
+            for owner, name in pairs
+        }
+        for future in as_completed(futures):
+            full_name = futures[future]
+            try:
+                results[full_name] = future.result()
+                print(f"✅ {full_name}: {results[full_name]['commits']} commits, "
+                      f"{results[full_name]['pull_requests']} PRs, {results[full_name]['workflow_runs']} runs")
+            except Exception as e:
+                results[full_name] = {"error": str(e)}
+                print(f"⚠️ {full_name} failed: {e}")
+    return results
+
+
+def org_metrics(full_names):
+    """Org-wide metrics merged from each repo's aggregate state (sketches merge; no raw rows).
+
+    Only folded records count here, so the PR figures cover closed PRs; each
+    repo's own pr_metrics also include its open PRs.
+    """
+    from src.process.agg_state import collapse, load_summary, merge_summaries
+    from src.process.metrics_processor import commit_metrics_from_state, pr_metrics_from_state
+    from src.process.cicd_metrics_processor import workflow_metrics_from_state
+
+    partitions = [repo_partition(*name.split("/", 1)) for name in full_names]
+
+    def merged(dataset):
+        return collapse(merge_summaries(load_summary(dataset, partition) for partition in partitions))
+
+    pr_overall, _ = pr_metrics_from_state(merged("pull_requests_processed"))
+    return {
+        "repos": len(partitions),
+        "commits": commit_metrics_from_state(merged("commits_processed")),
+        "pull_requests": pr_overall,
+        "workflow_runs": workflow_metrics_from_state(merged("workflow_runs_processed")),
+    }
+
+
+if __name__ == "__main__":
+    results = ingest_org()
+    failed = [name for name, r in results.items() if "error" in r]
+    print(f"✅ Org ingest complete: {len(results) - len(failed)} ok, {len(failed)} failed")
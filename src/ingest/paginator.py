@@ -0,0 +1,85 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlparse
+from src.ingest.github_client import MAX_WORKERS, SCHEDULER
+
+
+def _items(response, items_key):
+    body = response.json()
+    return body.get(items_key, []) if items_key else body
+
+
+def _last_page(response, per_page, items_key):
+    """Work out the page count from the Link header, or from `total_count`.
+
+    Returns None when the pages can't be addressed by number (e.g. cursor-based
+    links without a `page` parameter); the caller then follows rel="next".
+    """
+    last = response.links.get("last")
+    if last:
+        page = parse_qs(urlparse(last["url"]).query).get("page")
+        return int(page[0]) if page and page[0].isdigit() else None
+    if "next" not in response.links:
+        return 1
+    if items_key:
+        total = response.json().get("total_count")
+        if total is not None:
+            return max(1, math.ceil(total / per_page))
+    return None
+
+
+def _get(url, params=None):
+    r = SCHEDULER.get(url, params=params)
+    r.raise_for_status()
+    return r
+
+
+def iter_pages(url, params=None, items_key=None, max_pages=None, max_workers=MAX_WORKERS):
+    """Yield each page's items in page order as soon as it and the pages before it arrive.
+
+    Page 1 is fetched first to learn the page count (Link rel="last" or
+    `total_count`); the remaining pages are then fetched concurrently but
+    yielded in page order, so results keep the endpoint's sort order from run
+    to run (a page that finishes early waits for the ones before it).
+    Endpoints that don't expose a last page fall back to following rel="next"
+    sequentially.
+    """
+    params = dict(params or {})
+    per_page = params.get("per_page", 30)
+
+    first = _get(url, params)
+    yield _items(first, items_key)
+
+    last_page = _last_page(first, per_page, items_key)
+    if last_page is None:
+        r, page = first, 1
+        while "next" in r.links and (max_pages is None or page < max_pages):
+            r = _get(r.links["next"]["url"])
+            page += 1
+            yield _items(r, items_key)
+        return
+
+    if max_pages is not None:
+        last_page = min(last_page, max_pages)
+
+    if last_page < 2:
+        return
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = [pool.submit(_get, url, {**params, "page": page}) for page in range(2, last_page + 1)]
+        try:
+            for future in futures:
+                yield _items(future.result(), items_key)
+        finally:
+            # Caller stopped early or a page failed: don't fetch what's still queued
+            for future in futures:
+                future.cancel()
+
+
+def paginate(url, params=None, items_key=None, max_pages=None, max_workers=MAX_WORKERS):
+    """Collect every item from iter_pages into one list."""
+    return [
+        item
+        for page in iter_pages(url, params, items_key, max_pages, max_workers)
+        for item in page
+    ]
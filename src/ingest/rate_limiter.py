@@ -0,0 +1,196 @@
+import os
+import threading
+import time
+import requests
+
+# Start pacing a token once its remaining budget drops below this fraction of its limit
+PACE_BELOW = float(os.getenv("GITHUB_RATE_LIMIT_PACE_BELOW", "0.2"))
+
+# Longest one request sleeps waiting for a reset before giving up. Within a Lambda invocation the
+# wait is also capped by the time left before its deadline (see RateLimitScheduler.set_deadline).
+MAX_WAIT_SECONDS = int(os.getenv("GITHUB_RATE_LIMIT_MAX_WAIT", "900"))
+
+# GitHub's guidance for a secondary rate limit without Retry-After: wait at least a minute
+SECONDARY_BACKOFF_SECONDS = 60
+
+
+class RateLimitExceeded(requests.RequestException):
+    """Raised when the wait for a rate limit would exceed MAX_WAIT_SECONDS or the deadline.
+
+    A RequestException, so fetchers that tolerate a failed request (skip a PR,
+    keep the pages so far) handle it the same way instead of aborting the run.
+    """
+
+
+class TokenBudget:
+    """Rate-limit state GitHub reports for one token on one resource."""
+
+    def __init__(self, token, resource):
+        self.token = token
+        self.resource = resource
+        self.limit = None
+        self.remaining = None
+        self.reset_at = 0.0
+        self.next_slot = 0.0
+
+    def available(self, now):
+        return self.remaining is None or self.remaining > 0 or now >= self.reset_at
+
+    def score(self, now):
+        """Higher is better: unknown budgets first, then the most remaining."""
+        if now >= self.reset_at and self.remaining is not None:
+            return self.limit or float("inf")
+        return float("inf") if self.remaining is None else self.remaining
+
+
+class RateLimitScheduler:
+    """Send every GitHub request through a pool of tokens, respecting rate limits.
+
+    - Tracks X-RateLimit-Remaining / X-RateLimit-Reset per token and resource
+      ("core" REST vs "graphql").
+    - Routes each request to the token with the most budget left.
+    - Paces a token evenly over its reset window once it runs low.
+    - On a primary limit (remaining == 0) or a secondary limit (Retry-After,
+      or at least SECONDARY_BACKOFF_SECONDS), pauses and retries instead of failing.
+    - Never waits past max_wait or the deadline; raises RateLimitExceeded instead.
+    """
+
+    def __init__(self, tokens, session, max_retries=5, max_wait=MAX_WAIT_SECONDS, pace_below=PACE_BELOW):
+        self.session = session
+        self.tokens = list(tokens)
+        self.max_retries = max_retries
+        self.max_wait = max_wait
+        self.pace_below = pace_below
+        self.deadline = None
+        self.exhausted = 0  # RateLimitExceeded raised so far; for callers that skip failed requests
+        self._budgets = {}
+        self._lock = threading.Lock()
+
+    def set_deadline(self, deadline):
+        """Cap every wait by the time `deadline` (backfill.Deadline) leaves before its margin.
+
+        The scheduler is shared across warm invocations, so each invocation sets its own.
+        """
+        self.deadline = deadline
+
+    # --- Budget bookkeeping ---
+    def _budget(self, token, resource):
+        key = (token, resource)
+        if key not in self._budgets:
+            self._budgets[key] = TokenBudget(token, resource)
+        return self._budgets[key]
+
+    def _acquire(self, resource):
+        """Pick a token and reserve a send slot; returns (budget, seconds to wait)."""
+        with self._lock:
+            now = time.time()
+            budgets = [self._budget(token, resource) for token in self.tokens]
+            ready = [b for b in budgets if b.available(now)]
+            if not ready:
+                soonest = min(budgets, key=lambda b: b.reset_at)
+                return soonest, max(0.0, soonest.reset_at - now) + 1
+
+            budget = max(ready, key=lambda b: b.score(now))
+            interval = 0.0
+            if budget.remaining is not None and budget.limit and now < budget.reset_at:
+                if budget.remaining < budget.limit * self.pace_below:
+                    interval = (budget.reset_at - now) / max(budget.remaining, 1)
+            slot = max(now, budget.next_slot)
+            budget.next_slot = slot + interval
+            if budget.remaining is not None:
+                budget.remaining -= 1
+            return budget, slot - now
+
+    def _update(self, budget, response):
+        headers = response.headers
+        with self._lock:
+            if "X-RateLimit-Remaining" in headers:
+                budget.remaining = int(headers["X-RateLimit-Remaining"])
+            if "X-RateLimit-Limit" in headers:
+                budget.limit = int(headers["X-RateLimit-Limit"])
+            if "X-RateLimit-Reset" in headers:
+                budget.reset_at = float(headers["X-RateLimit-Reset"])
+
+    def _rate_limit_wait(self, response):
+        """Seconds to back off if the response is a rate-limit rejection, else None."""
+        if response.status_code not in (403, 429):
+            return None
+        retry_after = response.headers.get("Retry-After")
+        if retry_after is not None:
+            return float(retry_after)
+        if response.headers.get("X-RateLimit-Remaining") == "0":
+            # Another token may still have budget: retry right away and let _acquire decide
+            return 0.0
+        if "secondary rate limit" in response.text.lower():
+            return float(SECONDARY_BACKOFF_SECONDS)
+        return None
+
+    def _wait_left(self, waited):
+        left = self.max_wait - waited
+        if self.deadline is not None:
+            left = min(left, self.deadline.remaining() - self.deadline.margin)
+        return left
+
+    def _exceeded(self, message):
+        with self._lock:
+            self.exhausted += 1
+        return RateLimitExceeded(message)
+
+    # --- Public API ---
+    def request(self, method, url, **kwargs):
+        if not self.tokens:
+            raise EnvironmentError("❌ No GitHub token configured for the request scheduler.")
+        resource = "graphql" if url.rstrip("/").endswith("/graphql") else "core"
+        headers = kwargs.pop("headers", None) or {}
+        waited = 0.0
+        for attempt in range(self.max_retries + 1):
+            budget, delay = self._acquire(resource)
+            if delay > 0:
+                if delay > self._wait_left(waited):
+                    raise self._exceeded(
+                        f"❌ GitHub {resource} rate limit exhausted on all {len(self.tokens)} token(s); "
+                        f"reset in {delay:.0f}s exceeds the {max(self._wait_left(waited), 0):.0f}s left to wait"
+                    )
+                if delay > 1:
+                    print(f"⏸️ GitHub {resource} budget low, pausing {delay:.0f}s")
+                time.sleep(delay)
+                waited += delay
+
+            response = self.session.request(
+                method, url, headers={**headers, "Authorization": f"token {budget.token}"}, **kwargs
+            )
+            self._update(budget, response)
+
+            backoff = self._rate_limit_wait(response)
+            if backoff is None or attempt == self.max_retries:
+                return response
+            if backoff:
+                if backoff > self._wait_left(waited):
+                    raise self._exceeded(
+                        f"❌ GitHub secondary rate limit: retry in {backoff:.0f}s exceeds "
+                        f"the {max(self._wait_left(waited), 0):.0f}s left to wait"
+                    )
+                print(f"⏸️ GitHub secondary rate limit hit, retrying in {backoff:.0f}s")
+                time.sleep(backoff)
+                waited += backoff
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def stats(self):
+        """Snapshot of the known budget per token (tokens masked)."""
+        with self._lock:
+            return [
+                {
+                    "token": f"…{b.token[-4:]}",
+                    "resource": b.resource,
+                    "remaining": b.remaining,
+                    "limit": b.limit,
+                    "reset_at": b.reset_at,
+                }
+                for b in self._budgets.values()
+            ]
@@ -0,0 +1,221 @@
+import io
+import json
+import os
+import threading
+import zlib
+from src.ingest.s3_uploader import BUCKET_NAME, s3, upload_to_s3
+
+# Raw storage format: "json" (legacy pretty-printed file in /tmp, then uploaded)
+# or "ndjson" (gzip NDJSON streamed straight to S3 via multipart upload).
+# json stays the default: readers (load_raw, incremental merges) look for the configured
+# format only, so switching a deployment means converting or re-fetching its raw history.
+RAW_FORMAT = os.getenv("RAW_FORMAT", "json")
+
+# Multipart part size; S3 requires >= 5 MiB for every part except the last
+PART_SIZE = int(os.getenv("RAW_PART_SIZE_MB", "8")) * 1024 * 1024
+
+# Optional local copy of every streamed object, for debugging
+SPOOL_DIR = os.getenv("RAW_SPOOL_DIR")
+
+DATA_DIR = "/tmp/data"
+
+
+def raw_key(folder, name, fmt=RAW_FORMAT):
+    """S3 key of a raw dataset, e.g. github/commits.json or github/commits.ndjson.gz."""
+    return f"{folder}{name}.ndjson.gz" if fmt == "ndjson" else f"{folder}{name}.json"
+
+
+class NDJSONS3Sink:
+    """Stream records to S3 as gzip NDJSON without touching /tmp.
+
+    Records are compressed as they are written; every PART_SIZE of compressed
+    output is shipped as one multipart-upload part, so memory stays at about one
+    part no matter how many records pass through. Objects that never fill a part
+    are sent with a single put_object.
+    """
+
+    def __init__(self, s3_key, part_size=PART_SIZE, spool_dir=SPOOL_DIR, bucket=BUCKET_NAME):
+        self.s3_key = s3_key
+        self.bucket = bucket
+        self.part_size = max(part_size, 5 * 1024 * 1024)
+        self.count = 0
+        self.bytes_written = 0
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 → gzip container
+        self._buffer = io.BytesIO()
+        self._parts = []
+        self._upload_id = None
+        self._lock = threading.Lock()
+        self._spool = None
+        if spool_dir:
+            os.makedirs(spool_dir, exist_ok=True)
+            self._spool = open(os.path.join(spool_dir, s3_key.replace("/", "__")), "wb")
+
+    def write(self, record):
+        line = (json.dumps(record, default=str) + "\n").encode("utf-8")
+        with self._lock:
+            self.count += 1
+            self._feed(self._compressor.compress(line))
+
+    def write_many(self, records):
+        for record in records:
+            self.write(record)
+
+    def _feed(self, data):
+        if not data:
+            return
+        self._buffer.write(data)
+        self.bytes_written += len(data)
+        if self._spool:
+            self._spool.write(data)
+        if self._buffer.tell() >= self.part_size:
+            self._upload_part()
+
+    def _upload_part(self):
+        if self._upload_id is None:
+            self._upload_id = s3.create_multipart_upload(
+                Bucket=self.bucket, Key=self.s3_key, ContentType="application/x-ndjson", ContentEncoding="gzip"
+            )["UploadId"]
+        part_number = len(self._parts) + 1
+        response = s3.upload_part(
+            Bucket=self.bucket,
+            Key=self.s3_key,
+            UploadId=self._upload_id,
+            PartNumber=part_number,
+            Body=self._buffer.getvalue(),
+        )
+        self._parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+        self._buffer = io.BytesIO()
+
+    def close(self):
+        with self._lock:
+            try:
+                self._feed(self._compressor.flush())
+                if self._upload_id is None:
+                    s3.put_object(
+                        Bucket=self.bucket,
+                        Key=self.s3_key,
+                        Body=self._buffer.getvalue(),
+                        ContentType="application/x-ndjson",
+                        ContentEncoding="gzip",
+                    )
+                else:
+                    if self._buffer.tell():
+                        self._upload_part()
+                    s3.complete_multipart_upload(
+                        Bucket=self.bucket,
+                        Key=self.s3_key,
+                        UploadId=self._upload_id,
+                        MultipartUpload={"Parts": self._parts},
+                    )
+            except Exception:
+                # Uploaded parts of an incomplete multipart upload are billed until aborted
+                self.abort()
+                raise
+            if self._spool:
+                self._spool.close()
+        print(f"✅ Streamed {self.count} records ({self.bytes_written / 1024:.1f} KiB gz) → s3://{self.bucket}/{self.s3_key}")
+        return self.s3_key
+
+    def abort(self):
+        if self._upload_id is not None:
+            s3.abort_multipart_upload(Bucket=self.bucket, Key=self.s3_key, UploadId=self._upload_id)
+        if self._spool:
+            self._spool.close()
+        print(f"⚠️ Aborted stream to s3://{self.bucket}/{self.s3_key}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type:
+            self.abort()
+        else:
+            self.close()
+        return False
+
+
+class JSONFileSink:
+    """Legacy sink: collect records, write one JSON file to /tmp, upload it on close."""
+
+    def __init__(self, folder, name):
+        self.folder = folder
+        self.name = name
+        self.records = []
+        self._lock = threading.Lock()
+
+    @property
+    def count(self):
+        return len(self.records)
+
+    def write(self, record):
+        with self._lock:
+            self.records.append(record)
+
+    def write_many(self, records):
+        with self._lock:
+            self.records.extend(records)
+
+    def close(self):
+        file_path = os.path.join(DATA_DIR, self.folder, f"{self.name}.json")
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as f:
+            json.dump(self.records, f, indent=2)
+        print(f"💾 Saved {len(self.records)} records → {file_path}")
+        if not upload_to_s3(file_path, s3_folder=self.folder):
+            raise OSError(f"❌ Upload of {file_path} to s3://{BUCKET_NAME}/{self.folder} failed")
+        return raw_key(self.folder, self.name, "json")
+
+    def abort(self):
+        self.records = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type:
+            self.abort()
+        else:
+            self.close()
+        return False
+
+
+def open_raw_sink(folder, name, fmt=RAW_FORMAT):
+    """Open the sink for a raw dataset in the configured format."""
+    if fmt == "ndjson":
+        return NDJSONS3Sink(raw_key(folder, name, fmt))
+    return JSONFileSink(folder, name)
+
+
+def save_raw(records, folder, name, fmt=RAW_FORMAT):
+    """Write an iterable of records as a raw dataset; returns the S3 key."""
+    with open_raw_sink(folder, name, fmt) as sink:
+        sink.write_many(records)
+    return raw_key(folder, name, fmt)
+
+
+def iter_ndjson_from_s3(s3_key, bucket=BUCKET_NAME, chunk_size=1024 * 1024):
+    """Yield records from a gzip NDJSON object, decompressing as it streams."""
+    body = s3.get_object(Bucket=bucket, Key=s3_key)["Body"]
+    decompressor = zlib.decompressobj(47)  # auto-detect gzip/zlib header
+    pending = b""
+    for chunk in body.iter_chunks(chunk_size):
+        pending += decompressor.decompress(chunk)
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            if line:
+                yield json.loads(line)
+    pending += decompressor.flush()
+    if pending.strip():
+        yield json.loads(pending)
+
+
+def load_raw(folder, name, default=None, fmt=RAW_FORMAT):
+    """Load a raw dataset from S3 in either format (`default` if it doesn't exist)."""
+    key = raw_key(folder, name, fmt)
+    try:
+        if fmt == "ndjson":
+            return list(iter_ndjson_from_s3(key))
+        obj = s3.get_object(Bucket=BUCKET_NAME, Key=key)
+    except s3.exceptions.NoSuchKey:
+        return default
+    return json.loads(obj["Body"].read().decode("utf-8"))
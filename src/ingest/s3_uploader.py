@@ -1,14 +1,36 @@
 import os
-import boto3
-from dotenv import load_dotenv
+import json
+from datetime import datetime
+from src.clients import LazyClient, load_local_env
 
-load_dotenv()
+load_local_env()
 
 AWS_REGION = os.getenv("AWS_REGION")
 BUCKET_NAME = "codesense360-data"   # or read from config if you prefer
 
-# Create an S3 client
-s3 = boto3.client("s3", region_name=AWS_REGION)
+# Rewritten after every processed save; the dashboard keys its query cache on this object's ETag
+PROCESSED_VERSION_KEY = "processed/_version.json"
+
+# Error codes of a conditional put (IfMatch / IfNoneMatch) that lost to a concurrent writer
+CONFLICT_CODES = ("PreconditionFailed", "412", "ConditionalRequestConflict", "409")
+
+# Shared S3 client, created on first use (see src/clients.py)
+s3 = LazyClient("s3", region=AWS_REGION)
+
+def repo_partition(owner, repo):
+    """Hive-style path segment that keys org-mode objects by repo, e.g. `repo=owner__name`."""
+    return f"repo={owner}__{repo}"
+
+def default_repo_partition():
+    """Partition of the configured single repo (GITHUB_REPO_OWNER / GITHUB_REPO_NAME).
+
+    Raises instead of returning `repo=None__None`, which would silently mix
+    unconfigured runs into one bogus partition.
+    """
+    owner, repo = os.getenv("GITHUB_REPO_OWNER"), os.getenv("GITHUB_REPO_NAME")
+    if not (owner and repo):
+        raise EnvironmentError("❌ GITHUB_REPO_OWNER / GITHUB_REPO_NAME must be set (or pass a repo partition).")
+    return repo_partition(owner, repo)
 
 def upload_to_s3(file_path, s3_folder="raw/"):
     """Upload a local file to S3 in the given folder."""
@@ -23,6 +45,61 @@ def upload_to_s3(file_path, s3_folder="raw/"):
         print(f"⚠️ Upload failed for {file_name}: {e}")
         return False
 
+def read_json_from_s3(s3_key, default=None):
+    """Load a JSON object from S3, returning `default` if the key doesn't exist."""
+    try:
+        obj = s3.get_object(Bucket=BUCKET_NAME, Key=s3_key)
+    except s3.exceptions.NoSuchKey:
+        return default
+    return json.loads(obj["Body"].read().decode("utf-8"))
+
+
+def read_json_with_etag(s3_key, default=None):
+    """(object, ETag) of a JSON object on S3; (`default`, None) if the key doesn't exist."""
+    try:
+        obj = s3.get_object(Bucket=BUCKET_NAME, Key=s3_key)
+    except s3.exceptions.NoSuchKey:
+        return default, None
+    return json.loads(obj["Body"].read().decode("utf-8")), obj["ETag"]
+
+
+def write_json_if_unchanged(data, s3_key, etag):
+    """Conditional write: only if the object still has `etag` (None: only if it doesn't exist yet).
+
+    Returns False when another writer got there first, so the caller can re-read and retry.
+    """
+    condition = {"IfMatch": etag} if etag else {"IfNoneMatch": "*"}
+    try:
+        s3.put_object(
+            Bucket=BUCKET_NAME,
+            Key=s3_key,
+            Body=json.dumps(data, default=str).encode("utf-8"),
+            ContentType="application/json",
+            **condition,
+        )
+    except s3.exceptions.ClientError as e:
+        if e.response["Error"]["Code"] in CONFLICT_CODES:
+            return False
+        raise
+    print(f"✅ Wrote s3://{BUCKET_NAME}/{s3_key}")
+    return True
+
+
+def write_json_to_s3(data, s3_key):
+    """Write a JSON-serialisable object straight to S3 (no /tmp round trip)."""
+    s3.put_object(
+        Bucket=BUCKET_NAME,
+        Key=s3_key,
+        Body=json.dumps(data, default=str).encode("utf-8"),
+        ContentType="application/json",
+    )
+    print(f"✅ Wrote s3://{BUCKET_NAME}/{s3_key}")
+    return True
+
+def mark_processed_version(dataset):
+    """Bump the processed-data version so dashboard query caches pick up the new data."""
+    write_json_to_s3({"dataset": dataset, "updated_at": datetime.utcnow().isoformat()}, PROCESSED_VERSION_KEY)
+
 if __name__ == "__main__":
     # quick local test
     upload_to_s3("data/commits.json")
\ No newline at end of file
@@ -0,0 +1,121 @@
+import os
+
+# Set RAW_FULL=1 to store complete GitHub payloads (e.g. for an audit); projection becomes a no-op
+FULL_RAW = os.getenv("RAW_FULL", "0").lower() in ("1", "true", "yes")
+
+# Per-entity projection applied at ingest time.
+#   source path (dotted)  →  (type, output path or None to keep the source path)
+# Output paths stay nested so pd.json_normalize produces the same column names
+# the processors and Athena tables already use ("commit.author.name", "user.login", ...).
+SCHEMAS = {
+    "commit": {
+        "sha": (str, None),
+        "html_url": (str, None),
+        "commit.author.name": (str, None),
+        "commit.author.email": (str, None),
+        "commit.author.date": (str, None),
+        "commit.committer.date": (str, None),
+        "commit.message": (str, None),
+        "author.login": (str, None),
+        "committer.login": (str, None),
+    },
+    "pull_request": {
+        "id": (int, None),
+        "number": (int, None),
+        "title": (str, None),
+        "state": (str, None),
+        "draft": (bool, None),
+        "html_url": (str, None),
+        "author_association": (str, None),
+        "created_at": (str, None),
+        "updated_at": (str, None),
+        "closed_at": (str, None),
+        "merged_at": (str, None),
+        "user.login": (str, None),
+        "base.ref": (str, None),
+        "head.ref": (str, None),
+        "base.repo.full_name": (str, "repo_full_name"),
+        "merged_by": (str, None),
+        "additions": (int, None),
+        "deletions": (int, None),
+        "changed_files": (int, None),
+        "review_comments": (int, None),
+        "commits_in_pr": (int, None),
+    },
+    "workflow_run": {
+        "id": (int, None),
+        "name": (str, None),
+        "workflow_id": (int, None),
+        "event": (str, None),
+        "status": (str, None),
+        "conclusion": (str, None),
+        "head_branch": (str, None),
+        "head_sha": (str, None),
+        "run_number": (int, None),
+        "run_attempt": (int, None),
+        "html_url": (str, None),
+        "created_at": (str, None),
+        "updated_at": (str, None),
+        "run_started_at": (str, None),
+        "actor.login": (str, None),
+        "repository.full_name": (str, "repo_full_name"),
+    },
+}
+
+# Pre-split paths once: entity → [(source parts, type, output parts)]
+_COMPILED = {
+    entity: [
+        (tuple(source.split(".")), cast, tuple((target or source).split(".")))
+        for source, (cast, target) in fields.items()
+    ]
+    for entity, fields in SCHEMAS.items()
+}
+
+
+def normalized_columns(entity):
+    """Column names pd.json_normalize gives a projected record, in schema order."""
+    return [".".join(target) for _, _, target in _COMPILED[entity]]
+
+
+def stable_column_order(present, leading):
+    """The `leading` columns that are present, then every other present column by name."""
+    present = list(present)
+    first = [col for col in leading if col in present]
+    return first + sorted(col for col in present if col not in first)
+
+
+def _lookup(record, parts):
+    for part in parts:
+        if not isinstance(record, dict):
+            return None
+        record = record.get(part)
+    return record
+
+
+def _coerce(value, cast):
+    if value is None or isinstance(value, cast):
+        return value
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def project(record, entity, full_raw=FULL_RAW):
+    """Keep only the schema's fields of one record, typed and renamed."""
+    if full_raw:
+        return record
+    out = {}
+    for source, cast, target in _COMPILED[entity]:
+        node = out
+        for part in target[:-1]:
+            node = node.setdefault(part, {})
+        node[target[-1]] = _coerce(_lookup(record, source), cast)
+    return out
+
+
+def project_many(records, entity, full_raw=FULL_RAW):
+    """Project a page of records."""
+    if full_raw:
+        return records
+    return [project(record, entity) for record in records]
@@ -0,0 +1,58 @@
+import json
+import pytest
+from src.ingest import backfill
+from src.ingest.raw_sink import save_raw
+from src.process import agg_state
+
+TARGET = {"owner": "o", "repo": "r"}
+
+
+def pr(number, merged=True):
+    created = f"2025-11-{number:02d}T10:00:00Z"
+    return {"number": number, "user": {"login": "alice" if number % 2 else "bob"}, "state": "closed" if merged else "open",
+            "created_at": created, "updated_at": created, "closed_at": created.replace("T10", "T12") if merged else None,
+            "merged_at": created.replace("T10", "T12") if merged else None, "review_comments": number,
+            "additions": 1, "deletions": 1, "changed_files": 1, "commits": 1}
+
+
+@pytest.fixture
+def enriched(fake_s3, monkeypatch, tmp_path):
+    """A single-repo org cursor whose PRs are enriched into three parts, ready to assemble."""
+    monkeypatch.setattr(backfill, "CHECKPOINT_DIR", str(tmp_path))
+    monkeypatch.setattr(backfill, "require_config", lambda owner, repo: None)
+    monkeypatch.setattr(agg_state, "AGG_STATE_ENABLED", True)
+    prefix = backfill._work_prefix(TARGET)
+    save_raw([pr(1), pr(2)], prefix, "detailed-00001-000", fmt="ndjson")
+    save_raw([pr(3), pr(4, merged=False)], prefix, "detailed-00001-050", fmt="ndjson")
+    save_raw([pr(5)], prefix, "detailed-retry-00000", fmt="ndjson")
+    cursor = backfill.new_cursor(["o/r"])
+    cursor.update(phase="assemble", listed=5, enriched=5)
+    backfill.save_cursor(cursor, "t")
+    return fake_s3
+
+
+def test_assembly_processes_one_part_per_step(enriched):
+    raw = "github/repo=o__r/pull_requests_detailed.json"
+    slices = 0
+    cursor = backfill.load_cursor("t")
+    while cursor["phase"] != "done":
+        # No time left: every slice runs exactly one step and saves the cursor
+        cursor = backfill.run_backfill("t", deadline=backfill.Deadline(seconds=0))
+        slices += 1
+        if cursor["phase"] != "done":
+            assert raw not in enriched.objects  # published only once every part is processed
+    assert slices == 5  # three parts, the hand-over to publish, the publish
+
+    assert sorted(p["number"] for p in json.loads(enriched.objects[raw])) == [1, 2, 3, 4, 5]
+    assert "processed/pull_requests_processed/repo=o__r/pull_requests_processed.csv" in enriched.objects
+    metrics = cursor["pr_metrics"]["o/r"]
+    assert metrics["total_prs"] == 5 and metrics["merged_prs"] == 4  # the open PR is counted, not folded
+
+
+def test_redone_assemble_step_does_not_double_count(enriched):
+    cursor = backfill.load_cursor("t")
+    backfill._assemble(cursor, TARGET)
+    cursor["assemble_index"] = 0  # the slice died before its cursor was saved
+    backfill._assemble(cursor, TARGET)
+    summary = agg_state.collapse(agg_state.load_summary("pull_requests_processed", "repo=o__r"))
+    assert agg_state.total(summary, "merged").count == 2
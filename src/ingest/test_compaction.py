@@ -0,0 +1,46 @@
+import json
+from src.ingest import compaction
+from src.ingest.raw_sink import iter_ndjson_from_s3
+
+REPO = "repo=o__r"
+
+
+def put_snapshot(fake_s3, records, name="pull_requests_detailed"):
+    key = f"github/{REPO}/{name}.json"
+    fake_s3.put_object(Bucket="b", Key=key, Body=json.dumps(records))
+    return key
+
+
+def lake_records(fake_s3, dataset="pull_requests"):
+    prefix = compaction.lake_prefix(dataset, REPO)
+    return [record for key in sorted(fake_s3.objects) if key.startswith(prefix)
+            for record in iter_ndjson_from_s3(key)]
+
+
+def pr(number, updated_at, created_at="2025-11-03T10:00:00Z"):
+    return {"number": number, "updated_at": updated_at, "created_at": created_at}
+
+
+def test_dedups_snapshots_and_keeps_newest_version(fake_s3, tmp_path):
+    put_snapshot(fake_s3, [pr(1, "2025-11-03T10:00:00Z"), pr(2, "2025-11-03T11:00:00Z")])
+    first = compaction.run_compaction(["pull_requests"], local_dir=str(tmp_path))
+    assert first["pull_requests"][REPO]["new"] == 2
+
+    # The next snapshot repeats PR 2 and updates PR 1
+    put_snapshot(fake_s3, [pr(1, "2025-11-04T09:00:00Z"), pr(2, "2025-11-03T11:00:00Z")])
+    second = compaction.run_compaction(["pull_requests"], local_dir=str(tmp_path))
+    stats = second["pull_requests"][REPO]
+    assert (stats["new"], stats["updated"], stats["duplicates"]) == (0, 1, 1)
+    assert sorted((r["number"], r["updated_at"]) for r in lake_records(fake_s3)) == [
+        (1, "2025-11-04T09:00:00Z"), (2, "2025-11-03T11:00:00Z"),
+    ]
+
+
+def test_index_conflict_skips_the_repo(fake_s3, tmp_path):
+    snapshot = put_snapshot(fake_s3, [pr(1, "2025-11-03T10:00:00Z")])
+    # A concurrent compaction publishes the index between this run's download and upload
+    fake_s3.fail_puts[f"{compaction.INDEX_PREFIX}pull_requests/{REPO}.sqlite"] = "PreconditionFailed"
+
+    results = compaction.run_compaction(["pull_requests"], local_dir=str(tmp_path))
+    assert results == {"pull_requests": {REPO: {"skipped": "index changed by a concurrent compaction"}}}
+    assert snapshot in fake_s3.objects  # nothing is deleted when the index can't be published
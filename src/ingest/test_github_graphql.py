@@ -0,0 +1,117 @@
+import json
+import os
+import pytest
+from src.ingest import github_graphql
+from src.process.metrics_processor import process_pull_requests
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# Keys fetch_pr_details adds on top of the REST list record
+DETAIL_KEYS = {"merged_at", "merged_by", "additions", "deletions", "changed_files", "review_comments", "commits_in_pr"}
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name)) as f:
+        return json.load(f)
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+@pytest.fixture
+def recorded(monkeypatch):
+    """Replay recorded GraphQL pages in order and capture the request variables.
+
+    Follow-up review pages are answered from their own fixture and captured in `sent.reviews`.
+    """
+    pages = [load_fixture("graphql_pull_requests_page1.json"), load_fixture("graphql_pull_requests_page2.json")]
+    sent = RecordedVariables()
+
+    def fake_post(url, json):
+        if json["query"] == github_graphql.REVIEWS_QUERY:
+            sent.reviews.append(json["variables"].copy())
+            return FakeResponse(load_fixture("graphql_reviews_page2.json"))
+        sent.append(json["variables"].copy())
+        return FakeResponse(pages[len(sent) - 1])
+
+    monkeypatch.setattr(github_graphql.SCHEDULER, "post", fake_post)
+    return sent
+
+
+class RecordedVariables(list):
+    def __init__(self):
+        super().__init__()
+        self.reviews = []
+
+
+def test_paginates_with_cursor(recorded):
+    prs = github_graphql.fetch_pull_requests_graphql(owner="AICloudProjects", repo="codesense360")
+    assert [pr["number"] for pr in prs] == [42, 41, 40]
+    assert len(recorded) == 2
+    assert recorded[0]["after"] is None and recorded[0]["first"] == 100 and recorded[0]["states"] is None
+    assert recorded[1]["after"] == "Y3Vyc29yOnYyOpK5MjAyNS0xMS0wNFQxMDowMDowMFo"
+
+
+def test_maps_to_rest_record_shape(recorded):
+    merged, draft, closed = github_graphql.fetch_pull_requests_graphql(owner="o", repo="r")
+    assert DETAIL_KEYS <= merged.keys()
+    assert merged["state"] == "closed" and merged["user"] == {"login": "alice"}
+    assert merged["merged_by"] == "bob" and merged["commits_in_pr"] == 4
+    assert merged["repo_full_name"] == "AICloudProjects/codesense360"
+    assert draft["state"] == "open" and draft["merged_by"] is None and draft["review_comments"] == 0
+    assert closed["user"] == {"login": None} and closed["merged_at"] is None
+
+
+def test_review_comments_count_every_review_page(recorded):
+    merged, draft, closed = github_graphql.fetch_pull_requests_graphql(owner="o", repo="r")
+    # PR 42 has more than 100 reviews: 2 + 1 on the first page, 4 + 0 on the next
+    assert merged["review_comments"] == 7 and closed["review_comments"] == 5
+    assert recorded.reviews == [{"owner": "o", "name": "r", "number": 42, "after": "Y3Vyc29yOnYyOpO0MTAw"}]
+
+
+def test_compare_backends_checks_review_comments_and_repo(recorded, monkeypatch):
+    from src.ingest import github_ingest
+
+    graphql = github_graphql.fetch_pull_requests_graphql(owner="o", repo="r")
+    rest = [dict(pr, user=dict(pr["user"])) for pr in graphql]
+    monkeypatch.setattr(github_graphql, "fetch_pull_requests_graphql", lambda **kwargs: graphql)
+    monkeypatch.setattr(github_ingest, "fetch_pull_requests", lambda **kwargs: rest)
+    monkeypatch.setattr(github_ingest, "fetch_pr_details", lambda prs: prs)
+    assert github_graphql.compare_backends() == 0
+
+    rest[0]["review_comments"] = 3  # e.g. a backend that only saw the first 100 reviews
+    rest[1]["repo_full_name"] = None
+    assert github_graphql.compare_backends() == 2
+
+
+def test_records_feed_process_pull_requests(recorded):
+    prs = github_graphql.fetch_pull_requests_graphql(owner="o", repo="r")
+    df, overall, author_metrics = process_pull_requests(prs)
+    assert overall["total_prs"] == 3 and overall["merged_prs"] == 1
+    assert set(author_metrics["author"]) == {"alice", "carol"}
+
+
+def test_state_filter_maps_to_graphql_states(monkeypatch):
+    sent = []
+
+    def fake_post(url, json):
+        sent.append(json["variables"])
+        return FakeResponse(load_fixture("graphql_pull_requests_page2.json"))
+
+    monkeypatch.setattr(github_graphql.SCHEDULER, "post", fake_post)
+    github_graphql.fetch_pull_requests_graphql(state="closed", owner="o", repo="r")
+    assert sent[0]["states"] == ["CLOSED", "MERGED"]
+
+
+def test_graphql_errors_raise(monkeypatch):
+    monkeypatch.setattr(github_graphql.SCHEDULER, "post", lambda url, json: FakeResponse(load_fixture("graphql_error.json")))
+    with pytest.raises(RuntimeError, match="Could not resolve"):
+        github_graphql.fetch_pull_requests_graphql(owner="AICloudProjects", repo="missing")
@@ -0,0 +1,116 @@
+import json
+import pytest
+from src.ingest import incremental
+from src.ingest.incremental import fetch_new_commits, fetch_updated_pull_requests, merge_records
+
+
+class FakeResponse:
+    def __init__(self, payload, next_url=None, status_code=200, etag='"v1"'):
+        self.payload = payload
+        self.status_code = status_code
+        self.headers = {"ETag": etag}
+        self.links = {"next": {"url": next_url}} if next_url else {}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+@pytest.fixture
+def github(monkeypatch):
+    """Serve `github.pages` (url → response) and record every request."""
+    calls = []
+
+    def fake_get(url, params=None, headers=None):
+        calls.append({"url": url, "params": params or {}, "headers": headers or {}})
+        return github.pages[url] if url in github.pages else github.pages["first"]
+
+    monkeypatch.setattr(incremental.SCHEDULER, "get", fake_get)
+    github.calls = calls
+    github.pages = {}
+    return github
+
+
+def commit(sha, committed):
+    return {"sha": sha, "commit": {"author": {"name": "a", "date": committed}, "committer": {"date": committed},
+                                   "message": "m"}, "author": {"login": "a"}}
+
+
+def pr(number, updated_at):
+    return {"number": number, "updated_at": updated_at, "created_at": updated_at, "state": "open",
+            "user": {"login": "a"}}
+
+
+def test_merge_upserts_by_natural_key():
+    existing = [{"number": 1, "title": "old"}, {"number": 2, "title": "kept"}]
+    merged = merge_records(existing, [{"number": 1, "title": "new"}, {"number": 3, "title": "added"}], "number")
+    assert sorted((r["number"], r["title"]) for r in merged) == [(1, "new"), (2, "kept"), (3, "added")]
+
+
+def test_commits_reread_a_lookback_window(github, monkeypatch):
+    monkeypatch.setattr(incremental, "COMMIT_LOOKBACK_HOURS", 24)
+    # A commit committed before the watermark but pushed after the last run
+    github.pages["first"] = FakeResponse([commit("late", "2025-11-04T08:00:00Z"), commit("old", "2025-11-05T09:00:00Z")])
+    checkpoint = {"last_commit_date": "2025-11-05T10:00:00Z"}
+
+    commits = fetch_new_commits(checkpoint)
+    assert github.calls[0]["params"]["since"] == "2025-11-04T10:00:00Z"
+    assert [c["sha"] for c in commits] == ["late", "old"]
+    assert checkpoint["last_commit_date"] == "2025-11-05T10:00:00Z"  # never moves back
+
+
+def test_commit_watermark_advances_to_the_newest_commit(github):
+    github.pages["first"] = FakeResponse([commit("a", "2025-11-06T08:00:00Z"), commit("b", "2025-11-05T12:00:00Z")])
+    checkpoint = {"last_commit_date": "2025-11-05T10:00:00Z"}
+    fetch_new_commits(checkpoint)
+    assert checkpoint["last_commit_date"] == "2025-11-06T08:00:00Z"
+    assert checkpoint["commits_etag"] == '"v1"'
+
+
+def test_pr_watermark_advances_once_the_pages_reach_it(github):
+    github.pages["first"] = FakeResponse([pr(3, "2025-11-06T00:00:00Z"), pr(2, "2025-11-05T00:00:00Z")], next_url="p2")
+    github.pages["p2"] = FakeResponse([pr(1, "2025-11-04T00:00:00Z"), pr(0, "2025-11-01T00:00:00Z")], next_url="p3")
+    checkpoint = {"last_pr_updated_at": "2025-11-02T00:00:00Z"}
+
+    prs = fetch_updated_pull_requests(checkpoint, per_page=2)
+    assert [p["number"] for p in prs] == [3, 2, 1]
+    assert [c["url"] for c in github.calls] == [github.calls[0]["url"], "p2"]  # stops at the watermark
+    assert checkpoint["last_pr_updated_at"] == "2025-11-06T00:00:00Z"
+
+
+def test_pr_watermark_holds_when_max_pages_cuts_the_fetch(github):
+    github.pages["first"] = FakeResponse([pr(5, "2025-11-06T00:00:00Z"), pr(4, "2025-11-05T00:00:00Z")], next_url="p2")
+    github.pages["p2"] = FakeResponse([pr(3, "2025-11-04T00:00:00Z"), pr(2, "2025-11-03T00:00:00Z")], next_url="p3")
+    checkpoint = {"last_pr_updated_at": "2025-11-01T00:00:00Z", "pulls_etag": '"v0"'}
+
+    prs = fetch_updated_pull_requests(checkpoint, per_page=2, max_pages=2)
+    assert [p["number"] for p in prs] == [5, 4, 3, 2]
+    # PRs updated between 11-01 and 11-03 weren't listed: the next run must still ask for them
+    assert checkpoint["last_pr_updated_at"] == "2025-11-01T00:00:00Z"
+    assert "pulls_etag" not in checkpoint
+
+
+def test_run_incremental_merges_and_then_checkpoints(fake_s3, monkeypatch, tmp_path):
+    monkeypatch.setattr(incremental, "CHECKPOINT_DIR", str(tmp_path))
+    monkeypatch.setattr(incremental, "require_config", lambda owner, repo: None)
+    monkeypatch.setattr(incremental, "fetch_pr_details", lambda prs: prs)
+    monkeypatch.setattr(incremental, "fetch_new_workflow_runs", lambda checkpoint: [])
+    fake_s3.put_object(Bucket="b", Key="github/commits.json", Body=json.dumps([commit("a", "2025-11-01T00:00:00Z")]))
+
+    def fake_get(url, params=None, headers=None):
+        if url.endswith("/commits"):
+            return FakeResponse([commit("a", "2025-11-01T00:00:00Z"), commit("b", "2025-11-06T00:00:00Z")])
+        return FakeResponse([pr(7, "2025-11-06T00:00:00Z")])
+
+    monkeypatch.setattr(incremental.SCHEDULER, "get", fake_get)
+    result = incremental.run_incremental()
+
+    stored = json.loads(fake_s3.objects["github/commits.json"])
+    assert sorted(c["sha"] for c in stored) == ["a", "b"]
+    assert [p["number"] for p in result["pull_requests"]] == [7]
+    [path] = tmp_path.glob("*.json")
+    saved = json.loads(path.read_text())
+    assert saved["last_commit_date"] == "2025-11-06T00:00:00Z"
+    assert saved["last_pr_updated_at"] == "2025-11-06T00:00:00Z"
@@ -0,0 +1,69 @@
+import pytest
+from src.ingest.object_cache import OBJECT_CACHE_PREFIX, ObjectCache, content_key
+
+
+@pytest.fixture
+def cache(fake_s3, tmp_path):
+    return ObjectCache("pull_request", local_dir=str(tmp_path / "a"))
+
+
+def test_content_key_is_stable_per_kind():
+    assert content_key("pull_request", "o/r#1") == content_key("pull_request", "o/r#1")
+    assert content_key("pull_request", "o/r#1") != content_key("commit", "o/r#1")
+    assert content_key("pull_request", "o/r#1").startswith("pull_request/")
+
+
+def test_immutable_entries_are_served_whatever_the_updated_at(cache):
+    cache.put("o/r#1", {"additions": 3}, updated_at="2025-11-01T00:00:00Z", immutable=True)
+    assert cache.get("o/r#1", updated_at="2025-11-09T00:00:00Z") == {"additions": 3}
+    # ...unless the caller knows the object can change again (a reopened PR)
+    assert cache.get("o/r#1", updated_at="2025-11-09T00:00:00Z", mutable=True) is None
+    assert cache.stats() == {"hits": 1, "misses": 0, "stale": 1}
+
+
+def test_mutable_entries_expire_when_updated_at_changes(cache):
+    cache.put("o/r#2", {"additions": 1}, updated_at="2025-11-01T00:00:00Z")
+    assert cache.get("o/r#2", updated_at="2025-11-01T00:00:00Z") == {"additions": 1}
+    assert cache.get("o/r#2", updated_at="2025-11-02T00:00:00Z") is None
+    assert cache.get("o/r#2") is None
+    assert cache.get("o/r#3") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "stale": 2}
+
+
+def test_cold_local_tier_warms_from_s3(cache, fake_s3, tmp_path):
+    cache.put("o/r#1", {"additions": 3}, immutable=True)
+    assert f"{OBJECT_CACHE_PREFIX}{content_key('pull_request', 'o/r#1')}" in fake_s3.objects
+
+    cold = ObjectCache("pull_request", local_dir=str(tmp_path / "b"))  # e.g. a new Lambda container
+    assert cold.get("o/r#1") == {"additions": 3}
+    fake_s3.objects.clear()
+    assert cold.get("o/r#1") == {"additions": 3}  # now served from its local tier
+
+
+def test_local_only_cache_never_touches_s3(fake_s3, tmp_path):
+    cache = ObjectCache("pull_request", local_dir=str(tmp_path), use_s3=False)
+    cache.put("o/r#1", {"additions": 3}, immutable=True)
+    assert fake_s3.objects == {}
+    assert cache.get("o/r#1") == {"additions": 3}
+
+
+def test_fetch_pr_details_only_calls_the_api_on_misses(fake_s3, tmp_path, monkeypatch):
+    from src.ingest import github_ingest
+
+    monkeypatch.setattr(github_ingest, "ObjectCache", lambda kind: ObjectCache(kind, local_dir=str(tmp_path)))
+    calls = []
+
+    def fake_detail(pr, owner, repo):
+        calls.append(pr["number"])
+        return {**pr, "additions": pr["number"] * 10}
+
+    monkeypatch.setattr(github_ingest, "_fetch_pr_detail", fake_detail)
+    prs = [{"number": 1, "state": "closed", "updated_at": "2025-11-01T00:00:00Z"},
+           {"number": 2, "state": "open", "updated_at": "2025-11-01T00:00:00Z"}]
+    github_ingest.fetch_pr_details(prs, owner="o", repo="r", use_cache=True)
+    assert sorted(calls) == [1, 2]
+
+    prs[1]["updated_at"] = "2025-11-02T00:00:00Z"  # the open PR changed since
+    detailed = github_ingest.fetch_pr_details(prs, owner="o", repo="r", use_cache=True)
+    assert sorted(calls) == [1, 2, 2]
+    assert [pr["additions"] for pr in detailed] == [10, 20]
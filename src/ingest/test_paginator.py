@@ -0,0 +1,76 @@
+import threading
+import time
+import pytest
+from src.ingest import paginator
+from src.ingest.paginator import iter_pages, paginate
+
+URL = "https://api.github.com/repos/o/r/pulls"
+
+
+class FakeResponse:
+    def __init__(self, payload, links=None):
+        self.payload = payload
+        self.links = links or {}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+@pytest.fixture
+def github(monkeypatch):
+    """Serve pages keyed by (url, page) and record every request."""
+    calls = []
+    lock = threading.Lock()
+
+    def fake_get(url, params=None):
+        params = params or {}
+        with lock:
+            calls.append((url, params.get("page")))
+        page = params.get("page", 1)
+        if page > 1:
+            time.sleep(0.01 * (6 - page))  # later pages finish first
+        return github.pages[(url, page)]
+
+    monkeypatch.setattr(paginator.SCHEDULER, "get", fake_get)
+    github.calls = calls
+    github.pages = {}
+    return github
+
+
+def numbered(github, count, per_page=2):
+    for page in range(1, count + 1):
+        links = {"next": {"url": f"{URL}?page={page + 1}"}, "last": {"url": f"{URL}?per_page={per_page}&page={count}"}}
+        items = [{"n": (page - 1) * per_page + i} for i in range(per_page)]
+        github.pages[(URL, page)] = FakeResponse(items, links if page < count else {})
+
+
+def test_pages_are_yielded_in_page_order(github):
+    numbered(github, 5)
+    assert [item["n"] for item in paginate(URL, {"per_page": 2})] == list(range(10))
+    assert sorted(page for _, page in github.calls[1:]) == [2, 3, 4, 5]
+
+
+def test_max_pages_caps_the_fetch(github):
+    numbered(github, 5)
+    assert [page[0]["n"] for page in iter_pages(URL, {"per_page": 2}, max_pages=3)] == [0, 2, 4]
+    assert len(github.calls) == 3
+
+
+def test_total_count_gives_the_page_count(github):
+    for page in (1, 2, 3):
+        links = {"next": {"url": "unused"}} if page == 1 else {}
+        github.pages[(URL, page)] = FakeResponse({"total_count": 5, "runs": [{"page": page}]}, links)
+    pages = list(iter_pages(URL, {"per_page": 2}, items_key="runs"))
+    assert pages == [[{"page": 1}], [{"page": 2}], [{"page": 3}]]
+
+
+def test_last_link_without_a_page_number_follows_next(github):
+    # Cursor-based links: rel="last" carries no page parameter
+    github.pages[(URL, 1)] = FakeResponse([1], {"next": {"url": "c2"}, "last": {"url": f"{URL}?before=Y3Vy"}})
+    github.pages[("c2", 1)] = FakeResponse([2], {"next": {"url": "c3"}})
+    github.pages[("c3", 1)] = FakeResponse([3])
+    assert paginate(URL, {"per_page": 1}) == [1, 2, 3]
+    assert [url for url, _ in github.calls] == [URL, "c2", "c3"]
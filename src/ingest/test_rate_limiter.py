@@ -0,0 +1,134 @@
+import types
+import pytest
+from src.ingest import rate_limiter
+from src.ingest.rate_limiter import RateLimitExceeded, RateLimitScheduler
+
+NOW = 1_714_572_000.0
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, headers=None, text=""):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = text
+
+
+class FakeSession:
+    """Answers with `respond(token)` and records which token each request used."""
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.tokens = []
+
+    def request(self, method, url, headers=None, **kwargs):
+        token = headers["Authorization"].split()[-1]
+        self.tokens.append(token)
+        return self.respond(token)
+
+
+class FakeDeadline:
+    def __init__(self, remaining, margin=60):
+        self.seconds, self.margin = remaining, margin
+
+    def remaining(self):
+        return self.seconds
+
+
+def budget(remaining, limit=5000, reset_in=3600):
+    return {"X-RateLimit-Remaining": str(remaining), "X-RateLimit-Limit": str(limit),
+            "X-RateLimit-Reset": str(NOW + reset_in)}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Frozen time.time; time.sleep advances it and records the pauses."""
+    state = types.SimpleNamespace(now=NOW, slept=[])
+
+    def sleep(seconds):
+        state.slept.append(seconds)
+        state.now += seconds
+
+    monkeypatch.setattr(rate_limiter, "time", types.SimpleNamespace(time=lambda: state.now, sleep=sleep))
+    return state
+
+
+def test_routes_to_the_token_with_budget_left(clock):
+    session = FakeSession(lambda token: FakeResponse(headers=budget(0 if token == "aaaa" else 4000)))
+    scheduler = RateLimitScheduler(["aaaa", "bbbb"], session)
+    for _ in range(4):
+        scheduler.get("https://api.github.com/repos/o/r/pulls")
+    # Both budgets are unknown at first; once "aaaa" reports 0 left, everything goes to "bbbb"
+    assert session.tokens[-2:] == ["bbbb", "bbbb"]
+    assert clock.slept == []
+    assert {s["token"]: s["remaining"] for s in scheduler.stats()}["…aaaa"] == 0
+
+
+def test_exhausted_token_retries_on_another(clock):
+    def respond(token):
+        if token == "aaaa":
+            return FakeResponse(403, budget(0))
+        return FakeResponse(200, budget(100))
+
+    session = FakeSession(respond)
+    scheduler = RateLimitScheduler(["aaaa", "bbbb"], session)
+    scheduler._budget("bbbb", "core").remaining = 0  # "aaaa" is picked first
+    scheduler._budget("bbbb", "core").reset_at = NOW - 1  # but "bbbb" has already reset
+    assert scheduler.get("https://api.github.com/x").status_code == 200
+    assert session.tokens == ["aaaa", "bbbb"] and clock.slept == []
+
+
+def test_paces_a_low_token_over_its_reset_window(clock):
+    session = FakeSession(lambda token: FakeResponse(headers=budget(10, limit=100, reset_in=100)))
+    scheduler = RateLimitScheduler(["aaaa"], session)
+    scheduler.get("https://api.github.com/x")  # learns: 10 of 100 left, reset in 100 s
+    scheduler.get("https://api.github.com/x")
+    scheduler.get("https://api.github.com/x")
+    # Below 20% left: requests are spread as reset window / remaining
+    assert clock.slept and all(9 <= pause <= 12 for pause in clock.slept)
+
+
+def test_raises_instead_of_waiting_past_max_wait(clock):
+    session = FakeSession(lambda token: FakeResponse(403, budget(0, reset_in=1000)))
+    scheduler = RateLimitScheduler(["aaaa"], session, max_wait=900)
+    # The 403 says the token is out until the reset; waiting for it would take too long
+    with pytest.raises(RateLimitExceeded):
+        scheduler.get("https://api.github.com/x")
+    assert len(session.tokens) == 1 and clock.slept == [] and scheduler.exhausted == 1
+
+
+def test_waits_are_capped_by_the_deadline(clock):
+    session = FakeSession(lambda token: FakeResponse(403, budget(0, reset_in=100)))
+    scheduler = RateLimitScheduler(["aaaa"], session, max_wait=900)
+    scheduler.set_deadline(FakeDeadline(remaining=120, margin=60))  # 60 s usable, reset in ~100 s
+    with pytest.raises(RateLimitExceeded):
+        scheduler.get("https://api.github.com/x")
+    assert clock.slept == []
+
+    scheduler.set_deadline(FakeDeadline(remaining=400, margin=60))
+    session.respond = lambda token: FakeResponse(200, budget(4999, reset_in=3600))
+    assert scheduler.get("https://api.github.com/x").status_code == 200
+    assert clock.slept == [pytest.approx(101)]
+
+
+def test_secondary_limit_without_retry_after_backs_off_a_minute(clock):
+    responses = [FakeResponse(403, {"X-RateLimit-Remaining": "4000"}, "You have exceeded a secondary rate limit."),
+                 FakeResponse(200, budget(3999))]
+    scheduler = RateLimitScheduler(["aaaa"], FakeSession(lambda token: responses.pop(0)))
+    assert scheduler.get("https://api.github.com/x").status_code == 200
+    assert clock.slept == [rate_limiter.SECONDARY_BACKOFF_SECONDS]
+
+
+def test_retry_after_past_the_deadline_raises(clock):
+    session = FakeSession(lambda token: FakeResponse(429, {"Retry-After": "300"}))
+    scheduler = RateLimitScheduler(["aaaa"], session)
+    scheduler.set_deadline(FakeDeadline(remaining=200, margin=60))
+    with pytest.raises(RateLimitExceeded):
+        scheduler.get("https://api.github.com/x")
+    assert len(session.tokens) == 1
+
+
+def test_other_403s_are_returned_as_is(clock):
+    session = FakeSession(lambda token: FakeResponse(403, {"X-RateLimit-Remaining": "4000"}, "Resource not accessible"))
+    scheduler = RateLimitScheduler(["aaaa"], session)
+    assert scheduler.get("https://api.github.com/x").status_code == 403
+    assert len(session.tokens) == 1 and clock.slept == []
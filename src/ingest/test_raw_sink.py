@@ -0,0 +1,39 @@
+import base64
+import os
+import pytest
+from src.ingest.raw_sink import NDJSONS3Sink, iter_ndjson_from_s3, load_raw, save_raw
+
+
+def big_records(n=700):
+    # ~10 KiB of incompressible text each: enough for a multipart upload with 5 MiB parts
+    return [{"id": i, "blob": base64.b64encode(os.urandom(7500)).decode("ascii")} for i in range(n)]
+
+
+def test_small_stream_round_trips(fake_s3):
+    records = [{"id": i, "title": f"PR {i}"} for i in range(3)]
+    key = save_raw(records, "github/", "pull_requests_detailed", fmt="ndjson")
+    assert key == "github/pull_requests_detailed.ndjson.gz"
+    assert list(iter_ndjson_from_s3(key)) == records
+    assert load_raw("github/", "pull_requests_detailed", fmt="ndjson") == records
+
+
+def test_multipart_stream_round_trips(fake_s3):
+    records = big_records()
+    with NDJSONS3Sink("github/big.ndjson.gz", part_size=0) as sink:
+        sink.write_many(records)
+    assert sink._upload_id is not None and len(sink._parts) >= 2
+    assert [r["id"] for r in iter_ndjson_from_s3("github/big.ndjson.gz")] == list(range(len(records)))
+    assert fake_s3.uploads == {}
+
+
+def test_failed_close_aborts_the_multipart_upload(fake_s3, monkeypatch):
+    def fail(**kwargs):
+        raise RuntimeError("complete failed")
+
+    monkeypatch.setattr(fake_s3, "complete_multipart_upload", fail)
+    sink = NDJSONS3Sink("github/big.ndjson.gz", part_size=0)
+    sink.write_many(big_records())
+    assert fake_s3.uploads  # parts already uploaded
+    with pytest.raises(RuntimeError):
+        sink.close()
+    assert fake_s3.uploads == {} and "github/big.ndjson.gz" not in fake_s3.objects
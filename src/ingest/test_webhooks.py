@@ -0,0 +1,241 @@
+import base64
+import json
+import os
+import pytest
+from src.ingest import webhooks
+from src.process.cicd_metrics_processor import process_workflow_runs
+from src.process.metrics_processor import process_commits, process_pull_requests
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+SECRET = "test-webhook-secret"
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name)) as f:
+        return json.load(f)
+
+
+def replay(name, secret=SECRET, base64_body=False, signature=None):
+    """Turn a recorded delivery into the API Gateway / Function URL event GitHub would produce."""
+    recorded = load_fixture(name)
+    body = json.dumps(recorded["payload"]).encode("utf-8")
+    headers = {**recorded["headers"], "X-Hub-Signature-256": signature or webhooks.sign(body, secret)}
+    return {
+        "headers": headers,
+        "body": base64.b64encode(body).decode("ascii") if base64_body else body.decode("utf-8"),
+        "isBase64Encoded": base64_body,
+    }
+
+
+class FakeClock:
+    def __init__(self, now=1_714_572_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def batcher(tmp_path, monkeypatch):
+    """Batcher on a local spool that captures flushed batches instead of writing to S3."""
+    monkeypatch.setattr(webhooks, "WEBHOOK_SECRET", SECRET)
+    flushed = []
+    b = webhooks.MicroBatcher(
+        webhooks.LocalSpool(str(tmp_path / "spool")),
+        max_records=100,
+        max_age=60,
+        flush=lambda dataset, repo, records: flushed.append((dataset, repo, records)),
+        clock=FakeClock(),
+    )
+    b.flushed = flushed
+    return b
+
+
+def test_replayed_deliveries_map_to_processor_records(batcher):
+    for name in ("webhook_push.json", "webhook_pull_request.json", "webhook_workflow_run.json"):
+        assert webhooks.handle_webhook(replay(name), batcher=batcher)["statusCode"] == 202
+    assert batcher.flushed == []  # below both thresholds: spooled only
+
+    batcher.flush_due(force=True)
+    batches = {dataset: (repo, records) for dataset, repo, records in batcher.flushed}
+    assert {repo for repo, _ in batches.values()} == {"repo=acme__widgets"}
+
+    commits_df, commit_metrics = process_commits(batches["commits"][1])
+    assert commit_metrics["total_commits"] == 2
+    assert set(commits_df["author_login"]) == {"dortiz", "samlee"}
+    # Offsets are normalized to UTC like the REST API's timestamps
+    assert sorted(commits_df["commit.author.date"]) == ["2024-05-01T14:05:12Z", "2024-05-01T14:07:40Z"]
+
+    pr_df, pr_metrics, _ = process_pull_requests(batches["pull_requests"][1])
+    assert pr_metrics["merged_prs"] == 1
+    row = pr_df.iloc[0]
+    assert (row["merged_by"], row["commits_in_pr"], row["additions"]) == ("samlee", 4, 120)
+    assert row["repo_full_name"] == "acme/widgets"
+
+    runs_df, run_metrics = process_workflow_runs(batches["workflow_runs"][1])
+    assert run_metrics["failed_runs"] == 1
+    assert runs_df.iloc[0]["actor.login"] == "samlee"
+
+    assert batcher.spool.entries() == []
+
+
+def test_pushes_outside_the_default_branch_are_ignored():
+    payload = load_fixture("webhook_push.json")["payload"]
+    payload["ref"] = "refs/heads/feature/login"
+    assert webhooks.map_push(payload) == []
+
+
+def test_truncated_pushes_are_read_from_the_compare_api(monkeypatch):
+    payload = load_fixture("webhook_push.json")["payload"]
+    payload["size"] = 25
+    compared = [{"sha": f"{i:040x}", "commit": {"author": {"date": "2024-05-01T14:00:00Z"}}} for i in range(25)]
+    calls = []
+    monkeypatch.setattr(webhooks, "_compare_commits", lambda full_name, before, after: calls.append((full_name, before, after)) or compared)
+    records = webhooks.map_push(payload)
+    assert calls == [("acme/widgets", payload["before"], payload["after"])]
+    assert [r["sha"] for r in records] == [c["sha"] for c in compared]
+
+
+def test_base64_bodies_are_accepted(batcher):
+    response = webhooks.handle_webhook(replay("webhook_push.json", base64_body=True), batcher=batcher)
+    assert json.loads(response["body"])["records"] == 2
+
+
+@pytest.mark.parametrize("signature", ["sha256=" + "0" * 64, "sha1=deadbeef", ""])
+def test_bad_signatures_are_rejected(batcher, signature):
+    event = replay("webhook_push.json", signature=signature or None)
+    if not signature:
+        del event["headers"]["X-Hub-Signature-256"]
+    assert webhooks.handle_webhook(event, batcher=batcher)["statusCode"] == 401
+    assert batcher.spool.entries() == []
+
+
+def test_body_tampered_after_signing_is_rejected(batcher):
+    event = replay("webhook_pull_request.json")
+    event["body"] = event["body"].replace('"additions": 120', '"additions": 999')
+    assert webhooks.handle_webhook(event, batcher=batcher)["statusCode"] == 401
+
+
+def test_missing_secret_fails_closed(batcher, monkeypatch):
+    monkeypatch.setattr(webhooks, "WEBHOOK_SECRET", None)
+    assert webhooks.handle_webhook(replay("webhook_push.json"), batcher=batcher)["statusCode"] == 500
+    assert batcher.spool.entries() == []
+
+
+def test_ping_is_acknowledged(batcher):
+    response = webhooks.handle_webhook(replay("webhook_ping.json"), batcher=batcher)
+    assert response["statusCode"] == 200
+    assert batcher.spool.entries() == []
+
+
+def test_batches_flush_by_size(batcher):
+    batcher.max_records = 4
+    webhooks.handle_webhook(replay("webhook_push.json"), batcher=batcher)
+    assert batcher.flushed == []
+    batcher.clock.now += 1
+    response = webhooks.handle_webhook(replay("webhook_push.json"), batcher=batcher)
+    assert json.loads(response["body"])["records"] == 2
+    assert batcher.flushed == []  # deliveries only spool; the scheduled flush writes the batch
+    assert batcher.flush_due() == [
+        {"dataset": "commits", "repo": "repo=acme__widgets", "records": 4, "deliveries": 2}
+    ]
+    assert batcher.spool.entries() == []
+
+
+def test_batches_flush_by_age(batcher):
+    webhooks.handle_webhook(replay("webhook_workflow_run.json"), batcher=batcher)
+    batcher.clock.now += 59
+    assert batcher.flush_due() == []
+    batcher.clock.now += 1
+    assert [f["dataset"] for f in batcher.flush_due()] == ["workflow_runs"]
+
+
+def test_failed_flush_keeps_the_batch(batcher):
+    def broken(dataset, repo, records):
+        raise RuntimeError("S3 unavailable")
+
+    batcher.flush = broken
+    batcher.max_records = 1  # due right away: the delivery must still be acknowledged
+    response = webhooks.handle_webhook(replay("webhook_push.json"), batcher=batcher)
+    assert response["statusCode"] == 202  # the delivery itself is safely spooled
+    batcher.clock.now += 120
+    with pytest.raises(RuntimeError):
+        batcher.flush_due()
+    assert len(batcher.spool.entries()) == 1
+
+
+def test_leased_batches_are_skipped(batcher):
+    webhooks.handle_webhook(replay("webhook_push.json"), batcher=batcher)
+    # Another invocation holds the lease for this batch
+    assert batcher.spool.claim("commits", "repo=acme__widgets", ttl=60)
+    assert batcher.flush_due(force=True) == []
+    assert len(batcher.spool.entries()) == 1
+
+    batcher.spool.release("commits", "repo=acme__widgets")
+    assert [f["records"] for f in batcher.flush_due(force=True)] == [2]
+    assert batcher.spool.entries() == []
+    # The lease is released after the flush
+    assert batcher.spool.claim("commits", "repo=acme__widgets", ttl=60)
+
+
+def test_stale_leases_are_taken_over(batcher):
+    webhooks.handle_webhook(replay("webhook_push.json"), batcher=batcher)
+    assert batcher.spool.claim("commits", "repo=acme__widgets", ttl=60)
+    batcher.lease_seconds = 0  # the holder died mid-flush
+    assert [f["dataset"] for f in batcher.flush_due(force=True)] == ["commits"]
+
+
+def test_lambda_handler_routes_deliveries(batcher, monkeypatch):
+    import lambda_handler
+
+    monkeypatch.setattr(lambda_handler, "handle_webhook", lambda event: webhooks.handle_webhook(event, batcher=batcher))
+    response = lambda_handler.lambda_handler(replay("webhook_workflow_run.json"), None)
+    assert response["statusCode"] == 202
+    assert json.loads(response["body"])["dataset"] == "workflow_runs"
+    assert lambda_handler.lambda_handler(replay("webhook_push.json", secret="wrong"), None)["statusCode"] == 401
+
+
+@pytest.fixture
+def append_calls(monkeypatch):
+    """Records the stores append_batch writes to instead of touching S3."""
+    from src.ingest import s3_uploader
+    from src.process import agg_state, metrics_processor, parquet_writer, rollups
+
+    calls = []
+    monkeypatch.setattr(webhooks, "save_raw", lambda records, folder, name, fmt: calls.append(("raw", folder, fmt, len(records))) or f"{folder}{name}.ndjson.gz")
+    monkeypatch.setattr(parquet_writer, "save_processed_parquet", lambda df, name, repo_partition: calls.append(("parquet", name, repo_partition, len(df))))
+    monkeypatch.setattr(rollups, "update_rollups", lambda df, name, repo, parquet, whole_days: calls.append(("rollups", name, parquet, whole_days)))
+    monkeypatch.setattr(metrics_processor, "fold_pull_requests", lambda df, repo_partition: calls.append(("fold", repo_partition)))
+    monkeypatch.setattr(s3_uploader, "mark_processed_version", lambda name: calls.append(("version", name)))
+    monkeypatch.setattr(agg_state, "AGG_STATE_ENABLED", True)
+    return calls
+
+
+def test_append_batch_writes_raw_and_processed(append_calls, monkeypatch):
+    from src.process import metrics_processor
+
+    monkeypatch.setattr(metrics_processor, "PROCESSED_FORMAT", "parquet")
+    records = webhooks.map_pull_request(load_fixture("webhook_pull_request.json")["payload"])
+    key = webhooks.append_batch("pull_requests", "repo=acme__widgets", records)
+    assert key.startswith("github/webhooks/repo=acme__widgets/pull_requests-")
+    assert append_calls == [
+        ("raw", "github/webhooks/repo=acme__widgets/", "ndjson", 1),
+        ("parquet", "pull_requests_processed", "repo=acme__widgets", 1),
+        ("rollups", "pull_requests_processed", True, False),
+        ("fold", "repo=acme__widgets"),
+        ("version", "pull_requests_processed"),
+    ]
+
+
+def test_append_batch_skips_parquet_in_csv_layout(append_calls, monkeypatch):
+    from src.process import metrics_processor
+
+    monkeypatch.setattr(metrics_processor, "PROCESSED_FORMAT", "csv")
+    records = webhooks.map_pull_request(load_fixture("webhook_pull_request.json")["payload"])
+    webhooks.append_batch("pull_requests", "repo=acme__widgets", records)
+    # Micro-batch-only Parquet partitions would replace whole rollup days with partial counts
+    assert append_calls == [
+        ("raw", "github/webhooks/repo=acme__widgets/", "ndjson", 1),
+        ("rollups", "pull_requests_processed", False, False),
+        ("fold", "repo=acme__widgets"),
+    ]
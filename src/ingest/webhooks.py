@@ -0,0 +1,416 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+import requests
+from datetime import datetime, timezone
+from src.clients import shared
+from src.ingest.raw_sink import save_raw
+from src.ingest.s3_uploader import BUCKET_NAME, CONFLICT_CODES, repo_partition, s3
+from src.ingest.schemas import project, project_many
+
+# Shared secret configured on the GitHub webhook; deliveries are rejected without it
+WEBHOOK_SECRET = os.getenv("GITHUB_WEBHOOK_SECRET")
+
+# The scheduled flush writes a micro-batch once it holds this many records, or its oldest delivery is this old
+WEBHOOK_BATCH_RECORDS = int(os.getenv("WEBHOOK_BATCH_RECORDS", "200"))
+WEBHOOK_BATCH_SECONDS = int(os.getenv("WEBHOOK_BATCH_SECONDS", "60"))
+
+# Pending deliveries are spooled to S3 (survives cold starts); set WEBHOOK_SPOOL_DIR to spool locally
+WEBHOOK_SPOOL_DIR = os.getenv("WEBHOOK_SPOOL_DIR")
+PENDING_PREFIX = "webhooks/pending/"
+
+# Flushing a (dataset, repo) batch takes a lease first, so concurrent invocations never flush the same
+# entries. A lease older than this is from an invocation that died mid-flush and may be taken over
+# (default: the Lambda timeout ceiling, so a live flush never loses its lease)
+LEASE_PREFIX = "webhooks/leases/"
+WEBHOOK_LEASE_SECONDS = int(os.getenv("WEBHOOK_LEASE_SECONDS", "900"))
+
+# Push payloads list at most this many commits; larger pushes are read from the compare API
+PUSH_COMMITS_LIMIT = 20
+
+# Raw folder per dataset (same as the polled raw datasets)
+RAW_FOLDERS = {"commits": "github/", "pull_requests": "github/", "workflow_runs": "cicd/"}
+
+
+class WebhookError(Exception):
+    """A delivery that can't be accepted; `status` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+# --- Signature validation ---
+def sign(body, secret):
+    """X-Hub-Signature-256 value GitHub sends for `body` (bytes)."""
+    return "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(body, signature, secret=None):
+    secret = secret or WEBHOOK_SECRET
+    if not secret:
+        raise WebhookError("❌ GITHUB_WEBHOOK_SECRET is not configured", status=500)
+    if not signature or not hmac.compare_digest(sign(body, secret), signature):
+        raise WebhookError("❌ Invalid webhook signature", status=401)
+
+
+# --- Payload → processor record shapes ---
+def _utc(timestamp):
+    """Push timestamps carry an offset (2024-05-01T14:00:00+02:00); the processors expect UTC ...Z."""
+    if not timestamp:
+        return None
+    return datetime.fromisoformat(timestamp).astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _compare_commits(full_name, before, after):
+    """Every commit between two SHAs, in the REST commit shape (compare API, paginated)."""
+    # Imported here so deliveries that fit in the payload don't load the GitHub client
+    from src.ingest.github_client import API_URL
+    from src.ingest.paginator import paginate
+
+    url = f"{API_URL}/repos/{full_name}/compare/{before}...{after}"
+    return paginate(url, {"per_page": 100}, items_key="commits")
+
+
+def map_push(payload):
+    # Polling only follows the default branch; pushes to other branches would skew the commit tables
+    default_branch = payload["repository"].get("default_branch")
+    if payload.get("ref") != f"refs/heads/{default_branch}":
+        return []
+
+    commits = payload.get("commits") or []
+    size = payload.get("size", len(commits))
+    before, after = payload.get("before") or "", payload.get("after")
+    if (size > len(commits) or len(commits) >= PUSH_COMMITS_LIMIT) and before.strip("0") and after:
+        try:
+            return project_many(_compare_commits(payload["repository"]["full_name"], before, after), "commit")
+        except requests.RequestException as e:
+            # The scheduled incremental run backfills whatever the payload left out
+            print(f"⚠️ Compare {before[:7]}...{after[:7]} failed, keeping the {len(commits)} payload commits: {e}")
+
+    records = []
+    for c in commits:
+        author, committer = c.get("author") or {}, c.get("committer") or {}
+        records.append(project({
+            "sha": c.get("id"),
+            "html_url": c.get("url"),
+            "commit": {
+                "author": {"name": author.get("name"), "email": author.get("email"), "date": _utc(c.get("timestamp"))},
+                "committer": {"date": _utc(c.get("timestamp"))},
+                "message": c.get("message"),
+            },
+            "author": {"login": author.get("username")},
+            "committer": {"login": committer.get("username")},
+        }, "commit"))
+    return records
+
+
+def map_pull_request(payload):
+    pr = payload["pull_request"]
+    # Webhook PRs already carry the detail fields fetch_pr_details adds
+    return [project({
+        **pr,
+        "merged_by": (pr.get("merged_by") or {}).get("login"),
+        "commits_in_pr": pr.get("commits"),
+    }, "pull_request")]
+
+
+def map_workflow_run(payload):
+    return [project(payload["workflow_run"], "workflow_run")]
+
+
+# GitHub event → (dataset, mapper)
+EVENTS = {
+    "push": ("commits", map_push),
+    "pull_request": ("pull_requests", map_pull_request),
+    "workflow_run": ("workflow_runs", map_workflow_run),
+}
+
+
+# --- Durable spool of pending deliveries ---
+# Entries are named <received_ms>-<delivery>-<records>.json, so listing alone
+# gives a batch's size and age. A redelivery is spooled again; the processed
+# stores upsert by natural key, so it doesn't double count.
+def _entry_name(received_at, delivery, count):
+    return f"{int(received_at * 1000):013d}-{delivery}-{count}.json"
+
+
+def _parse_entry(dataset, repo, name):
+    received_ms, rest = name[:-len(".json")].split("-", 1)
+    delivery, count = rest.rsplit("-", 1)
+    return {"dataset": dataset, "repo": repo, "name": name, "received_at": int(received_ms) / 1000,
+            "delivery": delivery, "count": int(count)}
+
+
+class LocalSpool:
+    def __init__(self, root):
+        self.root = root
+        self.lease_dir = os.path.join(root, "_leases")
+
+    def put(self, dataset, repo, name, records):
+        path = os.path.join(self.root, dataset, repo, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(records, f, default=str)
+
+    def entries(self, dataset=None, repo=None):
+        out = []
+        datasets = [dataset] if dataset else sorted(os.listdir(self.root)) if os.path.isdir(self.root) else []
+        for ds in datasets:
+            if ds.startswith("_") or not os.path.isdir(os.path.join(self.root, ds)):
+                continue
+            for rp in [repo] if repo else sorted(os.listdir(os.path.join(self.root, ds))):
+                folder = os.path.join(self.root, ds, rp)
+                for name in sorted(os.listdir(folder)) if os.path.isdir(folder) else []:
+                    out.append(_parse_entry(ds, rp, name))
+        return out
+
+    def read(self, entry):
+        with open(os.path.join(self.root, entry["dataset"], entry["repo"], entry["name"])) as f:
+            return json.load(f)
+
+    def delete(self, entry):
+        os.remove(os.path.join(self.root, entry["dataset"], entry["repo"], entry["name"]))
+
+    def _lease_path(self, dataset, repo):
+        return os.path.join(self.lease_dir, f"{dataset}__{repo}")
+
+    def claim(self, dataset, repo, ttl):
+        os.makedirs(self.lease_dir, exist_ok=True)
+        path = self._lease_path(dataset, repo)
+        for _ in range(2):
+            try:
+                os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(path) < ttl:
+                        return False
+                    os.remove(path)  # stale: the holder died mid-flush
+                except FileNotFoundError:
+                    pass
+        return False
+
+    def release(self, dataset, repo):
+        try:
+            os.remove(self._lease_path(dataset, repo))
+        except FileNotFoundError:
+            pass
+
+
+class S3Spool:
+    def __init__(self, prefix=PENDING_PREFIX, bucket=BUCKET_NAME, lease_prefix=LEASE_PREFIX):
+        self.prefix = prefix
+        self.bucket = bucket
+        self.lease_prefix = lease_prefix
+
+    def _key(self, entry):
+        return f"{self.prefix}{entry['dataset']}/{entry['repo']}/{entry['name']}"
+
+    def put(self, dataset, repo, name, records):
+        s3.put_object(Bucket=self.bucket, Key=f"{self.prefix}{dataset}/{repo}/{name}",
+                      Body=json.dumps(records, default=str).encode("utf-8"), ContentType="application/json")
+
+    def entries(self, dataset=None, repo=None):
+        out = []
+        prefix = self.prefix + (f"{dataset}/" if dataset else "") + (f"{repo}/" if dataset and repo else "")
+        paginator = s3.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                dataset, repo, name = obj["Key"][len(self.prefix):].split("/", 2)
+                out.append(_parse_entry(dataset, repo, name))
+        return out
+
+    def read(self, entry):
+        return json.loads(s3.get_object(Bucket=self.bucket, Key=self._key(entry))["Body"].read().decode("utf-8"))
+
+    def delete(self, entry):
+        s3.delete_object(Bucket=self.bucket, Key=self._key(entry))
+
+    def _lease_key(self, dataset, repo):
+        return f"{self.lease_prefix}{dataset}/{repo}.json"
+
+    def claim(self, dataset, repo, ttl):
+        """Take the flush lease with a conditional put; False if a live invocation holds it."""
+        key = self._lease_key(dataset, repo)
+        body = json.dumps({"claimed_at": time.time()}).encode("utf-8")
+        try:
+            s3.put_object(Bucket=self.bucket, Key=key, Body=body, IfNoneMatch="*")
+            return True
+        except s3.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] not in CONFLICT_CODES:
+                raise
+        try:
+            head = s3.head_object(Bucket=self.bucket, Key=key)
+        except s3.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] in ("NoSuchKey", "404", "NotFound"):
+                return False  # just released; the next flush picks the batch up
+            raise
+        if time.time() - head["LastModified"].timestamp() < ttl:
+            return False
+        # The holder died mid-flush: take the lease over, unless another invocation just did
+        try:
+            s3.put_object(Bucket=self.bucket, Key=key, Body=body, IfMatch=head["ETag"])
+            return True
+        except s3.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] in CONFLICT_CODES:
+                return False
+            raise
+
+    def release(self, dataset, repo):
+        s3.delete_object(Bucket=self.bucket, Key=self._lease_key(dataset, repo))
+
+
+# --- Appending a micro-batch to the raw and processed stores ---
+def append_batch(dataset, repo, records):
+    """Append one micro-batch: a new raw NDJSON object, then upserts into the processed stores.
+
+    Processed rows follow PROCESSED_FORMAT like save_processed: with "parquet"
+    or "both" they are upserted into the dt partitions (by natural key) and the
+    touched rollup days rebuilt from them. The CSV tables are whole snapshots a
+    micro-batch can't upsert into, so with "csv" only the raw object and the
+    aggregate state are written; the next poll refreshes the tables and rollups.
+    Every store is keyed, so a batch that is flushed twice doesn't double count.
+    """
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+    key = save_raw(records, f"{RAW_FOLDERS[dataset]}webhooks/{repo}/", f"{dataset}-{stamp}", fmt="ndjson")
+
+    # Imported here so deliveries that only spool don't load pandas
+    from src.ingest.s3_uploader import mark_processed_version
+    from src.process.agg_state import AGG_STATE_ENABLED
+    from src.process.metrics_processor import PROCESSED_FORMAT
+    from src.process.parquet_writer import save_processed_parquet
+    from src.process.rollups import update_rollups
+
+    if dataset == "commits":
+        from src.process.metrics_processor import fold_commits as fold, process_commits
+        df, _ = process_commits(records)
+        name = "commits_processed"
+    elif dataset == "pull_requests":
+        from src.process.metrics_processor import fold_pull_requests as fold, process_pull_requests
+        df, _, _ = process_pull_requests(records)
+        name = "pull_requests_processed"
+    else:
+        from src.process.cicd_metrics_processor import fold_workflow_runs as fold, process_workflow_runs
+        df, _ = process_workflow_runs(records)
+        name = "workflow_runs_processed"
+
+    if not df.empty:
+        parquet = PROCESSED_FORMAT in ("parquet", "both")
+        if parquet:
+            save_processed_parquet(df, name, repo_partition=repo)
+        # A micro-batch covers no whole day: without Parquet the rollups are left to the next poll
+        update_rollups(df, name, repo, parquet=parquet, whole_days=False)
+        if AGG_STATE_ENABLED:
+            fold(df, repo_partition=repo)
+        if parquet:
+            mark_processed_version(name)
+    return key
+
+
+class MicroBatcher:
+    """Spools mapped records per (dataset, repo) and flushes them as micro-batches by size or age.
+
+    Deliveries only spool (add); flushing runs from the scheduled webhook_flush,
+    so a delivery is acknowledged without waiting on pandas or the processed stores.
+    """
+
+    def __init__(self, spool, max_records=WEBHOOK_BATCH_RECORDS, max_age=WEBHOOK_BATCH_SECONDS,
+                 flush=append_batch, clock=time.time, lease_seconds=WEBHOOK_LEASE_SECONDS):
+        self.spool = spool
+        self.max_records = max_records
+        self.max_age = max_age
+        self.lease_seconds = lease_seconds
+        self.flush = flush
+        self.clock = clock
+
+    def add(self, dataset, repo, records, delivery):
+        """Spool one delivery's records; returns how many were spooled."""
+        if records:
+            self.spool.put(dataset, repo, _entry_name(self.clock(), delivery, len(records)), records)
+        return len(records)
+
+    def flush_due(self, force=False):
+        """Flush every (dataset, repo) batch that's full or old enough (all of them with `force`).
+
+        A batch is only flushed under its lease; batches another invocation is
+        flushing are skipped, and their entries are re-listed once the lease is
+        held, so entries already flushed elsewhere aren't written twice.
+        """
+        batches = {}
+        for entry in self.spool.entries():
+            batches.setdefault((entry["dataset"], entry["repo"]), []).append(entry)
+
+        flushed = []
+        now = self.clock()
+        for (dataset, repo), entries in sorted(batches.items()):
+            size = sum(e["count"] for e in entries)
+            age = now - min(e["received_at"] for e in entries)
+            if not (force or size >= self.max_records or age >= self.max_age):
+                continue
+            if not self.spool.claim(dataset, repo, self.lease_seconds):
+                print(f"ℹ️ {dataset} batch for {repo} is being flushed by another invocation")
+                continue
+            try:
+                entries = self.spool.entries(dataset, repo)
+                if not entries:
+                    continue
+                records = [record for entry in entries for record in self.spool.read(entry)]
+                self.flush(dataset, repo, records)
+                # Entries are only removed once the batch is stored; a failed flush is retried next time
+                for entry in entries:
+                    self.spool.delete(entry)
+            finally:
+                self.spool.release(dataset, repo)
+            flushed.append({"dataset": dataset, "repo": repo, "records": len(records), "deliveries": len(entries)})
+            print(f"🪝 Flushed {len(records)} {dataset} records from {len(entries)} deliveries for {repo}")
+        return flushed
+
+
+def default_batcher():
+    """Process-wide batcher (kept across warm invocations)."""
+    spool = LocalSpool(WEBHOOK_SPOOL_DIR) if WEBHOOK_SPOOL_DIR else S3Spool()
+    return shared("webhook_batcher", lambda: MicroBatcher(spool))
+
+
+# --- Lambda entry (API Gateway / Function URL events) ---
+def is_webhook_event(event):
+    return any(k.lower() == "x-github-event" for k in (event.get("headers") or {}))
+
+
+def handle_webhook(event, batcher=None, secret=None):
+    """Validate, map and spool one GitHub delivery; returns an HTTP-style response dict."""
+    headers = {k.lower(): v for k, v in (event.get("headers") or {}).items()}
+    body = event.get("body") or ""
+    body = base64.b64decode(body) if event.get("isBase64Encoded") else body.encode("utf-8")
+    try:
+        verify_signature(body, headers.get("x-hub-signature-256"), secret)
+        kind = headers.get("x-github-event")
+        if kind == "ping":
+            return {"statusCode": 200, "body": json.dumps({"message": "pong"})}
+        if kind not in EVENTS:
+            return {"statusCode": 202, "body": json.dumps({"message": f"ignored event {kind}"})}
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            raise WebhookError("❌ Webhook body is not JSON")
+
+        dataset, mapper = EVENTS[kind]
+        owner, name = payload["repository"]["full_name"].split("/", 1)
+        records = mapper(payload)
+        delivery = headers.get("x-github-delivery") or hashlib.sha256(body).hexdigest()[:16]
+        spooled = (batcher or default_batcher()).add(dataset, repo_partition(owner, name), records, delivery)
+    except WebhookError as e:
+        print(f"⚠️ Rejected webhook: {e}")
+        return {"statusCode": e.status, "body": json.dumps({"error": str(e)})}
+    except (KeyError, TypeError, ValueError) as e:
+        print(f"⚠️ Rejected webhook: malformed {headers.get('x-github-event')} payload ({e})")
+        return {"statusCode": 400, "body": json.dumps({"error": f"malformed payload: {e}"})}
+
+    return {
+        "statusCode": 202,
+        "body": json.dumps({"event": kind, "dataset": dataset, "records": spooled}),
+    }
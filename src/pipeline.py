@@ -0,0 +1,130 @@
+from src.dag import Channel, Stage, TeeSink, run_dag
+from src.ingest.cicd_ingest import fetch_workflow_runs
+from src.ingest.github_ingest import PR_BACKEND, fetch_commits, fetch_detailed_pull_requests
+from src.ingest.raw_sink import open_raw_sink
+
+
+# --- Fetch stages: write raw pages to S3 and stream them to processing ---
+def _fetch_commits(channel):
+    with open_raw_sink("github/", "commits") as sink:
+        fetch_commits(sink=TeeSink(sink, channel), collect=False)
+        channel.close()  # processing finishes while the raw object is uploaded
+    return sink.count
+
+
+def _fetch_pull_requests(channel, pr_backend):
+    with open_raw_sink("github/", "pull_requests_detailed") as sink:
+        fetch_detailed_pull_requests(backend=pr_backend, sink=TeeSink(sink, channel))
+        channel.close()
+    return sink.count
+
+
+def _fetch_workflow_runs(channel):
+    with open_raw_sink("cicd/", "workflow_runs") as sink:
+        fetch_workflow_runs(sink=TeeSink(sink, channel))
+        channel.close()
+    return sink.count
+
+
+def _measured(name, fn):
+    from src.process.lean import memory_stage
+
+    def run(**inputs):
+        with memory_stage(name):
+            return fn(**inputs)
+    return run
+
+
+def _branch(name, records, fetch, process, finish):
+    """Stages of one dataset: fetch ⇒ (bounded channel) ⇒ process → finish.
+
+    With `records` given (already fetched, e.g. incremental mode) there is no
+    fetch stage and processing starts straight away.
+    """
+    stages = []
+    if records is None:
+        channel = Channel()
+        stages.append(Stage(f"fetch_{name}", lambda: fetch(channel), produces=[channel]))
+        stages.append(Stage(f"process_{name}", lambda: process(channel.records()), consumes=[channel]))
+    else:
+        stages.append(Stage(f"process_{name}", lambda: process(records)))
+    stages.append(Stage(f"save_{name}", lambda **up: finish(up[f"process_{name}"]), after=[f"process_{name}"]))
+    return stages
+
+
+def run_pipeline(sources=None, pr_backend=PR_BACKEND, processing_mode=None):
+    """Fetch, process and save commits, PRs and workflow runs as one DAG.
+
+    The three branches run concurrently, and within a branch processing
+    consumes pages while they're still being fetched and uploaded, so the run
+    takes about as long as its slowest branch. `sources` ({"commits": [...],
+    "pull_requests": [...], "workflow_runs": [...]}) skips the fetch stages.
+    Returns ({commit_metrics, pr_metrics, workflow_metrics}, per-stage timings).
+    """
+    # Imported here so the Lambda init phase doesn't load pandas
+    from src.process.agg_state import AGG_STATE_ENABLED
+    from src.process.lean import lean_enabled
+    from src.process.metrics_processor import (
+        fold_commits,
+        fold_pull_requests,
+        process_commits,
+        process_pull_requests,
+        save_processed,
+    )
+    from src.process.cicd_metrics_processor import (
+        fold_workflow_runs,
+        process_workflow_runs,
+        save_processed as save_cicd_processed,
+    )
+
+    mode = "lean" if lean_enabled(processing_mode) else "full"
+    sources = sources or {}
+
+    def records(stream):
+        # Full mode normalizes with pd.json_normalize, which needs the whole list
+        return stream if mode == "lean" else list(stream)
+
+    def finish_commits(processed):
+        df, metrics = processed
+        if AGG_STATE_ENABLED:
+            # Fold only not-yet-seen records into the persisted state; metrics cover all history
+            metrics = fold_commits(df)
+        save_processed(df, "commits_processed")
+        return metrics
+
+    def finish_pull_requests(processed):
+        df, metrics, author_metrics = processed
+        if AGG_STATE_ENABLED:
+            metrics, author_metrics = fold_pull_requests(df)
+        save_processed(df, "pull_requests_processed")
+        save_processed(author_metrics, "author_pr_summary")
+        return metrics
+
+    def finish_workflow_runs(processed):
+        df, metrics = processed
+        if AGG_STATE_ENABLED:
+            metrics = fold_workflow_runs(df)
+        save_cicd_processed(df, "workflow_runs_processed")
+        return metrics
+
+    stages = [
+        *_branch("commits", sources.get("commits"), _fetch_commits,
+                 lambda stream: process_commits(records(stream), mode=mode), finish_commits),
+        *_branch("pull_requests", sources.get("pull_requests"),
+                 lambda channel: _fetch_pull_requests(channel, pr_backend),
+                 lambda stream: process_pull_requests(records(stream), mode=mode), finish_pull_requests),
+        *_branch("workflow_runs", sources.get("workflow_runs"), _fetch_workflow_runs,
+                 lambda stream: process_workflow_runs(records(stream), mode=mode), finish_workflow_runs),
+    ]
+    if mode == "lean":
+        for stage in stages:
+            stage.fn = _measured(stage.name, stage.fn)
+    results, timings = run_dag(stages)
+    print("⏱️ Stage timings:", {name: t["seconds"] for name, t in timings.items()})
+    metrics = {
+        "commit_metrics": results["save_commits"],
+        "pr_metrics": results["save_pull_requests"],
+        "workflow_metrics": results["save_workflow_runs"],
+    }
+    counts = {name[len("fetch_"):]: count for name, count in results.items() if name.startswith("fetch_")}
+    return {**metrics, "fetched": counts}, timings
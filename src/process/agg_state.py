@@ -0,0 +1,317 @@
+import math
+import os
+from datetime import datetime, timezone
+import pandas as pd
+from src.ingest.s3_uploader import (
+    BUCKET_NAME, default_repo_partition, read_json_from_s3, read_json_with_etag, write_json_if_unchanged,
+)
+from src.process.sketches import HyperLogLog, TDigest
+
+STATE_PREFIX = "state/aggregates/"
+
+# Set AGG_STATE_ENABLED=0 to report batch-only metrics and skip the state update
+AGG_STATE_ENABLED = os.getenv("AGG_STATE_ENABLED", "1").lower() in ("1", "true", "yes")
+
+# Conditional writes of one state object before a fold gives up on a contended key
+STATE_WRITE_ATTEMPTS = 5
+
+
+class Aggregate:
+    """Mergeable summary of one measure.
+
+    kind=None keeps count, sum, min and max; "quantiles" adds a t-digest for
+    p50/p90/p99; "distinct" counts values and keeps a HyperLogLog of them.
+    """
+
+    def __init__(self, kind=None):
+        self.kind = kind
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+        self.digest = TDigest() if kind == "quantiles" else None
+        self.hll = HyperLogLog() if kind == "distinct" else None
+
+    def add(self, value):
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            return
+        self.count += 1
+        if self.hll is not None:
+            self.hll.add(value)
+            return
+        value = float(value)
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if self.digest is not None:
+            self.digest.add(value)
+
+    def merge(self, other):
+        self.count += other.count
+        self.sum += other.sum
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        if other.digest is not None:
+            self.digest = (self.digest or TDigest()).merge(other.digest)
+        if other.hll is not None:
+            self.hll = (self.hll or HyperLogLog(other.hll.p)).merge(other.hll)
+        return self
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else None
+
+    def quantile(self, q):
+        return self.digest.quantile(q) if self.digest is not None else None
+
+    def distinct(self):
+        return round(self.hll.estimate()) if self.hll is not None else 0
+
+    def to_dict(self):
+        data = {"count": self.count, "sum": self.sum, "min": self.min, "max": self.max}
+        if self.digest is not None:
+            data["digest"] = self.digest.to_dict()
+        if self.hll is not None:
+            data["hll"] = self.hll.to_dict()
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        agg = cls()
+        agg.count, agg.sum, agg.min, agg.max = data["count"], data["sum"], data["min"], data["max"]
+        if "digest" in data:
+            agg.kind, agg.digest = "quantiles", TDigest.from_dict(data["digest"])
+        if "hll" in data:
+            agg.kind, agg.hll = "distinct", HyperLogLog.from_dict(data["hll"])
+        return agg
+
+
+def _epoch_seconds(values):
+    # Resolution-independent (datetime64 may be s/ms/us/ns)
+    return (pd.to_datetime(values, utc=True) - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)
+
+
+def iso_from_epoch(seconds):
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).isoformat() if seconds is not None else None
+
+
+# What gets folded per processed dataset.
+#   key:      natural key; a record is folded at most once
+#   final:    only records that can no longer change are folded (sketches can't retract values)
+#   date_col: UTC day the record belongs to; group_col: the per-author dimension
+#   measures: name → (column or function of the frame, Aggregate kind: None | "quantiles" | "distinct")
+STATE_SPECS = {
+    "commits_processed": {
+        "key": "sha",
+        "final": None,
+        "date_col": "date",
+        "group_col": "author",
+        "measures": {
+            "message_len": ("message_len", None),
+            "date": (lambda df: _epoch_seconds(df["date"]), None),
+            "contributors": ("author", "distinct"),
+        },
+    },
+    "pull_requests_processed": {
+        "key": "number",
+        "final": lambda df: df["closed_at"].notna(),
+        "date_col": "created_at",
+        "group_col": "author",
+        "measures": {
+            "merged": (lambda df: df["merged"].astype(float), None),
+            "review_time_hours": ("review_time_hours", "quantiles"),
+            "review_comments": ("review_comments", None),
+            "contributors": ("author", "distinct"),
+        },
+    },
+    "workflow_runs_processed": {
+        "key": "id",
+        "final": lambda df: df["status"].eq("completed"),
+        "date_col": "created_at",
+        "group_col": "actor.login",
+        "measures": {
+            "success": (lambda df: df["conclusion"].eq("success").astype(float), None),
+            "run_time_min": ("run_time_min", "quantiles"),
+            "created_at": (lambda df: _epoch_seconds(df["created_at"]), None),
+            "contributors": ("actor.login", "distinct"),
+        },
+    },
+}
+
+
+def state_key(dataset, repo, month=None):
+    """Per-month day states (+ folded keys) and one per-repo summary of month states."""
+    return f"{STATE_PREFIX}{dataset}/{repo}/{month}.json" if month else f"{STATE_PREFIX}{dataset}/{repo}/summary.json"
+
+
+def _load_groups(data):
+    return {group: {name: Aggregate.from_dict(agg) for name, agg in measures.items()} for group, measures in data.items()}
+
+
+def _dump_groups(groups):
+    return {group: {name: agg.to_dict() for name, agg in measures.items()} for group, measures in groups.items()}
+
+
+def merge_groups(target, source):
+    """Merge {group: {measure: Aggregate}} `source` into `target` in place."""
+    for group, measures in source.items():
+        into = target.setdefault(group, {})
+        for name, agg in measures.items():
+            if name in into:
+                into[name].merge(agg)
+            else:
+                into[name] = Aggregate(agg.kind).merge(agg)
+    return target
+
+
+def aggregate_batch(df, spec):
+    """{day: {group: {measure: Aggregate}}} for the rows of a batch."""
+    frame = pd.DataFrame({
+        "day": pd.to_datetime(df[spec["date_col"]], utc=True).dt.strftime("%Y-%m-%d"),
+        "group": df[spec["group_col"]].astype("object").fillna("unknown") if spec["group_col"] in df else "unknown",
+    })
+    kinds = {}
+    for name, (source, kind) in spec["measures"].items():
+        frame[name] = source(df) if callable(source) else (df[source] if source in df else None)
+        kinds[name] = kind
+
+    days = {}
+    for (day, group), rows in frame.groupby(["day", "group"]):
+        measures = days.setdefault(day, {}).setdefault(group, {})
+        for name, kind in kinds.items():
+            agg = measures[name] = Aggregate(kind)
+            values = rows[name] if kind == "distinct" else pd.to_numeric(rows[name], errors="coerce").astype("float64")
+            for value in values:
+                agg.add(value)
+    return days
+
+
+def _update_state(key, update, default):
+    """Read-modify-write a state object with a conditional put, retrying if another run wrote it first.
+
+    `update(data)` returns the new object, or None to leave it as is. Returns
+    the object as stored.
+    """
+    for _ in range(STATE_WRITE_ATTEMPTS):
+        data, etag = read_json_with_etag(key, default=default)
+        updated = update(data)
+        if updated is None or write_json_if_unchanged(updated, key, etag):
+            return data if updated is None else updated
+        print(f"🔁 s3://{BUCKET_NAME}/{key} changed during the fold, retrying")
+    raise RuntimeError(f"❌ s3://{BUCKET_NAME}/{key} kept changing; gave up after {STATE_WRITE_ATTEMPTS} attempts")
+
+
+def _month_groups(dataset, repo, month):
+    stored = read_json_from_s3(state_key(dataset, repo, month), default={"days": {}})
+    return collapse({day: _load_groups(groups) for day, groups in stored["days"].items()})
+
+
+def fold_batch(df, dataset, repo):
+    """Fold the batch's not-yet-folded, final records into the persisted state.
+
+    Reads and writes only the month objects the batch touches plus the repo
+    summary, so the cost follows the batch, not the history. Every write is
+    conditional on the ETag read (like compaction's KeyIndex.upload), so
+    concurrent folds (a poll and a webhook flush) retry instead of dropping
+    each other's records. Returns the repo summary {month: {group: {measure: Aggregate}}}.
+    """
+    spec = STATE_SPECS[dataset]
+    repo = repo or default_repo_partition()
+    summary_key = state_key(dataset, repo)
+    if df is None or df.empty:
+        return load_summary(dataset, repo)
+
+    batch = df[spec["final"](df)] if spec["final"] else df
+    batch = batch.drop_duplicates(subset=[spec["key"]], keep="last")
+    months = pd.to_datetime(batch[spec["date_col"]], utc=True).dt.strftime("%Y-%m")
+
+    folded = {}
+    for month, rows in batch.groupby(months):
+        def fold_month(stored):
+            seen = set(stored["keys"])
+            new = rows[~rows[spec["key"]].astype(str).isin(seen)]
+            folded[month] = len(new)
+            if new.empty:
+                return None
+            days = {day: _load_groups(groups) for day, groups in stored["days"].items()}
+            for day, groups in aggregate_batch(new, spec).items():
+                merge_groups(days.setdefault(day, {}), groups)
+            return {
+                "keys": sorted(seen | set(new[spec["key"]].astype(str))),
+                "days": {day: _dump_groups(groups) for day, groups in days.items()},
+            }
+        _update_state(state_key(dataset, repo, month), fold_month, {"keys": [], "days": {}})
+
+    touched = [month for month, count in folded.items() if count]
+
+    def refresh_summary(summary):
+        # Each touched month is re-read from its (just written) object, so a retry never
+        # publishes totals older than a concurrent fold's
+        for month in touched:
+            summary[month] = _dump_groups(_month_groups(dataset, repo, month))
+        return summary
+
+    if touched:
+        summary = _update_state(summary_key, refresh_summary, {})
+        summary = {month: _load_groups(groups) for month, groups in summary.items()}
+    else:
+        summary = load_summary(dataset, repo)
+    print(f"🧮 Folded {sum(folded.values())} new {dataset} records into s3://{BUCKET_NAME}/{STATE_PREFIX}{dataset}/{repo}/")
+    return summary
+
+
+def overlay_pending(groups, df, dataset):
+    """Add the batch's not-yet-final records (e.g. open PRs) to collapsed `groups`.
+
+    They're reported but never persisted: a sketch can't take a value back once
+    the record changes, so for records still in flight the batch is the source
+    of truth. Returns `groups`.
+    """
+    spec = STATE_SPECS[dataset]
+    if df is None or df.empty or not spec["final"]:
+        return groups
+    pending = df[~spec["final"](df)].drop_duplicates(subset=[spec["key"]], keep="last")
+    for day_groups in aggregate_batch(pending, spec).values():
+        merge_groups(groups, day_groups)
+    return groups
+
+
+def collapse(summary, months=None):
+    """Merge month states into {group: {measure: Aggregate}} (optionally only `months`)."""
+    groups = {}
+    for month, month_groups in summary.items():
+        if months is None or month in months:
+            merge_groups(groups, month_groups)
+    return groups
+
+
+def merge_summaries(summaries):
+    """Merge per-repo summaries into one (e.g. org-wide metrics without the raw rows)."""
+    merged = {}
+    for summary in summaries:
+        for month, groups in summary.items():
+            merge_groups(merged.setdefault(month, {}), groups)
+    return merged
+
+
+def percentiles(agg, qs=(0.5, 0.9, 0.99), digits=2):
+    """{"p50": …, "p90": …, "p99": …} from a quantile Aggregate (None when empty)."""
+    return {
+        f"p{round(q * 100)}": (round(agg.quantile(q), digits) if agg.count and agg.digest else None)
+        for q in qs
+    }
+
+
+def load_summary(dataset, repo=None):
+    key = state_key(dataset, repo or default_repo_partition())
+    return {month: _load_groups(groups) for month, groups in read_json_from_s3(key, default={}).items()}
+
+
+def total(groups, measure):
+    """One Aggregate of `measure` merged across every group."""
+    out = None
+    for measures in groups.values():
+        if measure in measures:
+            out = (out or Aggregate(measures[measure].kind)).merge(measures[measure])
+    return out or Aggregate()
@@ -1,11 +1,47 @@
 import json, os, pandas as pd
-from datetime import datetime
-from dotenv import load_dotenv
-from src.ingest.s3_uploader import upload_to_s3
+from src.clients import load_local_env
+from src.ingest.s3_uploader import mark_processed_version, upload_to_s3
+from src.ingest.schemas import normalized_columns, stable_column_order
+from src.process.agg_state import collapse, fold_batch, iso_from_epoch, percentiles, total
+from src.process.lean import lean_enabled, memory_stage, normalize_lean
+from src.process.rollups import update_rollups
+from src.process.parquet_writer import save_processed_parquet
 
-load_dotenv()
+load_local_env()
 DATA_DIR = "/tmp/data"  # ✅ Writable directory in Lambda
 
+# "csv" (flat/org CSV layout), "parquet" (processed_parquet/ partitioned by repo + dt) or "both"
+PROCESSED_FORMAT = os.getenv("PROCESSED_FORMAT", "csv")
+
+# Stable column set written to the repo-partitioned layout (must match athena/org_tables.sql)
+PROCESSED_COLUMNS = {
+    "workflow_runs_processed": [
+        "id", "name", "event", "head_branch", "status", "conclusion",
+        "run_number", "created_at", "updated_at", "run_time_min",
+    ],
+}
+
+# Column order of the flat processed CSV: the projected fields, then the derived run time (others follow by name)
+FLAT_COLUMNS = {
+    "workflow_runs_processed": normalized_columns("workflow_run") + ["run_time_min"],
+}
+
+# Lean mode (PROCESSING_MODE=lean): the only paths normalized, as output column → (source path, kind)
+LEAN_FIELDS = {
+    "workflow_runs_processed": {
+        "id": ("id", "int"),
+        "name": ("name", "category"),
+        "event": ("event", "category"),
+        "head_branch": ("head_branch", "category"),
+        "status": ("status", "category"),
+        "conclusion": ("conclusion", "category"),
+        "run_number": ("run_number", "int"),
+        "created_at": ("created_at", "time"),
+        "updated_at": ("updated_at", "time"),
+        "actor.login": ("actor.login", "category"),
+    },
+}
+
 def load_json(filename):
     path = os.path.join(DATA_DIR, filename)
     with open(path) as f:
@@ -13,20 +49,26 @@ def load_json(filename):
     print(f"📂 Loaded {len(data)} workflow runs")
     return data
 
-def process_workflow_runs(runs):
-    df = pd.json_normalize(runs)
+def process_workflow_runs(runs, mode=None):
+    if lean_enabled(mode):
+        with memory_stage("normalize workflow_runs"):
+            df = normalize_lean(runs, LEAN_FIELDS["workflow_runs_processed"])
+    else:
+        df = pd.json_normalize(runs)
     if df.empty:
         print("⚠️ No workflow data.")
         return df, {}
 
-    df["created_at"] = pd.to_datetime(df["created_at"])
-    df["updated_at"] = pd.to_datetime(df["updated_at"])
+    if not lean_enabled(mode):
+        df["created_at"] = pd.to_datetime(df["created_at"])
+        df["updated_at"] = pd.to_datetime(df["updated_at"])
     df["run_time_min"] = (df["updated_at"] - df["created_at"]).dt.total_seconds() / 60
 
     metrics = {
         "total_runs": len(df),
         "success_rate_%": round((df["conclusion"].eq("success").mean()) * 100, 2),
         "avg_runtime_min": round(df["run_time_min"].mean(), 2),
+        **{f"runtime_p{round(q * 100)}_min": round(df["run_time_min"].quantile(q), 2) for q in (0.5, 0.9, 0.99)},
         "failed_runs": int(df["conclusion"].ne("success").sum()),
         "latest_run": df["created_at"].max(),
     }
@@ -34,17 +76,49 @@ def process_workflow_runs(runs):
     print("🧮 CI/CD Metrics:", metrics)
     return df, metrics
 
-def save_processed(df, name):
+def workflow_metrics_from_state(groups):
+    """CI/CD metrics over every folded (completed) run."""
+    success, runtime = total(groups, "success"), total(groups, "run_time_min")
+    return {
+        "total_runs": success.count,
+        "success_rate_%": round(success.mean * 100, 2) if success.count else None,
+        "avg_runtime_min": round(runtime.mean, 2) if runtime.count else None,
+        **{f"runtime_{p}_min": v for p, v in percentiles(runtime).items()},
+        "distinct_actors": total(groups, "contributors").distinct(),
+        "failed_runs": int(success.count - success.sum),
+        "latest_run": iso_from_epoch(total(groups, "created_at").max),
+    }
+
+def fold_workflow_runs(df, repo_partition=None):
+    """Fold newly completed runs into the aggregate state; returns metrics over all folded history."""
+    return workflow_metrics_from_state(collapse(fold_batch(df, "workflow_runs_processed", repo_partition)))
+
+def save_processed(df, name, repo_partition=None):
     if df.empty:
         print("ℹ️ Skipping empty CI/CD dataset.")
         return
+    if PROCESSED_FORMAT in ("parquet", "both"):
+        save_processed_parquet(df, name, repo_partition=repo_partition)
+        if PROCESSED_FORMAT == "parquet":
+            update_rollups(df, name, repo_partition, parquet=True)
+            mark_processed_version(name)
+            return
     processed_dir = os.path.join(DATA_DIR, "processed")
+    s3_folder = "processed/"
+    if repo_partition:
+        processed_dir = os.path.join(processed_dir, name, repo_partition)
+        s3_folder = f"processed/{name}/{repo_partition}/"
+        df = df.reindex(columns=PROCESSED_COLUMNS[name])
+    else:
+        df = df[stable_column_order(df.columns, FLAT_COLUMNS.get(name, []))]
     os.makedirs(processed_dir, exist_ok=True)
 
     file_path = os.path.join(processed_dir, f"{name}.csv")
     df.to_csv(file_path, index=False)
     print(f"💾 Saved → {file_path}")
-    upload_to_s3(file_path, s3_folder="processed/")
+    upload_to_s3(file_path, s3_folder=s3_folder)
+    update_rollups(df, name, repo_partition, parquet=PROCESSED_FORMAT == "both")
+    mark_processed_version(name)
     
     # ✅ Optional cleanup to save /tmp space
     try:
@@ -0,0 +1,149 @@
+import os
+import resource
+import time
+import tracemalloc
+from contextlib import contextmanager
+from itertools import islice
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# "full" (pd.json_normalize every field, object dtypes) or "lean" (only the needed
+# paths, compact dtypes, bounded chunks; for memory-constrained Lambdas)
+PROCESSING_MODE = os.getenv("PROCESSING_MODE", "full")
+
+# Records normalized per chunk in lean mode; raw dicts are dropped chunk by chunk
+LEAN_CHUNK_ROWS = int(os.getenv("LEAN_CHUNK_ROWS", "20000"))
+
+# Set TRACE_MEMORY=1 to also measure each stage's peak Python allocations (tracemalloc; slower)
+TRACE_MEMORY = os.getenv("TRACE_MEMORY", "0").lower() in ("1", "true", "yes")
+
+# GitHub REST timestamps, e.g. 2024-05-01T12:34:56Z
+GITHUB_TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+# Latest per-stage memory figures, keyed by stage name (see memory_stage)
+STAGE_MEMORY = {}
+
+
+def lean_enabled(mode=None):
+    return (mode or PROCESSING_MODE) == "lean"
+
+
+# --- Memory reporting ---
+def _peak_rss_mb():
+    # ru_maxrss is KiB on Linux (the Lambda runtime)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+@contextmanager
+def memory_stage(name):
+    """Time a stage and record the process peak RSS (and its growth) after it.
+
+    Peak RSS only ever rises, so a stage's growth is what it added to the
+    high-water mark; with TRACE_MEMORY the stage's own allocation peak is
+    recorded too.
+    """
+    started, rss_before = time.perf_counter(), _peak_rss_mb()
+    if TRACE_MEMORY:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+    try:
+        yield
+    finally:
+        rss = _peak_rss_mb()
+        stats = {
+            "seconds": round(time.perf_counter() - started, 3),
+            "peak_rss_mb": round(rss, 1),
+            "rss_growth_mb": round(rss - rss_before, 1),
+        }
+        if TRACE_MEMORY:
+            stats["traced_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 1)
+        STAGE_MEMORY[name] = stats
+        traced = f", traced peak {stats['traced_peak_mb']} MB" if TRACE_MEMORY else ""
+        print(f"📏 {name}: {stats['seconds']}s, peak RSS {stats['peak_rss_mb']} MB "
+              f"(+{stats['rss_growth_mb']}){traced}")
+
+
+def memory_report(reset=False):
+    report = dict(STAGE_MEMORY)
+    if reset:
+        STAGE_MEMORY.clear()
+    return report
+
+
+# --- Chunked, projected normalization ---
+def iter_chunks(records, size=LEAN_CHUNK_ROWS):
+    """Yield lists of at most `size` records from any iterable (list or S3 stream)."""
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _lookup(record, parts):
+    for part in parts:
+        if not isinstance(record, dict):
+            return None
+        record = record.get(part)
+    return record
+
+
+def parse_times(values):
+    """Parse GitHub timestamps with the explicit format; anything else falls back to ISO 8601."""
+    values = pd.Series(values, dtype="object")
+    parsed = pd.to_datetime(values, format=GITHUB_TIME_FORMAT, utc=True, errors="coerce")
+    missed = parsed.isna() & values.notna()
+    if missed.any():
+        parsed[missed] = pd.to_datetime(values[missed], format="ISO8601", utc=True, errors="coerce")
+    return parsed
+
+
+def _column(values, kind):
+    if kind == "category":
+        return pd.Series(values, dtype="category")
+    if kind == "time":
+        return parse_times(values)
+    if kind == "int":
+        return pd.to_numeric(pd.Series(values, dtype="Float64"), downcast="integer")
+    if kind == "float":
+        return pd.to_numeric(pd.Series(values, dtype="float64"), downcast="float")
+    if kind == "len":
+        lengths = [len(v) if isinstance(v, str) else None for v in values]
+        return pd.to_numeric(pd.Series(lengths, dtype="Float64"), downcast="integer")
+    return pd.Series(values, dtype="string")
+
+
+def frame_from_records(records, fields):
+    """Build a compact frame from only the needed paths.
+
+    `fields` maps output column → (dotted source path, kind), kind being one of
+    "str", "category", "int", "float", "time" or "len" (length of a string;
+    the string itself is never kept).
+    """
+    columns = {}
+    for out, (path, kind) in fields.items():
+        parts = tuple(path.split("."))
+        columns[out] = _column([_lookup(r, parts) for r in records], kind)
+    return pd.DataFrame(columns)
+
+
+def concat_chunks(chunks, fields):
+    """Concatenate chunk frames, keeping categoricals categorical (with the union of categories)."""
+    chunks = [c for c in chunks if not c.empty]
+    if not chunks:
+        return pd.DataFrame(columns=list(fields))
+    if len(chunks) == 1:
+        return chunks[0]
+    categorical = [out for out, (_, kind) in fields.items() if kind == "category"]
+    combined = {col: union_categoricals([c[col] for c in chunks], ignore_order=True) for col in categorical}
+    df = pd.concat([c.drop(columns=categorical) for c in chunks], ignore_index=True)
+    for col in categorical:
+        df[col] = pd.Series(combined[col], index=df.index)
+    return df[list(fields)]
+
+
+def normalize_lean(records, fields, chunk_rows=LEAN_CHUNK_ROWS):
+    """Normalize an iterable of records chunk by chunk into one compact frame."""
+    return concat_chunks([frame_from_records(chunk, fields) for chunk in iter_chunks(records, chunk_rows)], fields)
@@ -1,14 +1,65 @@
 import json
 import os
 import pandas as pd
-from datetime import datetime
-from dotenv import load_dotenv
-from src.ingest.s3_uploader import upload_to_s3
+from src.clients import load_local_env
+from src.ingest.s3_uploader import mark_processed_version, upload_to_s3
+from src.ingest.schemas import normalized_columns, stable_column_order
+from src.process.agg_state import collapse, fold_batch, iso_from_epoch, overlay_pending, percentiles, total
+from src.process.lean import lean_enabled, memory_stage, normalize_lean
+from src.process.rollups import update_rollups
+from src.process.parquet_writer import DATASETS as PARQUET_DATASETS, save_processed_parquet
 
-load_dotenv()
+load_local_env()
 
 DATA_DIR = "/tmp/data"  # ✅ Writable directory in Lambda
 
+# "csv" (flat/org CSV layout), "parquet" (processed_parquet/ partitioned by repo + dt) or "both"
+PROCESSED_FORMAT = os.getenv("PROCESSED_FORMAT", "csv")
+
+# Stable column sets written to the repo-partitioned layout (must match athena/org_tables.sql)
+PROCESSED_COLUMNS = {
+    "commits_processed": ["sha", "author", "author_login", "date", "message_len"],
+    "pull_requests_processed": [
+        "number", "author", "state", "created_at", "closed_at", "merged_at", "merged",
+        "review_time_hours", "additions", "deletions", "changed_files", "review_comments", "commits_in_pr",
+    ],
+    "author_pr_summary": ["author", "total_prs", "merged_prs", "avg_review_time_hours", "avg_comments"],
+}
+
+# Column order of the flat processed CSVs: the projected fields (src/ingest/schemas.py), then the
+# derived columns; anything else (e.g. RAW_FULL payloads) follows by name, so the header is the same every run
+FLAT_COLUMNS = {
+    "commits_processed": normalized_columns("commit") + ["author", "author_login", "date", "message_len", "committed_at"],
+    "pull_requests_processed": normalized_columns("pull_request") + ["author", "merged", "review_time_hours"],
+    "author_pr_summary": PROCESSED_COLUMNS["author_pr_summary"],
+}
+
+# Lean mode (PROCESSING_MODE=lean): the only paths normalized, as output column → (source path, kind)
+LEAN_FIELDS = {
+    "commits_processed": {
+        "sha": ("sha", "str"),
+        "author": ("commit.author.name", "category"),
+        "author_login": ("author.login", "category"),
+        "date": ("commit.author.date", "time"),
+        "message_len": ("commit.message", "len"),
+        "committed_at": ("commit.committer.date", "time"),
+    },
+    "pull_requests_processed": {
+        "number": ("number", "int"),
+        "author": ("user.login", "category"),
+        "state": ("state", "category"),
+        "created_at": ("created_at", "time"),
+        "updated_at": ("updated_at", "time"),
+        "closed_at": ("closed_at", "time"),
+        "merged_at": ("merged_at", "time"),
+        "additions": ("additions", "int"),
+        "deletions": ("deletions", "int"),
+        "changed_files": ("changed_files", "int"),
+        "review_comments": ("review_comments", "int"),
+        "commits_in_pr": ("commits_in_pr", "int"),
+    },
+}
+
 def load_json(filename):
     path = os.path.join(DATA_DIR, filename)
     with open(path, "r") as f:
@@ -16,11 +67,23 @@ def load_json(filename):
     print(f"📂 Loaded {len(data)} records from {filename}")
     return data
 
-def process_commits(commits):
-    df = pd.json_normalize(commits)
-    df["author"] = df["commit.author.name"]
-    df["date"] = pd.to_datetime(df["commit.author.date"])
-    df["message_len"] = df["commit.message"].str.len()
+def process_commits(commits, mode=None):
+    """Commit frame + metrics. `commits` may be any iterable in lean mode (e.g. an S3 NDJSON stream)."""
+    if lean_enabled(mode):
+        with memory_stage("normalize commits"):
+            df = normalize_lean(commits, LEAN_FIELDS["commits_processed"])
+    else:
+        df = pd.json_normalize(commits)
+    if df.empty:
+        print("⚠️ No commit data found.")
+        return df, {"total_commits": 0}
+
+    if not lean_enabled(mode):
+        df["author"] = df["commit.author.name"]
+        df["author_login"] = df.get("author.login")
+        df["date"] = pd.to_datetime(df["commit.author.date"])
+        df["message_len"] = df["commit.message"].str.len()
+        df["committed_at"] = pd.to_datetime(df.get("commit.committer.date"))
 
     metrics = {
         "total_commits": len(df),
@@ -32,21 +95,32 @@ def process_commits(commits):
     print("🧮 Commit metrics:", metrics)
     return df, metrics
 
-def process_pull_requests(prs):
-    df = pd.json_normalize(prs)
+def process_pull_requests(prs, mode=None):
+    if lean_enabled(mode):
+        with memory_stage("normalize pull_requests"):
+            df = normalize_lean(prs, LEAN_FIELDS["pull_requests_processed"])
+    else:
+        df = pd.json_normalize(prs)
     if df.empty:
         print("⚠️ No PR data found.")
         return df, {"total_prs": 0}, pd.DataFrame()
 
-    df["created_at"] = pd.to_datetime(df["created_at"])
-    df["closed_at"] = pd.to_datetime(df["closed_at"])
-    df["merged_at"] = pd.to_datetime(df.get("merged_at"))
-    df["author"] = df["user.login"]
+    if not lean_enabled(mode):
+        df["created_at"] = pd.to_datetime(df["created_at"])
+        df["closed_at"] = pd.to_datetime(df["closed_at"])
+        df["merged_at"] = pd.to_datetime(df.get("merged_at"))
+        df["author"] = df["user.login"]
     df["merged"] = df["merged_at"].notnull()
     df["review_time_hours"] = (df["closed_at"] - df["created_at"]).dt.total_seconds() / 3600
 
+    overall_metrics, author_metrics = pr_metrics_from_frame(df)
+    return df, overall_metrics, author_metrics
+
+
+def pr_metrics_from_frame(df):
+    """Overall and per-author PR metrics over processed PR rows (see process_pull_requests)."""
     author_metrics = (
-        df.groupby("author")
+        df.groupby("author", observed=True)
         .agg(
             total_prs=("number", "count"),
             merged_prs=("merged", "sum"),
@@ -61,25 +135,102 @@ def process_pull_requests(prs):
         "merged_prs": int(df["merged"].sum()),
         "avg_review_time_hours": round(df["review_time_hours"].mean(), 2),
         "merge_ratio": round(df["merged"].mean() * 100, 1),
+        **{
+            f"review_time_p{round(q * 100)}_hours": round(df["review_time_hours"].quantile(q), 2)
+            for q in (0.5, 0.9, 0.99)
+        },
     }
 
     print("🧮 Overall PR metrics:", overall_metrics)
     print("👥 Per-author metrics:\n", author_metrics)
-    return df, overall_metrics, author_metrics
+    return overall_metrics, author_metrics
+
+
+# --- Metrics from the persisted aggregate state (see agg_state.py) ---
+def commit_metrics_from_state(groups):
+    dates, lengths = total(groups, "date"), total(groups, "message_len")
+    return {
+        "total_commits": dates.count,
+        "unique_authors": total(groups, "contributors").distinct(),  # HyperLogLog estimate
+        "avg_message_length": lengths.mean,
+        "first_commit": iso_from_epoch(dates.min),
+        "last_commit": iso_from_epoch(dates.max),
+    }
+
+
+def pr_metrics_from_state(groups):
+    """Overall and per-author PR metrics over the PRs in `groups` (see fold_pull_requests)."""
+    merged, review = total(groups, "merged"), total(groups, "review_time_hours")
+    overall_metrics = {
+        "total_prs": merged.count,
+        "merged_prs": int(merged.sum),
+        "avg_review_time_hours": round(review.mean, 2) if review.count else None,
+        "merge_ratio": round(merged.mean * 100, 1) if merged.count else None,
+        **{f"review_time_{p}_hours": v for p, v in percentiles(review).items()},
+        "distinct_authors": total(groups, "contributors").distinct(),
+    }
+    author_metrics = pd.DataFrame([
+        {
+            "author": author,
+            "total_prs": m["merged"].count,
+            "merged_prs": int(m["merged"].sum),
+            "avg_review_time_hours": m["review_time_hours"].mean,
+            "avg_comments": m["review_comments"].mean,
+        }
+        for author, m in groups.items()
+    ], columns=PROCESSED_COLUMNS["author_pr_summary"])
+    return overall_metrics, author_metrics
+
 
+def fold_commits(df, repo_partition=None):
+    """Fold new commits into the aggregate state; returns metrics over all folded history."""
+    return commit_metrics_from_state(collapse(fold_batch(df, "commits_processed", repo_partition)))
 
-def save_processed(df, name):
+
+def fold_pull_requests(df, repo_partition=None):
+    """Fold newly closed PRs into the aggregate state; returns (overall, per-author) metrics.
+
+    The metrics cover every closed PR folded so far plus the batch's open PRs,
+    so total_prs, merge_ratio and the author summary still count open PRs.
+    """
+    name = "pull_requests_processed"
+    groups = collapse(fold_batch(df, name, repo_partition))
+    return pr_metrics_from_state(overlay_pending(groups, df, name))
+
+
+def save_processed(df, name, repo_partition=None):
+    """Save a processed dataset as CSV and/or Parquet (see PROCESSED_FORMAT) and upload it.
+
+    With `repo_partition` (org mode) the stable PROCESSED_COLUMNS are written to
+    processed/<name>/<repo_partition>/<name>.csv; otherwise the flat processed/<name>.csv.
+    """
     if df is None or df.empty:
         print(f"ℹ️ Skipping save: {name} is empty")
         return None
 
+    if PROCESSED_FORMAT in ("parquet", "both") and name in PARQUET_DATASETS:
+        save_processed_parquet(df, name, repo_partition=repo_partition)
+        if PROCESSED_FORMAT == "parquet":
+            update_rollups(df, name, repo_partition, parquet=True)
+            mark_processed_version(name)
+            return None
+
     processed_dir = os.path.join(DATA_DIR, "processed")
+    s3_folder = "processed/"
+    if repo_partition:
+        processed_dir = os.path.join(processed_dir, name, repo_partition)
+        s3_folder = f"processed/{name}/{repo_partition}/"
+        df = df.reindex(columns=PROCESSED_COLUMNS[name])
+    else:
+        df = df[stable_column_order(df.columns, FLAT_COLUMNS.get(name, []))]
     os.makedirs(processed_dir, exist_ok=True)
 
     file_path = os.path.join(processed_dir, f"{name}.csv")
     df.to_csv(file_path, index=False)
     print(f"💾 Saved processed data → {file_path}")
-    upload_to_s3(file_path, s3_folder="processed/")
+    upload_to_s3(file_path, s3_folder=s3_folder)
+    update_rollups(df, name, repo_partition, parquet=PROCESSED_FORMAT == "both")
+    mark_processed_version(name)
 
     # ✅ Optional cleanup to free /tmp space
     try:
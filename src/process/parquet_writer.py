@@ -0,0 +1,162 @@
+import io
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from src.ingest.s3_uploader import BUCKET_NAME, default_repo_partition, s3
+
+PARQUET_PREFIX = "processed_parquet/"
+
+# "zstd" (smaller) or "snappy" (faster to decode)
+PARQUET_COMPRESSION = os.getenv("PARQUET_COMPRESSION", "zstd")
+
+# dt= partition for rows whose date column is empty (kept, but outside Athena's dt projection)
+NULL_PARTITION = "__null__"
+
+# Typed column sets per dataset (must match athena/parquet_tables.sql).
+#   date_col: column whose UTC date becomes the dt= partition
+#   key / order_by: natural key used to upsert into an existing partition, newest row wins
+DATASETS = {
+    "commits_processed": {
+        "date_col": "date",
+        "key": ["sha"],
+        "order_by": None,
+        "columns": {
+            "sha": "string",
+            "author": "string",
+            "author_login": "string",
+            "date": "timestamp",
+            "message_len": "int64",
+        },
+    },
+    "pull_requests_processed": {
+        "date_col": "created_at",
+        "key": ["number"],
+        "order_by": "updated_at",
+        "columns": {
+            "number": "int64",
+            "author": "string",
+            "state": "string",
+            "created_at": "timestamp",
+            "updated_at": "timestamp",
+            "closed_at": "timestamp",
+            "merged_at": "timestamp",
+            "merged": "bool",
+            "review_time_hours": "float64",
+            "additions": "int64",
+            "deletions": "int64",
+            "changed_files": "int64",
+            "review_comments": "int64",
+            "commits_in_pr": "int64",
+        },
+    },
+    "workflow_runs_processed": {
+        "date_col": "created_at",
+        "key": ["id"],
+        "order_by": "updated_at",
+        "columns": {
+            "id": "int64",
+            "name": "string",
+            "event": "string",
+            "head_branch": "string",
+            "status": "string",
+            "conclusion": "string",
+            "run_number": "int64",
+            "created_at": "timestamp",
+            "updated_at": "timestamp",
+            "run_time_min": "float64",
+        },
+    },
+}
+
+
+ARROW_TYPES = {
+    "string": pa.string(),
+    "int64": pa.int64(),
+    "float64": pa.float64(),
+    "bool": pa.bool_(),
+    "timestamp": pa.timestamp("ms"),
+}
+
+
+def arrow_schema(name):
+    return pa.schema([(col, ARROW_TYPES[kind]) for col, kind in DATASETS[name]["columns"].items()])
+
+
+def _typed(df, columns):
+    """Select and cast the dataset's columns; timestamps become naive UTC."""
+    out = pd.DataFrame(index=df.index)
+    for col, kind in columns.items():
+        values = df[col] if col in df else pd.Series(None, index=df.index, dtype="object")
+        if kind == "timestamp":
+            out[col] = pd.to_datetime(values, utc=True).dt.tz_convert(None)
+        elif kind == "int64":
+            out[col] = pd.to_numeric(values, errors="coerce").astype("Int64")
+        elif kind == "float64":
+            out[col] = pd.to_numeric(values, errors="coerce").astype("float64")
+        elif kind == "bool":
+            out[col] = values.astype("boolean")
+        else:
+            out[col] = values.astype("string")
+    return out
+
+
+def partition_key(name, repo, dt):
+    return f"{PARQUET_PREFIX}{name}/{repo}/dt={dt}/{name}.parquet"
+
+
+def _read_partition(key):
+    try:
+        obj = s3.get_object(Bucket=BUCKET_NAME, Key=key)
+    except s3.exceptions.NoSuchKey:
+        return None
+    return pd.read_parquet(io.BytesIO(obj["Body"].read()))
+
+
+def read_partitions(name, repo, days):
+    """Typed rows of the given dt=YYYY-MM-DD partitions (missing days are skipped)."""
+    parts = [_read_partition(partition_key(name, repo, dt)) for dt in days]
+    parts = [_typed(part, DATASETS[name]["columns"]) for part in parts if part is not None]
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=list(DATASETS[name]["columns"]))
+
+
+def save_processed_parquet(df, name, repo_partition=None, compression=PARQUET_COMPRESSION):
+    """Write a processed dataset as Parquet, partitioned by repo and dt=YYYY-MM-DD.
+
+    Each touched day is upserted: the existing partition file (if any) is merged
+    with the new rows by natural key, so re-running overlapping windows doesn't
+    duplicate rows. Files go straight to S3 from memory. Rows without a date
+    land in dt=__null__ rather than being dropped. Single-repo runs partition
+    under the configured repo; org mode passes its own.
+    """
+    if df is None or df.empty:
+        print(f"ℹ️ Skipping Parquet save: {name} is empty")
+        return []
+
+    spec = DATASETS[name]
+    repo = repo_partition or default_repo_partition()
+    typed = _typed(df, spec["columns"])
+    days = typed[spec["date_col"]].dt.strftime("%Y-%m-%d").fillna(NULL_PARTITION)
+    undated = int((days == NULL_PARTITION).sum())
+    if undated:
+        print(f"⚠️ {undated} {name} rows have no {spec['date_col']}: writing them to dt={NULL_PARTITION}")
+
+    keys = []
+    for dt, part in typed.groupby(days):
+        key = partition_key(name, repo, dt)
+        existing = _read_partition(key)
+        if existing is not None:
+            part = pd.concat([_typed(existing, spec["columns"]), part], ignore_index=True)
+        if spec["order_by"]:
+            part = part.sort_values(spec["order_by"], kind="stable")
+        part = part.drop_duplicates(subset=spec["key"], keep="last")
+
+        table = pa.Table.from_pandas(part, schema=arrow_schema(name), preserve_index=False)
+        buffer = io.BytesIO()
+        pq.write_table(table, buffer, compression=compression)
+        s3.put_object(Bucket=BUCKET_NAME, Key=key, Body=buffer.getvalue())
+        keys.append(key)
+
+    print(f"💾 Wrote {len(typed)} {name} rows to {len(keys)} Parquet partitions under "
+          f"s3://{BUCKET_NAME}/{PARQUET_PREFIX}{name}/{repo}/")
+    return keys
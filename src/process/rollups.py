@@ -0,0 +1,215 @@
+import os
+import pandas as pd
+from src.ingest.s3_uploader import BUCKET_NAME, default_repo_partition, read_json_from_s3, write_json_to_s3
+from src.process.parquet_writer import DATASETS as PARQUET_DATASETS, read_partitions
+
+ROLLUP_PREFIX = "rollups/"
+
+# Set ROLLUPS_ENABLED=0 to skip the rollup stage
+ROLLUPS_ENABLED = os.getenv("ROLLUPS_ENABLED", "1").lower() in ("1", "true", "yes")
+
+# Daily/weekly aggregates the dashboard reads instead of scanning the processed tables.
+#   dataset:  processed dataset the rollup is built from
+#   date_col: column whose UTC date is the rollup day
+#   window_col: column the fetch window is cut on (commits: `since` filters on the committer
+#             date, not the author date the day is keyed on); defaults to date_col
+#   dims:     output column → source column
+#   measures: output column → (source column, "count" | "sum"); all additive, so
+#             weeks and all-time totals are plain sums of days
+#   skip_null_dims: drop rows without a dim value (the dashboard query filters them too)
+ROLLUPS = {
+    "commits_by_author": {
+        "dataset": "commits_processed",
+        "date_col": "date",
+        "window_col": "committed_at",
+        "dims": {"author": "author_login"},
+        "measures": {"commits": ("sha", "count")},
+        "skip_null_dims": True,
+    },
+    "pull_requests_by_author": {
+        "dataset": "pull_requests_processed",
+        "date_col": "created_at",
+        "dims": {"author": "author"},
+        "measures": {
+            "total_prs": ("number", "count"),
+            "merged_prs": ("merged", "sum"),
+            "review_time_hours_sum": ("review_time_hours", "sum"),
+            "review_time_hours_count": ("review_time_hours", "count"),
+            "review_comments_sum": ("review_comments", "sum"),
+            "review_comments_count": ("review_comments", "count"),
+        },
+    },
+    "workflow_conclusions": {
+        "dataset": "workflow_runs_processed",
+        "date_col": "created_at",
+        "dims": {"conclusion": "conclusion"},
+        "measures": {
+            "total": ("id", "count"),
+            "run_time_min_sum": ("run_time_min", "sum"),
+            "run_time_min_count": ("run_time_min", "count"),
+        },
+    },
+}
+
+
+# Objects per rollup and repo, each bounded in size regardless of history length:
+#   daily/YYYY-MM.json (one row per day × dim), weekly/YYYY.json (week = Monday), total.json
+def rollup_key(rollup, repo, grain, period=None):
+    suffix = f"{grain}/{period}.json" if period else f"{grain}.json"
+    return f"{ROLLUP_PREFIX}{rollup}/{repo}/{suffix}"
+
+
+def _day(values):
+    return pd.to_datetime(values, utc=True).dt.strftime("%Y-%m-%d")
+
+
+def _week(days):
+    dates = pd.to_datetime(days)
+    return (dates - pd.to_timedelta(dates.dt.weekday, unit="D")).dt.strftime("%Y-%m-%d")
+
+
+def daily_rollup(df, spec):
+    """Aggregate processed rows into one row per (day, dims)."""
+    dims, measures = list(spec["dims"]), list(spec["measures"])
+    if df is None or df.empty or spec["date_col"] not in df:
+        return pd.DataFrame(columns=["day", *dims, *measures])
+
+    frame = pd.DataFrame({"day": _day(df[spec["date_col"]])})
+    for out, source in spec["dims"].items():
+        frame[out] = df[source].astype("object") if source in df else None
+    for out, (source, how) in spec["measures"].items():
+        values = df[source] if source in df else pd.Series(float("nan"), index=df.index)
+        if how == "count":
+            frame[out] = values.notna().astype("int64")
+        else:
+            frame[out] = pd.to_numeric(values, errors="coerce").astype("Float64").fillna(0).astype("float64")
+    frame = frame[frame["day"].notna()]
+    if spec.get("skip_null_dims"):
+        frame = frame.dropna(subset=dims)
+    frame[dims] = frame[dims].fillna("unknown")
+    return frame.groupby(["day", *dims], as_index=False)[measures].sum()
+
+
+def _apply_delta(rows, delta, keys, measures, count_col):
+    """Add `delta` (new minus old per key) into stored rows; drop rows whose count reaches zero."""
+    current = pd.DataFrame(rows, columns=[*keys, *measures])
+    merged = pd.concat([current, delta], ignore_index=True).groupby(keys, as_index=False)[measures].sum()
+    merged = merged[merged[count_col] > 0]
+    return merged.sort_values(keys).to_dict(orient="records")
+
+
+def update_rollup(rollup, daily, repo, added=None):
+    """Replace the days in `daily`, add the rows of `added` onto the stored days,
+    and fold the change into weekly and total.
+
+    Only the month/year objects covering the touched days are read and written,
+    so the cost follows the size of the batch, not the length of history.
+    """
+    spec = ROLLUPS[rollup]
+    dims, measures = list(spec["dims"]), list(spec["measures"])
+    count_col = measures[0]
+    if added is None:
+        added = daily.iloc[0:0]
+    days = set(daily["day"])
+
+    old_parts = []
+    for month in sorted({day[:7] for day in days | set(added["day"])}):
+        key = rollup_key(rollup, repo, "daily", month)
+        stored = pd.DataFrame(read_json_from_s3(key, default=[]), columns=["day", *dims, *measures])
+        replaced = stored["day"].isin(days)
+        old_parts.append(stored[replaced])
+        kept = stored[~replaced]
+        fresh = daily[daily["day"].str.startswith(month)]
+        extra = added[added["day"].str.startswith(month)]
+        rows = (
+            pd.concat([kept, fresh, extra], ignore_index=True)
+            .groupby(["day", *dims], as_index=False)[measures].sum()
+            .sort_values(["day", *dims])
+        )
+        write_json_to_s3(rows.to_dict(orient="records"), key)
+
+    old = pd.concat(old_parts, ignore_index=True)
+    old[measures] = -old[measures]
+    delta = pd.concat([daily, added, old], ignore_index=True)
+    delta["week"] = _week(delta["day"])
+
+    weekly_delta = delta.groupby(["week", *dims], as_index=False)[measures].sum()
+    for year in sorted({week[:4] for week in weekly_delta["week"]}):
+        key = rollup_key(rollup, repo, "weekly", year)
+        part = weekly_delta[weekly_delta["week"].str.startswith(year)]
+        stored = read_json_from_s3(key, default=[])
+        write_json_to_s3(_apply_delta(stored, part, ["week", *dims], measures, count_col), key)
+
+    key = rollup_key(rollup, repo, "total")
+    total_delta = delta.groupby(dims, as_index=False)[measures].sum()
+    write_json_to_s3(_apply_delta(read_json_from_s3(key, default=[]), total_delta, dims, measures, count_col), key)
+    print(f"📊 Rolled up {rollup}: {len(days)} days replaced, {added['day'].nunique()} added to "
+          f"→ s3://{BUCKET_NAME}/{ROLLUP_PREFIX}{rollup}/{repo}/")
+
+
+def _split_by_window(df, spec, as_of):
+    """(rows of whole days, rows to add to partial days) of a batch cut by its fetch window.
+
+    The window starts at the batch's oldest window value, so only days after that
+    day are complete in the batch. Rows of older days are added onto the stored
+    day, but only those newer than `as_of` (the newest window value already
+    rolled up); older ones are in the stored day already.
+    """
+    window_col = spec.get("window_col", spec["date_col"])
+    if window_col not in df or df[window_col].isna().all():
+        window_col = spec["date_col"]
+    window = pd.to_datetime(df[window_col], utc=True)
+    days = _day(df[spec["date_col"]])
+    start = window.min()
+    if pd.isna(start):
+        whole = pd.Series(False, index=df.index)
+    else:
+        whole = days.fillna("") > start.strftime("%Y-%m-%d")
+    partial = ~whole & days.notna()
+    if as_of is not None:
+        partial &= window > pd.Timestamp(as_of)
+    return df[whole], df[partial], window.max()
+
+
+def update_rollups(df, dataset, repo_partition=None, parquet=False, whole_days=True):
+    """Run the rollup stage for every rollup built from `dataset`.
+
+    With the Parquet layout every day in the batch is rebuilt from its (already
+    upserted) dt partition, so partially re-fetched days stay exact. Otherwise
+    the batch itself is the source, and it only holds every record of the days
+    after the start of its fetch window (commit `since`, PR/run page caps):
+    those days are replaced, and the newly fetched rows of older days are added
+    onto the stored ones (see _split_by_window). The newest window value rolled
+    up is kept in rollups/<rollup>/<repo>/as_of.json. Pass `whole_days=False`
+    for batches that cover no day fully (webhook micro-batches); without
+    Parquet they leave the rollups to the next poll.
+    """
+    if not ROLLUPS_ENABLED or df is None or df.empty:
+        return []
+    repo = repo_partition or default_repo_partition()
+    use_parquet = parquet and dataset in PARQUET_DATASETS
+    if not use_parquet and not whole_days:
+        print(f"ℹ️ Skipping {dataset} rollups: batch covers no whole day")
+        return []
+    updated = []
+    for rollup, spec in ROLLUPS.items():
+        if spec["dataset"] != dataset:
+            continue
+        if spec["date_col"] not in df:
+            continue
+        if use_parquet:
+            days = sorted(set(_day(df[spec["date_col"]]).dropna()))
+            daily, added = daily_rollup(read_partitions(dataset, repo, days), spec), None
+        else:
+            as_of_key = rollup_key(rollup, repo, "as_of")
+            as_of = read_json_from_s3(as_of_key, default={}).get("window")
+            whole, partial, newest = _split_by_window(df, spec, as_of)
+            daily, added = daily_rollup(whole, spec), daily_rollup(partial, spec)
+        if daily.empty and (added is None or added.empty):
+            continue
+        update_rollup(rollup, daily, repo, added)
+        if not use_parquet and pd.notna(newest):
+            newest = max(newest, pd.Timestamp(as_of)) if as_of else newest
+            write_json_to_s3({"window": newest.isoformat()}, as_of_key)
+        updated.append(rollup)
+    return updated
@@ -0,0 +1,95 @@
+import json
+import pandas as pd
+from src.process import agg_state
+from src.process.agg_state import Aggregate, collapse, fold_batch, state_key
+from src.process.metrics_processor import fold_pull_requests, process_pull_requests
+from src.process.sketches import HyperLogLog, TDigest
+
+REPO = "repo=o__r"
+
+
+def pr(number, author, created_at, closed_at=None, merged_at=None, comments=0):
+    return {
+        "number": number, "user": {"login": author}, "state": "closed" if closed_at else "open",
+        "created_at": created_at, "closed_at": closed_at, "merged_at": merged_at, "review_comments": comments,
+    }
+
+
+PRS = [
+    pr(1, "alice", "2025-11-03T10:00:00Z", "2025-11-03T12:00:00Z", "2025-11-03T12:00:00Z", comments=2),
+    pr(2, "bob", "2025-11-04T09:00:00Z", "2025-11-04T19:00:00Z"),
+    pr(3, "alice", "2025-11-05T08:00:00Z"),  # still open
+]
+
+
+def test_sketches_survive_a_json_round_trip():
+    digest, hll = TDigest(), HyperLogLog()
+    for value in range(1, 1001):
+        digest.add(float(value))
+        hll.add(f"author-{value % 37}")
+    restored = Aggregate.from_dict(json.loads(json.dumps({"count": 1, "sum": 1.0, "min": 1.0, "max": 1.0,
+                                                          "digest": digest.to_dict(), "hll": hll.to_dict()})))
+    assert restored.digest.quantile(0.5) == digest.quantile(0.5)
+    assert restored.hll.estimate() == hll.estimate()
+    assert abs(restored.digest.quantile(0.9) - 900) < 15
+    assert abs(restored.hll.estimate() - 37) <= 2
+
+
+def test_merged_aggregates_match_one_pass():
+    whole, left, right = Aggregate("quantiles"), Aggregate("quantiles"), Aggregate("quantiles")
+    for value in range(100):
+        whole.add(value)
+        (left if value % 2 else right).add(value)
+    merged = left.merge(right)
+    assert (merged.count, merged.sum, merged.min, merged.max) == (whole.count, whole.sum, whole.min, whole.max)
+    assert abs(merged.quantile(0.5) - whole.quantile(0.5)) < 2
+
+
+def test_fold_counts_each_final_record_once(fake_s3):
+    df, _, _ = process_pull_requests(PRS)
+    fold_batch(df, "pull_requests_processed", REPO)
+    summary = fold_batch(df, "pull_requests_processed", REPO)  # same batch again: nothing new
+
+    merged = agg_state.total(collapse(summary), "merged")
+    assert (merged.count, merged.sum) == (2, 1.0)  # the open PR isn't folded
+    stored = json.loads(fake_s3.objects[state_key("pull_requests_processed", REPO, "2025-11")])
+    assert stored["keys"] == ["1", "2"]
+
+
+def test_pr_metrics_include_open_prs(fake_s3):
+    df, batch_metrics, batch_authors = process_pull_requests(PRS)
+    overall, authors = fold_pull_requests(df, repo_partition=REPO)
+    assert overall["total_prs"] == batch_metrics["total_prs"] == 3
+    assert overall["merge_ratio"] == batch_metrics["merge_ratio"]
+    by_author = authors.set_index("author")["total_prs"].to_dict()
+    assert by_author == batch_authors.set_index("author")["total_prs"].to_dict() == {"alice": 2, "bob": 1}
+
+
+def test_fold_retries_when_a_concurrent_fold_wins(fake_s3, monkeypatch):
+    first, _, _ = process_pull_requests(PRS[:1])
+    second, _, _ = process_pull_requests(PRS[1:2])
+    month_key = state_key("pull_requests_processed", REPO, "2025-11")
+    read = agg_state.read_json_with_etag
+
+    def racing_read(key, default=None):
+        data, etag = read(key, default)
+        if key == month_key and not racing_read.raced:
+            # Another invocation folds PR 1 between this fold's read and its write
+            racing_read.raced = True
+            fold_batch(first, "pull_requests_processed", REPO)
+        return data, etag
+
+    racing_read.raced = False
+    monkeypatch.setattr(agg_state, "read_json_with_etag", racing_read)
+    summary = fold_batch(second, "pull_requests_processed", REPO)
+
+    assert json.loads(fake_s3.objects[month_key])["keys"] == ["1", "2"]
+    assert agg_state.total(collapse(summary), "merged").count == 2
+    assert agg_state.total(collapse(agg_state.load_summary("pull_requests_processed", REPO)), "merged").count == 2
+
+
+def test_fold_empty_batch_returns_stored_summary(fake_s3):
+    df, _, _ = process_pull_requests(PRS)
+    fold_batch(df, "pull_requests_processed", REPO)
+    summary = fold_batch(pd.DataFrame(), "pull_requests_processed", REPO)
+    assert list(summary) == ["2025-11"]
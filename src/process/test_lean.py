@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+from src.process.lean import frame_from_records, memory_report, memory_stage, normalize_lean, parse_times
+from src.process.metrics_processor import LEAN_FIELDS, process_commits, process_pull_requests
+
+
+def commit(i, login):
+    return {"sha": f"s{i}", "author": {"login": login} if login else None,
+            "commit": {"author": {"name": login or "ghost", "date": f"2025-11-0{1 + i % 5}T10:00:00Z"},
+                       "committer": {"date": f"2025-11-0{1 + i % 5}T11:00:00Z"}, "message": "x" * (i + 1)}}
+
+
+def pr(number, login, merged):
+    return {"number": number, "user": {"login": login}, "state": "closed", "created_at": "2025-11-01T10:00:00Z",
+            "updated_at": "2025-11-02T10:00:00Z", "closed_at": "2025-11-02T10:00:00Z",
+            "merged_at": "2025-11-02T10:00:00Z" if merged else None, "review_comments": number,
+            "additions": 10, "deletions": 2, "changed_files": 1, "commits_in_pr": 1}
+
+
+def test_chunks_concatenate_to_the_single_chunk_frame():
+    records = [commit(i, login) for i, login in enumerate(["alice", "bob", None, "carol", "alice"])]
+    fields = LEAN_FIELDS["commits_processed"]
+    chunked = normalize_lean(iter(records), fields, chunk_rows=2)
+    whole = normalize_lean(records, fields, chunk_rows=100)
+    assert isinstance(chunked["author_login"].dtype, pd.CategoricalDtype)
+    assert set(chunked["author_login"].cat.categories) == {"alice", "bob", "carol"}
+    pd.testing.assert_frame_equal(chunked.astype({"author": str, "author_login": str}),
+                                  whole.astype({"author": str, "author_login": str}))
+
+
+def test_missing_paths_become_nulls():
+    df = frame_from_records([{"sha": "a"}, {"sha": "b", "author": "not-a-dict"}], LEAN_FIELDS["commits_processed"])
+    assert df["author_login"].isna().all() and df["date"].isna().all() and df["message_len"].isna().all()
+
+
+def test_parse_times_falls_back_to_iso8601():
+    parsed = parse_times(["2025-11-01T10:00:00Z", "2025-11-01T12:00:00.250+02:00", None])
+    assert parsed[0] == pd.Timestamp("2025-11-01T10:00:00Z")
+    assert parsed[1] == pd.Timestamp("2025-11-01T10:00:00.250Z")
+    assert pd.isna(parsed[2])
+
+
+def test_lean_commit_metrics_match_full_mode():
+    records = [commit(i, login) for i, login in enumerate(["alice", "bob", "alice", "carol"])]
+    _, full = process_commits(records, mode="full")
+    _, lean = process_commits(iter(records), mode="lean")
+    assert lean == full
+
+
+def test_lean_pr_metrics_match_full_mode():
+    records = [pr(1, "alice", True), pr(2, "bob", False), pr(3, "alice", True)]
+    _, full, full_authors = process_pull_requests(records, mode="full")
+    _, lean, lean_authors = process_pull_requests(iter(records), mode="lean")
+    assert lean == pytest.approx(full)
+    assert lean_authors.astype({"author": str}).to_dict("records") == pytest.approx(full_authors.to_dict("records"))
+
+
+def test_memory_stage_records_each_stage():
+    memory_report(reset=True)
+    with memory_stage("normalize"):
+        normalize_lean([commit(0, "alice")], LEAN_FIELDS["commits_processed"])
+    report = memory_report(reset=True)
+    assert set(report) == {"normalize"} and report["normalize"]["peak_rss_mb"] > 0
+    assert memory_report() == {}
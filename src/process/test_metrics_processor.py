@@ -0,0 +1,42 @@
+import io
+import pandas as pd
+import pytest
+from src.ingest.schemas import normalized_columns, project
+from src.process import metrics_processor
+from src.process.metrics_processor import process_commits, save_processed
+
+
+@pytest.fixture
+def flat(fake_s3, monkeypatch, tmp_path):
+    monkeypatch.setattr(metrics_processor, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(metrics_processor, "PROCESSED_FORMAT", "csv")
+    monkeypatch.setenv("GITHUB_REPO_OWNER", "o")
+    monkeypatch.setenv("GITHUB_REPO_NAME", "r")
+    return fake_s3
+
+
+def header(fake_s3, name):
+    return list(pd.read_csv(io.BytesIO(fake_s3.objects[f"processed/{name}.csv"]), nrows=0).columns)
+
+
+def payload(sha, extra=None):
+    # GitHub's key order varies between endpoints; projection fixes it
+    return {**(extra or {}), "commit": {"message": "m", "committer": {"date": "2025-11-01T10:00:00Z"},
+                                        "author": {"date": "2025-11-01T10:00:00Z", "name": "a"}},
+            "author": {"login": "a"}, "sha": sha}
+
+
+def test_flat_csv_columns_follow_the_schema_order(flat):
+    df, _ = process_commits([project(payload("a"), "commit")])
+    save_processed(df, "commits_processed")
+    assert header(flat, "commits_processed") == normalized_columns("commit") + [
+        "author", "author_login", "date", "message_len", "committed_at"]
+
+
+def test_extra_columns_are_appended_by_name(flat):
+    # RAW_FULL keeps whole payloads: the schema columns still lead, the rest follow sorted
+    df, _ = process_commits([payload("a", {"url": "u", "node_id": "n"})])
+    save_processed(df, "commits_processed")
+    columns = header(flat, "commits_processed")
+    assert columns[:3] == ["sha", "commit.author.name", "commit.author.date"]
+    assert columns[-2:] == ["node_id", "url"]
@@ -0,0 +1,33 @@
+import io
+import pandas as pd
+import pytest
+from src.process.parquet_writer import partition_key, read_partitions, save_processed_parquet
+
+REPO = "repo=o__r"
+
+
+def runs(*created):
+    return pd.DataFrame([
+        {"id": i, "name": "ci", "created_at": c, "updated_at": c, "run_time_min": 1.0} for i, c in enumerate(created)
+    ])
+
+
+def test_rows_without_a_date_go_to_the_null_partition(fake_s3):
+    keys = save_processed_parquet(runs("2025-11-03T10:00:00Z", None, None), "workflow_runs_processed", REPO)
+    assert sorted(keys) == [partition_key("workflow_runs_processed", REPO, dt) for dt in ("2025-11-03", "__null__")]
+    undated = pd.read_parquet(io.BytesIO(fake_s3.objects[partition_key("workflow_runs_processed", REPO, "__null__")]))
+    assert sorted(undated["id"]) == [1, 2]
+
+
+def test_reruns_upsert_by_natural_key(fake_s3):
+    save_processed_parquet(runs("2025-11-03T10:00:00Z", "2025-11-03T11:00:00Z"), "workflow_runs_processed", REPO)
+    save_processed_parquet(runs("2025-11-03T10:00:00Z"), "workflow_runs_processed", REPO)
+    assert sorted(read_partitions("workflow_runs_processed", REPO, ["2025-11-03"])["id"]) == [0, 1]
+
+
+def test_missing_repo_config_fails_loudly(fake_s3, monkeypatch):
+    monkeypatch.delenv("GITHUB_REPO_OWNER", raising=False)
+    monkeypatch.delenv("GITHUB_REPO_NAME", raising=False)
+    with pytest.raises(EnvironmentError):
+        save_processed_parquet(runs("2025-11-03T10:00:00Z"), "workflow_runs_processed")
+    assert not any("None__None" in key for key in fake_s3.objects)
@@ -0,0 +1,101 @@
+import json
+import pytest
+from src.process.metrics_processor import process_commits, process_pull_requests
+from src.process.rollups import rollup_key, update_rollups
+
+REPO = "repo=o__r"
+
+
+def commit(sha, login, authored, committed=None):
+    return {
+        "sha": sha,
+        "author": {"login": login},
+        "commit": {
+            "author": {"name": login, "date": authored},
+            "committer": {"date": committed or authored},
+            "message": "m",
+        },
+    }
+
+
+def stored(fake_s3, rollup, grain, period=None):
+    return json.loads(fake_s3.objects[rollup_key(rollup, REPO, grain, period)])
+
+
+def daily_counts(fake_s3, month="2025-11"):
+    return {(row["day"], row["author"]): row["commits"] for row in stored(fake_s3, "commits_by_author", "daily", month)}
+
+
+def roll(records, mode=None):
+    df, _ = process_commits(records, mode=mode)
+    return update_rollups(df, "commits_processed", REPO)
+
+
+@pytest.fixture
+def first_run(fake_s3):
+    # Window starts 2025-11-03: that day is partial, the later ones complete
+    roll([
+        commit("a", "alice", "2025-11-03T18:00:00Z"),
+        commit("b", "alice", "2025-11-04T10:00:00Z"),
+        commit("c", "bob", "2025-11-04T11:00:00Z"),
+        commit("d", "bob", "2025-11-05T09:00:00Z"),
+    ])
+    return fake_s3
+
+
+def test_first_run_keeps_every_fetched_row(first_run):
+    assert daily_counts(first_run) == {
+        ("2025-11-03", "alice"): 1, ("2025-11-04", "alice"): 1, ("2025-11-04", "bob"): 1, ("2025-11-05", "bob"): 1,
+    }
+    assert {row["author"]: row["commits"] for row in stored(first_run, "commits_by_author", "total")} == {
+        "alice": 2, "bob": 2,
+    }
+
+
+@pytest.mark.parametrize("mode", ["full", "lean"])
+def test_rebased_commit_adds_to_its_old_day(first_run, mode):
+    # Next window starts 2025-11-05; a rebase re-commits an old change authored on 2025-11-04.
+    # That day is only partly in the batch: it must grow by one, not be replaced by the one row.
+    roll([
+        commit("d", "bob", "2025-11-05T09:00:00Z"),
+        commit("e", "bob", "2025-11-05T12:00:00Z"),
+        commit("f", "carol", "2025-11-04T08:00:00Z", committed="2025-11-06T08:00:00Z"),
+    ], mode=mode)
+    counts = daily_counts(first_run)
+    assert counts[("2025-11-04", "alice")] == 1 and counts[("2025-11-04", "bob")] == 1
+    assert counts[("2025-11-04", "carol")] == 1
+    assert counts[("2025-11-05", "bob")] == 2  # complete day: replaced, "d" counted once
+
+    total = {row["author"]: row["commits"] for row in stored(first_run, "commits_by_author", "total")}
+    assert total == {"alice": 2, "bob": 3, "carol": 1}
+    weekly = stored(first_run, "commits_by_author", "weekly", "2025")
+    assert sum(row["commits"] for row in weekly) == sum(counts.values()) == 6
+
+
+def test_replayed_batch_does_not_double_count(first_run):
+    batch = [commit("f", "carol", "2025-11-04T08:00:00Z", committed="2025-11-06T08:00:00Z"),
+             commit("g", "carol", "2025-11-06T09:00:00Z")]
+    roll(batch)
+    roll(batch)
+    assert daily_counts(first_run)[("2025-11-04", "carol")] == 1
+    total = {row["author"]: row["commits"] for row in stored(first_run, "commits_by_author", "total")}
+    assert total == {"alice": 2, "bob": 2, "carol": 2}
+
+
+def test_pr_days_after_the_window_start_are_replaced(fake_s3):
+    def pr(number, created_at, merged_at=None):
+        return {"number": number, "user": {"login": "alice"}, "state": "closed" if merged_at else "open",
+                "created_at": created_at, "closed_at": merged_at, "merged_at": merged_at, "review_comments": 0}
+
+    merged_1 = pr(1, "2025-11-03T10:00:00Z", merged_at="2025-11-03T12:00:00Z")
+    df, _, _ = process_pull_requests([merged_1, pr(2, "2025-11-04T10:00:00Z")])
+    update_rollups(df, "pull_requests_processed", REPO)
+    # By the next run PR 2 is merged; 2025-11-04 is complete in the batch, 2025-11-03 (window start) isn't
+    df, _, _ = process_pull_requests([merged_1, pr(2, "2025-11-04T10:00:00Z", merged_at="2025-11-05T10:00:00Z")])
+    update_rollups(df, "pull_requests_processed", REPO)
+
+    daily = {row["day"]: (row["total_prs"], row["merged_prs"])
+             for row in stored(fake_s3, "pull_requests_by_author", "daily", "2025-11")}
+    assert daily == {"2025-11-03": (1, 1), "2025-11-04": (1, 1)}
+    total = stored(fake_s3, "pull_requests_by_author", "total")
+    assert [(row["author"], row["total_prs"], row["merged_prs"]) for row in total] == [("alice", 2, 2)]
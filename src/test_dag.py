@@ -0,0 +1,119 @@
+import threading
+import pytest
+from src.dag import Channel, ChannelCancelled, Stage, TeeSink, run_dag
+
+
+def test_stages_run_after_their_dependencies():
+    order = []
+
+    def step(name, value):
+        def fn(**upstream):
+            order.append(name)
+            return value + sum(upstream.values())
+        return fn
+
+    results, timings = run_dag([
+        Stage("save", step("save", 100), after=["a", "b"]),
+        Stage("a", step("a", 1)),
+        Stage("b", step("b", 10), after=["a"]),
+    ])
+    assert order == ["a", "b", "save"]
+    assert results == {"a": 1, "b": 11, "save": 112}
+    assert set(timings) == {"a", "b", "save", "total"}
+
+
+def test_channel_streams_pages_with_backpressure():
+    channel = Channel(maxsize=1)
+    produced = []
+
+    def fetch():
+        for page in range(20):
+            channel.put([page, page])
+            produced.append(page)
+
+    def process(records):
+        # The producer is never more than the channel's capacity (+1 in flight) ahead
+        total = 0
+        for i, record in enumerate(records):
+            assert len(produced) <= i // 2 + 3
+            total += record
+        return total
+
+    results, _ = run_dag([
+        Stage("fetch", fetch, produces=[channel]),
+        Stage("process", lambda: process(channel.records()), consumes=[channel]),
+    ])
+    assert results["process"] == 2 * sum(range(20))
+
+
+def test_producer_failure_reaches_the_consumer():
+    channel = Channel()
+
+    def fetch():
+        channel.put([1])
+        raise OSError("GitHub unavailable")
+
+    seen = []
+    # Both stages fail; whichever finishes first is re-raised
+    with pytest.raises((OSError, RuntimeError)):
+        run_dag([
+            Stage("fetch", fetch, produces=[channel]),
+            Stage("process", lambda: seen.extend(channel.records()), consumes=[channel]),
+        ])
+    assert seen == [1]
+
+
+def test_consumer_failure_unblocks_the_producer():
+    channel = Channel(maxsize=1)
+    stopped = threading.Event()
+
+    def fetch():
+        try:
+            while True:
+                channel.put([0])
+        except ChannelCancelled:
+            stopped.set()
+
+    def process():
+        next(iter(channel))
+        raise ValueError("bad page")
+
+    with pytest.raises(ValueError, match="bad page"):
+        run_dag([Stage("fetch", fetch, produces=[channel]), Stage("process", process, consumes=[channel])])
+    assert stopped.is_set()
+
+
+def test_failure_stops_later_stages():
+    ran = []
+    with pytest.raises(KeyError):
+        run_dag([
+            Stage("process", lambda: {}["missing"]),
+            Stage("save", lambda **up: ran.append("save"), after=["process"]),
+        ])
+    assert ran == []
+
+
+def test_invalid_graphs_are_rejected():
+    with pytest.raises(ValueError, match="unknown"):
+        run_dag([Stage("save", lambda **up: None, after=["process"])])
+    with pytest.raises(ValueError, match="cycle"):
+        run_dag([Stage("a", lambda **up: None, after=["b"]), Stage("b", lambda **up: None, after=["a"])])
+
+
+def test_tee_sink_writes_and_forwards():
+    class ListSink:
+        def __init__(self):
+            self.records = []
+
+        def write(self, record):
+            self.records.append(record)
+
+        def write_many(self, records):
+            self.records.extend(records)
+
+    sink, channel = ListSink(), Channel(maxsize=4)
+    tee = TeeSink(sink, channel)
+    tee.write_many(iter([1, 2]))
+    tee.write(3)
+    channel.close()
+    assert sink.records == [1, 2, 3] and list(channel) == [[1, 2], [3]]